@@ -0,0 +1,254 @@
+import importlib.util
+import os
+from functools import lru_cache
+
+# columns between the characters of a text
+LETTER_SPACING = 1
+# columns of a space, whose glyph has no lit LEDs to measure
+SPACE_WIDTH = 3
+
+
+class Animation:
+    """A keyframed effect painted on top of the game.
+    Each keyframe is shown for its duration, then the next one, until the last one
+    is over. The LEDs of a keyframe replace whatever the game painted there, so an
+    LED with color (0, 0) turns it off.
+    """
+
+    def __init__(self, keyframes, pause: bool = True, on_done=None):
+        """Initializes an Animation object.
+        Args:
+            keyframes (list): (duration, leds) tuples, with the duration in seconds and
+                leds a list of (x, y, r, g) tuples, in the same coordinates as paint_next.
+            pause (bool): Whether or not the game logic is paused while the animation plays.
+            on_done (callable): Called when the animation is over.
+        """
+        self.keyframes = keyframes
+        self.pause = pause
+        self.on_done = on_done
+        self.index = 0
+        self.elapsed = 0
+
+    @property
+    def done(self):
+        return self.index >= len(self.keyframes)
+
+    @property
+    def leds(self):
+        """The LEDs of the current keyframe."""
+        if self.done:
+            return []
+        return self.keyframes[self.index][1]
+
+    def advance(self, delta):
+        """Advances the animation by delta seconds."""
+        self.elapsed += delta
+        while not self.done and self.elapsed >= self.keyframes[self.index][0]:
+            self.elapsed -= self.keyframes[self.index][0]
+            self.index += 1
+
+
+class Timeline:
+    """The animations currently playing, advanced by the game loop between ticks."""
+
+    def __init__(self):
+        self.animations = []
+
+    def play(self, animation):
+        """Starts playing the given animation."""
+        self.animations.append(animation)
+
+    def clear(self):
+        """Stops all animations, without calling their on_done."""
+        self.animations = []
+
+    @property
+    def paused(self):
+        """Whether or not an animation is pausing the game logic."""
+        return any(animation.pause for animation in self.animations)
+
+    def advance(self, delta):
+        """Advances all animations by delta seconds and removes the finished ones."""
+        if not self.animations:
+            return
+        for animation in self.animations:
+            animation.advance(delta)
+        finished = [animation for animation in self.animations if animation.done]
+        if finished:
+            self.animations = [a for a in self.animations if not a.done]
+            for animation in finished:
+                if animation.on_done is not None:
+                    animation.on_done()
+
+    def leds(self):
+        """Returns the LEDs painted by the animations, later animations on top.
+        Returns:
+            dict: (r, g) colors by (x, y) coordinates.
+        """
+        leds = {}
+        for animation in self.animations:
+            for x, y, r, g in animation.leds:
+                leds[x, y] = (r, g)
+        return leds
+
+
+def char_leds(char, r, g, offset=0):
+    """Returns the LEDs of a character of the Launchpad font, like Launchpad.LedCtrlChar.
+    Args:
+        char (str): The character.
+        r (int): The red value of the LEDs.
+        g (int): The green value of the LEDs.
+        offset (int): How many columns to move the character to the right.
+    """
+    leds = []
+    chartab = font()
+    start = ord(char) * 8
+    for y in range(0, 8):
+        for x in range(0, 8):
+            if chartab[start + y] & 0x80 >> x and 0 <= x + offset < 8:
+                leds.append((x + offset, y, r, g))
+    return leds
+
+
+@lru_cache(maxsize=None)
+def font():
+    """Returns the font of the Launchpad, CHARTAB of novation_launchpad.charset, with
+    8 bytes per character.
+    charset.py is loaded on its own, since importing novation_launchpad loads the MIDI
+    system, which headless machines don't have.
+    """
+    package = importlib.util.find_spec("novation_launchpad")
+    path = os.path.join(package.submodule_search_locations[0], "charset.py")
+    spec = importlib.util.spec_from_file_location("novation_launchpad.charset", path)
+    charset = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(charset)
+    return charset.CHARTAB
+
+
+@lru_cache(maxsize=None)
+def glyph(char):
+    """Returns a character of the Launchpad font, trimmed to the columns it lights.
+    Characters that aren't in the font are shown as "?".
+    Returns:
+        tuple: The columns of the character, left first, as bitmasks with bit y set
+            where the LED of row y is lit.
+    """
+    chartab = font()
+    if ord(char) * 8 >= len(chartab):
+        return glyph("?")
+    start = ord(char) * 8
+    columns = [0] * 8
+    for y in range(0, 8):
+        for x in range(0, 8):
+            if chartab[start + y] & 0x80 >> x:
+                columns[x] |= 1 << y
+    lit = [x for x in range(0, 8) if columns[x]]
+    if not lit:
+        return (0,) * SPACE_WIDTH
+    return tuple(columns[lit[0] : lit[-1] + 1])
+
+
+@lru_cache(maxsize=64)
+def text_columns(text):
+    """Returns the columns of a text, see glyph, with LETTER_SPACING blank columns
+    between its characters.
+    """
+    columns = []
+    for char in text:
+        if columns:
+            columns.extend((0,) * LETTER_SPACING)
+        columns.extend(glyph(char))
+    return tuple(columns)
+
+
+class Marquee(Animation):
+    """A text scrolling across the board from right to left, see marquee.
+    The text is composed into columns once, and every step only slices the columns
+    that are on the board, so that a message of any length costs the same. The
+    unlit LEDs of the board are painted off, and paint only sends the LEDs that
+    changed from one step to the next.
+    """
+
+    def __init__(self, columns, r, g, width, interval, pause, on_done):
+        blank = (0,) * width
+        self.columns = blank + columns + blank
+        self.r = r
+        self.g = g
+        self.width = width
+        super().__init__(
+            [(interval, None)] * (len(columns) + width + 1), pause, on_done
+        )
+
+    @property
+    def leds(self):
+        """The LEDs of the current step: the lit LEDs of the text, the others off."""
+        if self.done:
+            return []
+        r = self.r
+        g = self.g
+        leds = []
+        for x, column in enumerate(self.columns[self.index : self.index + self.width]):
+            for y in range(0, 8):
+                if column >> y & 1:
+                    leds.append((x, y, r, g))
+                else:
+                    leds.append((x, y, 0, 0))
+        return leds
+
+
+def marquee(text, r=3, g=3, width=8, interval=0.1, pause=True, on_done=None):
+    """Returns an animation scrolling the given text across the board, see Marquee.
+    The text comes in from the right and scrolls until it has left on the left.
+    Args:
+        text (str): The text, of any length.
+        r (int): The red value of the text.
+        g (int): The green value of the text.
+        width (int): The width of the board.
+        interval (float): How long it takes to scroll one column, in seconds.
+    """
+    return Marquee(text_columns(text), r, g, width, interval, pause, on_done)
+
+
+def countdown(seconds=3, pause=True, on_done=None):
+    """Returns an animation counting down the given number of seconds."""
+    return Animation(
+        [(1, char_leds(str(seconds - i), 2, i, 1)) for i in range(seconds)],
+        pause,
+        on_done,
+    )
+
+
+def blink_rows(rows, r=3, g=3, times=2, interval=0.15, pause=True, on_done=None):
+    """Returns an animation blinking the given rows.
+    Args:
+        rows (list): The y coordinates of the rows.
+        r (int): The red value of the rows when they are lit.
+        g (int): The green value of the rows when they are lit.
+        times (int): How many times to blink.
+        interval (float): How long the rows are lit and then off, in seconds.
+    """
+    lit = [(x, y, r, g) for y in rows for x in range(0, 8)]
+    off = [(x, y, 0, 0) for y in rows for x in range(0, 8)]
+    return Animation([(interval, lit), (interval, off)] * times, pause, on_done)
+
+
+def sweep(x, y, direction, width=2, length=14, interval=0.08, pause=True, on_done=None):
+    """Returns an animation of a colorful trail running across the board.
+    Args:
+        x (int): The x coordinate of the left side of the trail.
+        y (int): The y coordinate where the trail starts.
+        direction (int): 1 to run down, -1 to run up.
+        width (int): The width of the trail.
+        length (int): The number of steps of the trail.
+        interval (float): How long each step lasts, in seconds.
+    """
+    keyframes = []
+    for i in range(0, length):
+        head = y + i * direction
+        leds = []
+        for j in range(0, width):
+            leds.append((x + j, head, 0, 0))
+            for k in range(1, 4):
+                leds.append((x + j, head - k * direction, i % 4, (i + 1) % 4))
+        keyframes.append((interval, leds))
+    return Animation(keyframes, pause, on_done)
@@ -0,0 +1,144 @@
+import sys
+import logging
+from inputreader import read_events
+from scheduler import Scheduler
+
+
+def open_launchpads(count=None, name="Launchpad"):
+    """Opens the connected Launchpads.
+    Args:
+        count (int): The maximum number of Launchpads to open. None opens all of them.
+        name (str): The name of the MIDI devices to look for.
+    Returns:
+        list: The opened Launchpad objects.
+    """
+    import novation_launchpad
+
+    pads = []
+    while count is None or len(pads) < count:
+        lp = novation_launchpad.Launchpad()
+        if not lp.Open(len(pads), name):
+            break
+        pads.append(lp)
+    logging.info("Opened " + str(len(pads)) + " Launchpads")
+    return pads
+
+
+class Session:
+    """A game on one of the Launchpads of an Arcade.
+    Like LaunchGame.run, it waits for a button press, plays a game until it is over
+    and then waits for the next press.
+    """
+
+    def __init__(self, game):
+        """Initializes a Session object.
+        Args:
+            game (LaunchGame): The game, with the Launchpad it is played on.
+        """
+        self.game = game
+        self.playing = False
+
+    def update(self, events, steps, delta):
+        """Handles the input and advances the game.
+        Args:
+            events (list): The ButtonEvents read since the last update, oldest first.
+            steps (int): The number of ticks to advance.
+            delta (float): The length of a tick, in seconds.
+        """
+        if not self.playing:
+            if any(evt.pressed for evt in events):
+                logging.info("Starting " + self.game.name)
+                self.game.start_game()
+                self.playing = True
+            elif self.game.timeline.animations:
+                # e.g. the game over marquee
+                self.game.timeline.advance(steps * delta)
+            return
+        self.game.update(events, steps, delta)
+        if self.game.game_over:
+            self.game.process_game_over()
+            self.playing = False
+
+    def paint(self):
+        """Paints the frame of the game, if it is being played or still animating."""
+        if self.playing or self.game.timeline.animations:
+            self.game.paint()
+
+
+class Arcade:
+    """Runs independent games on several Launchpads in a single thread.
+    All sessions share one fixed timestep Scheduler: on every tick the input of all
+    the Launchpads is polled, the games are advanced and their frames painted, then
+    the thread sleeps until the next tick. The games' own input threads and
+    schedulers are never started, so a Launchpad costs no more than its game state
+    and a couple of MIDI reads per tick. Only the output of every game is sent from
+    a thread of its own, see LaunchGame.use_async_output.
+    """
+
+    def __init__(self, games=(), tick_rate: int = 60):
+        """Initializes an Arcade object.
+        Args:
+            games (iterable): The LaunchGames to run, each on its own Launchpad.
+            tick_rate (int): The number of game steps per second.
+        """
+        self.scheduler = Scheduler(tick_rate)
+        self.sessions = []
+        for game in games:
+            self.add(game)
+
+    def add(self, game):
+        """Adds a game to the arcade and returns its Session."""
+        session = Session(game)
+        self.sessions.append(session)
+        return session
+
+    def poll(self):
+        """Returns the events read from every Launchpad, by session."""
+        clock = self.scheduler.clock
+        return [read_events(session.game.lp, clock) for session in self.sessions]
+
+    def update(self, steps):
+        """Advances all the sessions by the given number of ticks."""
+        for session, events in zip(self.sessions, self.poll()):
+            session.update(events, steps, self.scheduler.tick)
+
+    def paint(self):
+        """Paints the frames of all the sessions."""
+        for session in self.sessions:
+            session.paint()
+
+    def run(self):
+        """Runs the arcade forever."""
+        logging.info("Press any button to start")
+        # the Launchpads are written in parallel and a slow one can't hold up the
+        # others
+        for session in self.sessions:
+            session.game.use_async_output()
+        self.scheduler.start()
+        while True:
+            self.scheduler.wait()
+            steps = self.scheduler.steps()
+            if steps == 0:
+                continue
+            self.update(steps)
+            if self.scheduler.should_render():
+                self.paint()
+
+
+if __name__ == "__main__":
+    from flappy import FlappyBird
+    from pong import Pong
+    from space_invadors import SpaceInvaders
+    from tetris import Tetris
+
+    games = {
+        "flappy": FlappyBird,
+        "pong": Pong,
+        "space_invadors": SpaceInvaders,
+        "tetris": Tetris,
+    }
+    # the games are assigned to the Launchpads in turn, e.g. arcade.py tetris pong
+    names = sys.argv[1:] or ["tetris"]
+    pads = open_launchpads()
+    arcade = Arcade(games[names[i % len(names)]](lp=lp) for i, lp in enumerate(pads))
+    arcade.run()
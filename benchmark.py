@@ -0,0 +1,193 @@
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import tracemalloc
+from inputreader import read_events
+from launcher import GAMES, load_game
+from virtualpad import VirtualLaunchpad, button_message
+
+# Metrics of a run, with whether a higher value is better.
+METRICS = {
+    "steps_per_second": True,
+    "messages_per_frame": False,
+    "bytes_per_frame": False,
+    "peak_memory": False,
+}
+
+
+def input_script(frames, seed, press_rate=0.1):
+    """Returns scripted button presses, always the same for the same seed.
+    Args:
+        frames (int): The number of frames.
+        seed (int): The seed of the script.
+        press_rate (float): The chance that a button is pressed, every other frame.
+    Returns:
+        dict: The (x, y) coordinates of the button pressed, by frame. Each button is
+            released on the next frame.
+    """
+    rng = random.Random(seed)
+    script = {}
+    for frame in range(0, frames, 2):
+        if rng.random() < press_rate:
+            # mostly the bottom row and the right column, which most games use
+            y = 8 if rng.random() < 0.6 else rng.randint(1, 8)
+            x = rng.randint(0, 8)
+            script[frame] = (x, y)
+    return script
+
+
+def play(name, frames, seed, tick_rate=60):
+    """Plays a game headless on a VirtualLaunchpad for the given number of frames.
+    The game logic and the input are seeded, and a new game is started whenever the
+    previous one is over. The start countdown is skipped.
+    Args:
+        name (str): The name of the game, see GAMES.
+        frames (int): The number of frames to play, with one step each.
+        seed (int): The seed of the game and of its input script.
+        tick_rate (int): The number of steps per second of game time.
+    Returns:
+        tuple: The VirtualLaunchpad, the number of seconds spent in the game, and the
+            number of games played.
+    """
+    lp = VirtualLaunchpad()
+    lp.Open()
+    game = load_game(name)(lp=lp)
+    script = input_script(frames, seed)
+    delta = 1 / tick_rate
+    games = 1
+    game.start_game(seed, countdown=False)
+    lp.reset_counters()
+    elapsed = 0
+    for frame in range(0, frames):
+        if frame in script:
+            lp.midi.push_event(button_message(*script[frame], True))
+        elif frame - 1 in script:
+            lp.midi.push_event(button_message(*script[frame - 1], False))
+        start = time.perf_counter()
+        game.update(read_events(lp), 1, delta)
+        game.paint()
+        if game.game_over:
+            game.process_game_over()
+            game.start_game(seed + games, countdown=False)
+            games += 1
+        elapsed += time.perf_counter() - start
+    return lp, elapsed, games
+
+
+def benchmark(name, frames=3600, seed=0, repeat=3):
+    """Benchmarks a game, see play.
+    The game is timed repeat times, keeping the fastest run, then played once more
+    to trace its memory, which slows it down. All the runs are identical, since they
+    use the same seed.
+    Returns:
+        dict: The steps per second, the MIDI messages and bytes per frame, the peak
+            memory allocated while playing in bytes and the number of games played.
+    """
+    lp, elapsed, games = play(name, frames, seed)
+    for i in range(1, repeat):
+        elapsed = min(elapsed, play(name, frames, seed)[1])
+    tracemalloc.start()
+    play(name, frames, seed)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "steps_per_second": frames / elapsed,
+        "messages_per_frame": lp.messages / frames,
+        "bytes_per_frame": lp.bytes_sent / frames,
+        "peak_memory": peak,
+        "games": games,
+    }
+
+
+def regressions(results, baseline, tolerance=0.15):
+    """Compares results with a baseline.
+    Args:
+        results (dict): The results of benchmark, by game.
+        baseline (dict): The baseline results, by game.
+        tolerance (float): How much worse than the baseline a metric may get, as a
+            fraction of the baseline value.
+    Returns:
+        list: A message for every metric that got worse.
+    """
+    found = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            new = result[metric]
+            old = baseline[name].get(metric)
+            if not old:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > tolerance:
+                found.append(
+                    name
+                    + ": "
+                    + metric
+                    + " went from "
+                    + str(round(old, 2))
+                    + " to "
+                    + str(round(new, 2))
+                    + " ("
+                    + str(round(change * 100, 1))
+                    + "%)"
+                )
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Runs every game headless with scripted input."
+    )
+    parser.add_argument("games", nargs="*", default=list(GAMES))
+    parser.add_argument("--frames", type=int, default=3600)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default="benchmark_baseline.json")
+    parser.add_argument(
+        "--save", action="store_true", help="Save the results as the new baseline."
+    )
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.games:
+        results[name] = benchmark(name, args.frames, args.seed, args.repeat)
+        result = results[name]
+        print(
+            name.ljust(16)
+            + str(round(result["steps_per_second"])).rjust(8)
+            + " steps/s"
+            + str(round(result["messages_per_frame"], 2)).rjust(8)
+            + " msgs/frame"
+            + str(round(result["bytes_per_frame"], 1)).rjust(8)
+            + " bytes/frame"
+            + str(round(result["peak_memory"] / 1024)).rjust(8)
+            + " KiB peak"
+        )
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print("Saved the baseline to " + args.baseline)
+        return 0
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        # a missing baseline fails the check, rather than passing it unchecked
+        print("No baseline at " + args.baseline + ", run with --save first")
+        return 2
+    found = regressions(results, baseline, args.tolerance)
+    for regression in found:
+        print("REGRESSION " + regression)
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    # the games log every point and game over at the info level
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(main())
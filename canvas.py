@@ -0,0 +1,208 @@
+import logging
+import threading
+import time
+from ledwriter import LedWriter, led_index
+
+# Seconds a pad waits for the other pads before flipping its buffers on its own.
+SYNC_TIMEOUT = 1
+
+
+class PadWriter(threading.Thread):
+    """Writes the frames of one Launchpad of a TiledCanvas, on its own thread.
+    Every frame is written into the hidden buffer of the device, then the writer
+    waits for the writers of the other Launchpads before flipping the buffers, so
+    all the pads show the new frame at the same time.
+    """
+
+    def __init__(self, writer, barrier, name, clock=time.monotonic):
+        """Initializes a PadWriter object.
+        Args:
+            writer (LedWriter): The writer of the Launchpad.
+            barrier (threading.Barrier): Barrier shared by the writers of the canvas.
+            name (str): The name of the thread.
+            clock (callable): Monotonic clock used for the stats, in seconds.
+        """
+        super().__init__(name=name, daemon=True)
+        self.writer = writer
+        self.barrier = barrier
+        self.clock = clock
+        self.changes = []
+        self.pending = threading.Event()
+        self.done = threading.Event()
+        self.stopped = False
+        self.frames = 0
+        self.errors = 0
+        self.busy_time = 0
+        self.started_at = clock()
+
+    def submit(self, changes):
+        """Hands a frame to the thread, see LedWriter.push."""
+        self.done.clear()
+        self.changes = changes
+        self.pending.set()
+
+    def run(self):
+        while True:
+            self.pending.wait()
+            self.pending.clear()
+            if self.stopped:
+                break
+            start = self.clock()
+            try:
+                self.write()
+            finally:
+                self.busy_time += self.clock() - start
+                self.frames += 1
+                self.done.set()
+
+    def write(self):
+        """Writes the frame and flips the buffers together with the other pads."""
+        try:
+            self.writer.push(self.changes, show=False)
+        except Exception as e:
+            # the other pads still show their part of the frame
+            self.errors += 1
+            logging.error("Frame failed on " + self.name + ": " + repr(e))
+        try:
+            self.barrier.wait()
+        except threading.BrokenBarrierError:
+            # the barrier is reset by TiledCanvas.push once all the pads are done
+            logging.warning("Pads out of sync, " + self.name + " flips on its own")
+        if self.writer.frame_messages and self.writer.buffering:
+            self.writer.flip()
+
+    def stop(self):
+        """Stops the thread and waits for it to finish."""
+        self.stopped = True
+        self.pending.set()
+        if self.is_alive():
+            self.join()
+
+    def stats(self):
+        """Returns the output stats of the Launchpad.
+        Returns:
+            dict: The number of frames, the number of them that failed, the MIDI
+                messages and bytes sent, the time spent writing in seconds and the
+                average throughput in bytes per second.
+        """
+        elapsed = self.clock() - self.started_at
+        return {
+            "frames": self.frames,
+            "errors": self.errors,
+            "messages": self.writer.total_messages,
+            "bytes": self.writer.total_bytes,
+            "busy_time": self.busy_time,
+            "bytes_per_second": self.writer.total_bytes / elapsed if elapsed else 0,
+        }
+
+
+class TiledCanvas:
+    """A display made of a grid of Launchpads, e.g. 2x2 pads as a 16x16 grid.
+    It can be used instead of a LedWriter by a LaunchGame (see its writer argument),
+    with the same coordinates as a single, bigger Launchpad: the top row spans the
+    top row of the top pads and the right column the right column of the right pads.
+    Each Launchpad is written by its own PadWriter thread, so a frame is sent to all
+    of them in parallel.
+    """
+
+    def __init__(self, pads, columns: int = 1, double_buffer: bool = True):
+        """Initializes a TiledCanvas object.
+        Args:
+            pads (list): The Launchpad objects, row by row from the top left one.
+            columns (int): The number of Launchpads in a row.
+            double_buffer (bool): Whether or not to use double buffering if the
+                devices support it. Without it, the pads can't be synchronized.
+        """
+        if len(pads) % columns:
+            raise ValueError(
+                "The pads don't fill a grid of " + str(columns) + " columns"
+            )
+        self.pads = pads
+        # the input is read from the top left Launchpad
+        self.lp = pads[0]
+        self.columns = columns
+        self.rows = len(pads) // columns
+        self.width = 8 * columns
+        self.height = 8 * self.rows
+        self.frame_bytes = 0
+        self.writers = [LedWriter(lp, double_buffer) for lp in pads]
+        self.barrier = threading.Barrier(len(pads), timeout=SYNC_TIMEOUT)
+        self.threads = [
+            PadWriter(writer, self.barrier, "PadWriter-" + str(i))
+            for i, writer in enumerate(self.writers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def locate(self, x, y):
+        """Returns the pad number and the LED index on that pad of the given LED.
+        Args:
+            x (int): The x coordinate of the LED, on the whole canvas (width is the right column).
+            y (int): The y coordinate of the LED, on the whole canvas (0 is the top row).
+        """
+        if x < self.width:
+            column, x = divmod(x, 8)
+        else:
+            column, x = self.columns - 1, 8
+        if y == 0:
+            row = 0
+        else:
+            row, y = divmod(y - 1, 8)
+            y += 1
+        return row * self.columns + column, led_index(x, y)
+
+    def push(self, changes):
+        """Sends a frame to all the Launchpads and waits until it is shown.
+        Args:
+            changes (iterable): (index, velocity) pairs of the LEDs to change, where
+                the index of LED (x, y) is y * (width + 1) + x.
+        Returns:
+            int: The number of MIDI bytes sent for this frame.
+        """
+        frames = [[] for _ in self.pads]
+        stride = self.width + 1
+        for index, velocity in changes:
+            pad, i = self.locate(index % stride, index // stride)
+            frames[pad].append((i, velocity))
+        sent = self.total_bytes
+        for thread, frame in zip(self.threads, frames):
+            thread.submit(frame)
+        for thread in self.threads:
+            thread.done.wait()
+        if self.barrier.broken:
+            # no pad is waiting on it now, so the next frame is in sync again
+            self.barrier.reset()
+        self.frame_bytes = self.total_bytes - sent
+        return self.frame_bytes
+
+    def write_now(self, x, y, r, g):
+        """Changes a single LED immediately, see LedWriter.write_now."""
+        if x < 0 or x > self.width or y < 0 or y > self.height:
+            return
+        pad, index = self.locate(x, y)
+        y, x = divmod(index, 9)
+        self.writers[pad].write_now(x, y, r, g)
+
+    def all_on(self, colorcode=None):
+        """Turns all LEDs on, or off if colorcode is 0, see LedWriter.all_on."""
+        for writer in self.writers:
+            writer.all_on(colorcode)
+
+    @property
+    def total_messages(self):
+        return sum(writer.total_messages for writer in self.writers)
+
+    @property
+    def total_bytes(self):
+        """The number of MIDI bytes sent to all the Launchpads."""
+        return sum(writer.total_bytes for writer in self.writers)
+
+    def stats(self):
+        """Returns the output stats of every Launchpad, see PadWriter.stats."""
+        return [thread.stats() for thread in self.threads]
+
+    def close(self):
+        """Stops the writer threads."""
+        for thread in self.threads:
+            thread.stop()
+        logging.debug("Canvas stats: " + str(self.stats()))
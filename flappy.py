@@ -1,60 +1,84 @@
-import random
-from launchgame import LaunchGame
+from launchgame import LaunchGame, ScrollingWorld, Sprite
+from ledwriter import led_color
 import logging
 
+# columns from one tube to the next
+TUBE_SPACING = 3
+TUBE_COLOR = led_color(3, 0)
+
+
+def tube_column(top, gap, height):
+    """Returns the column of a tube.
+    Args:
+        top (int): The top row of the gap.
+        gap (int): The height of the gap.
+        height (int): The height of the board.
+    """
+    return bytes(0 if top <= i < top + gap else TUBE_COLOR for i in range(0, height))
+
 
 class FlappyBird(LaunchGame):
     """Basic implementation of Flappy Bird."""
 
-    def __init__(self):
-        super().__init__("Flappy Bird", 1)
+    # seconds it takes the tubes to move one column, before it speeds up
+    TUBE_INTERVAL = 0.35
+    # seconds it takes the bird to fall one row
+    FALL_INTERVAL = 0.25
+
+    def __init__(self, lp=None, writer=None):
+        super().__init__("Flappy Bird", 1, lp=lp, writer=writer)
         self.reset()
 
     def reset(self):
         super().reset()
-        self.y = 3
-        self.tubes = [[8, 3], [11, 3], [14, 3]]
+        self.y = self.height // 2 - 1
+        # the gap of the tubes, 3 LEDs on a single Launchpad
+        self.gap = max(3, self.height * 3 // 8)
         self.timer1 = 0
         self.timer2 = 0
+        self.bird = self.compositor.add(Sprite([1], 0, 3, x=1, y=self.y), z=1)
+        self.world = ScrollingWorld(self.new_column, self.width, self.height)
 
-    def step(self, evt, delta):
-        if evt != [] and evt[0][2] > 0 and self.y > 0:
-            self.y -= 1
+    def new_column(self, n):
+        """Returns the n-th column of the world: a tube every TUBE_SPACING columns,
+        from the first one off the board on. The first tubes are easy to pass.
+        """
+        if n < self.width or (n - self.width) % TUBE_SPACING:
+            return bytes(self.height)
+        if n < self.width + 3 * TUBE_SPACING:
+            return tube_column((self.height - self.gap) // 2, self.gap, self.height)
+        top = self.rng.randint(0, self.height - self.gap - 1)
+        return tube_column(top, self.gap, self.height)
 
-        if self.y > 7:
+    def step(self, events, delta):
+        for evt in events:
+            if evt.pressed and self.y > 0:
+                self.y -= 1
+
+        if self.y >= self.height:
             logging.info("Game over, you smashed into the ground!")
             self.game_over = True
             return
 
-        for t in self.tubes:
-            if t[0] == 1 and abs(self.y - t[1]) > 1:
-                logging.info("Game over, you hit a tube!")
-                self.game_over = True
-                return
+        if self.world.at(1, self.y):
+            logging.info("Game over, you hit a tube!")
+            self.game_over = True
+            return
 
         self.timer1 += delta
         self.timer2 += delta
-        if self.timer1 / 30000000 > 0.7 * (1 - self.scores[0] / 100):
-            for t in self.tubes:
-                if t[0] == 0:
-                    t[0] = 8
-                    t[1] = random.randint(1, 5)
-                elif t[0] == 1:
-                    self.increase_score(1)
-                    t[0] -= 1
-                else:
-                    t[0] -= 1
+        if self.timer1 > self.TUBE_INTERVAL * (1 - self.scores[0] / 100):
+            if any(self.world.line(1)):
+                self.increase_score(1)
+            self.world.scroll()
             self.timer1 = 0
-        if self.timer2 / 30000000 > 0.5:
+        if self.timer2 > self.FALL_INTERVAL:
             self.y += 1
             self.timer2 = 0
 
-        self.paint_next(1, self.y, 0, 3)
-        for t in self.tubes:
-            for i in range(0, 8):
-                if not abs(i - t[1]) <= 1:
-                    self.paint_next(t[0], i, 3, 0)
+        self.bird.y = self.y
 
 
-game = FlappyBird()
-game.run()
+if __name__ == "__main__":
+    game = FlappyBird()
+    game.run()
@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import deque, namedtuple
+
+
+class ButtonEvent(namedtuple("ButtonEvent", ["time", "status", "note", "velocity"])):
+    """A button press or release read from the Launchpad.
+    Attributes:
+        time (float): When the event was read, on the monotonic clock, in seconds.
+        status (int): The MIDI status byte (144 for the grid, 176 for the top row).
+        note (int): The raw button number, as in evt[0][1] of Launchpad.EventRaw.
+        velocity (int): 0 if the button was released.
+    """
+
+    __slots__ = ()
+
+    @property
+    def pressed(self):
+        """Whether the button was pressed (and not released)."""
+        return self.velocity > 0
+
+
+def read_events(lp, clock=time.monotonic):
+    """Returns the events waiting on the given Launchpad, without blocking.
+    Args:
+        lp (Launchpad): The Launchpad object to read from.
+        clock (callable): Monotonic clock used to timestamp events, in seconds.
+    """
+    events = []
+    evt = lp.EventRaw()
+    while evt != []:
+        events.append(ButtonEvent(clock(), *evt[0][:3]))
+        evt = lp.EventRaw()
+    return events
+
+
+class InputReader(threading.Thread):
+    """Reads the Launchpad input in the background.
+    Every MIDI event is timestamped and queued as soon as it arrives, so presses
+    don't get lost or delayed while the game loop is busy or sleeping. The queue is
+    a deque, which can be appended to and popped from different threads without a lock.
+    On a real Launchpad the events are handed over by the rtmidi input callback, so
+    the reader costs nothing while there is no input. Devices without one, e.g. a
+    VirtualLaunchpad, are polled.
+    """
+
+    def __init__(self, lp, poll_interval: float = 0.001, clock=time.monotonic):
+        """Initializes an InputReader object.
+        Args:
+            lp (Launchpad): The Launchpad object to read from.
+            poll_interval (float): How long to sleep when there is no input, in seconds.
+            clock (callable): Monotonic clock used to timestamp events, in seconds.
+        """
+        super().__init__(name="InputReader", daemon=True)
+        self.lp = lp
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.queue = deque()
+        self.ready = threading.Event()
+        self.stopped = threading.Event()
+
+    def receive(self, message, data=None):
+        """Queues a MIDI message, called by rtmidi on its own thread."""
+        self.queue.append(ButtonEvent(self.clock(), *message[0][:3]))
+        self.ready.set()
+
+    def run(self):
+        device = getattr(getattr(self.lp, "midi", None), "devIn", None)
+        if hasattr(device, "set_callback"):
+            device.set_callback(self.receive)
+            self.stopped.wait()
+            device.cancel_callback()
+            return
+        while not self.stopped.is_set():
+            evt = self.lp.EventRaw()
+            if evt != []:
+                self.queue.append(ButtonEvent(self.clock(), *evt[0][:3]))
+                self.ready.set()
+            else:
+                time.sleep(self.poll_interval)
+
+    def stop(self):
+        """Stops reading and waits for the thread to finish."""
+        self.stopped.set()
+        if self.is_alive():
+            self.join()
+
+    def drain(self):
+        """Returns all the events read since the last call, oldest first."""
+        self.ready.clear()
+        events = []
+        while self.queue:
+            events.append(self.queue.popleft())
+        return events
+
+    def wait(self, timeout=None):
+        """Waits until there is input to drain.
+        Args:
+            timeout (float): The maximum time to wait, in seconds. None waits forever.
+        Returns:
+            bool: Whether there is input.
+        """
+        return self.ready.wait(timeout) or bool(self.queue)
+
+    def flush(self):
+        """Throws away all the input read so far.
+        The device itself isn't read: until the reader is started, its input belongs
+        to whoever reads it, e.g. a Launcher.
+        """
+        self.drain()
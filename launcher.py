@@ -0,0 +1,134 @@
+import sys
+import time
+import logging
+import importlib
+from arcade import Session
+from inputreader import read_events
+from ledwriter import AsyncLedWriter, LedWriter
+from scheduler import Scheduler
+
+# The games by name, as (module, class). They are only imported once they are played.
+GAMES = {
+    "tetris": ("tetris", "Tetris"),
+    "pong": ("pong", "Pong"),
+    "flappy": ("flappy", "FlappyBird"),
+    "space_invadors": ("space_invadors", "SpaceInvaders"),
+}
+
+# The top row buttons (control changes 104-111) select the games, in GAMES order.
+MENU_STATUS = 176
+MENU_FIRST_NOTE = 104
+
+
+def load_game(name):
+    """Imports the module of the given game and returns its class."""
+    module, cls = GAMES[name]
+    return getattr(importlib.import_module(module), cls)
+
+
+class Launcher:
+    """Plays all the games on a single Launchpad, switching between them on the pad.
+    The Launchpad is opened once and every game is created the first time it is
+    selected and then kept, so switching games only resets the pad. Pressing the
+    n-th button of the top row starts the n-th game right away, even in the middle of
+    another one. Any other button starts the selected game again once it is over.
+    """
+
+    def __init__(self, lp=None, tick_rate: int = 60):
+        """Initializes a Launcher object.
+        Args:
+            lp (Launchpad): The Launchpad object to use, e.g. a VirtualLaunchpad.
+                If None, a new one will be created.
+            tick_rate (int): The number of game steps per second.
+        """
+        if lp is None:
+            # imported here, so that the games run without the MIDI system on a
+            # VirtualLaunchpad
+            import novation_launchpad
+
+            lp = novation_launchpad.Launchpad()
+            lp.Open()
+        self.lp = lp
+        # shared by all the games, so that the frames of a game that was just
+        # stopped can't be sent after the ones of the next game
+        self.writer = AsyncLedWriter(LedWriter(lp))
+        self.scheduler = Scheduler(tick_rate)
+        self.names = list(GAMES)[0:8]
+        self.games = {}
+        self.session = None
+        # whether the top row shows the menu, games use it as their score row
+        self.menu_shown = False
+
+    def game(self, name):
+        """Returns the game with the given name, creating it if needed."""
+        if name not in self.games:
+            # built on the shared writer, so that only its thread ever writes to the
+            # device
+            self.games[name] = load_game(name)(lp=self.lp, writer=self.writer)
+        return self.games[name]
+
+    def switch(self, name):
+        """Starts the game with the given name, stopping the current one."""
+        start = time.perf_counter()
+        self.session = Session(self.game(name))
+        self.session.game.start_game()
+        self.session.playing = True
+        logging.info(
+            "Switched to "
+            + name
+            + " in "
+            + str(round((time.perf_counter() - start) * 1000, 1))
+            + " ms"
+        )
+
+    def paint_menu(self, clear: bool = True):
+        """Lights the top row buttons that select a game.
+        Args:
+            clear (bool): Whether or not to turn all the other LEDs off first.
+        """
+        if clear:
+            self.writer.all_on(0)
+        for i in range(0, 8):
+            self.writer.write_now(i, 0, 0, 3 if i < len(self.names) else 0)
+        self.menu_shown = True
+
+    def update(self, steps):
+        """Handles the input and advances the current game by the given number of ticks."""
+        events = []
+        for evt in read_events(self.lp, self.scheduler.clock):
+            selected = evt.note - MENU_FIRST_NOTE
+            if evt.status == MENU_STATUS and 0 <= selected < len(self.names):
+                if evt.pressed:
+                    self.switch(self.names[selected])
+                    events = []
+            else:
+                events.append(evt)
+        if self.session is not None:
+            self.session.update(events, steps, self.scheduler.tick)
+            if self.session.playing or self.session.game.timeline.animations:
+                self.menu_shown = False
+            elif not self.menu_shown:
+                # the game is over, the score row is the menu again
+                self.paint_menu(clear=False)
+
+    def run(self):
+        """Runs the launcher forever."""
+        if self.session is None:
+            logging.info("Press a top row button to pick a game: " + str(self.names))
+            self.paint_menu()
+        self.scheduler.start()
+        while True:
+            self.scheduler.wait()
+            steps = self.scheduler.steps()
+            if steps == 0:
+                continue
+            self.update(steps)
+            if self.session is not None and self.scheduler.should_render():
+                self.session.paint()
+
+
+if __name__ == "__main__":
+    launcher = Launcher()
+    if len(sys.argv) > 1:
+        launcher.switch(sys.argv[1])
+    launcher.run()
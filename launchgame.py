@@ -1,6 +1,333 @@
-import novation_launchpad
-import time
 import logging
+import random
+import copy
+from functools import lru_cache
+from animation import Timeline, countdown, marquee
+from inputreader import InputReader, read_events
+from profiler import FrameProfiler
+from ledwriter import AsyncLedWriter, LedWriter, led_color
+from scheduler import Scheduler
+
+
+@lru_cache(maxsize=4096)
+def sprite_mask(rows, x, y, width=8, height=8):
+    """Returns the bitmask of an image placed on the board.
+    Bit y * width + x of the mask is set for every lit LED, anything outside of the
+    board is clipped. Masks are cached, so moving a sprite back and forth is free.
+    Args:
+        rows (tuple): The bitmasks of the rows of the image, top to bottom (bit x is column x).
+        x (int): The x coordinate of the left side of the image.
+        y (int): The y coordinate of the top of the image.
+        width (int): The width of the board.
+        height (int): The height of the board.
+    """
+    mask = 0
+    full_row = (1 << width) - 1
+    for i, row in enumerate(rows):
+        if y + i < 0 or y + i >= height:
+            continue
+        row = (row << x if x >= 0 else row >> -x) & full_row
+        mask |= row << ((y + i) * width)
+    return mask
+
+
+@lru_cache(maxsize=512)
+def score_leds(score, player, width=8):
+    """Returns the LEDs showing the score of the given player.
+    The score of the first player is on the top row, where score % 9 and score // 9
+    each light one LED. The score of the second player is on the right column, where
+    they light a bar from the bottom up.
+    Args:
+        score (int): The score.
+        player (int): The player, 0 or 1.
+        width (int): The width of the board, the right column is at x == width.
+    Returns:
+        tuple: (x, y, lit) tuples for all 8 LEDs of the player, in the coordinates of
+            the whole device.
+    """
+    ones = score % 9 - 1
+    nines = score // 9 - 1
+    if player == 0:
+        return tuple((i, 0, ones == i or nines == i) for i in range(0, 8))
+    return tuple((width, i, ones >= 8 - i or nines >= 8 - i) for i in range(1, 9))
+
+
+class Sprite:
+    """A pre-rasterized single color image, which games move around instead of
+    painting it pixel by pixel. Sprites are drawn by a Compositor.
+    """
+
+    def __init__(self, rows, r, g, x=0, y=0, visible=True):
+        """Initializes a Sprite object.
+        Args:
+            rows (iterable): The bitmasks of the rows of the image, top to bottom (bit x is column x).
+            r (int): The red value of the sprite.
+            g (int): The green value of the sprite.
+            x (int): The x coordinate of the left side of the sprite.
+            y (int): The y coordinate of the top of the sprite.
+            visible (bool): Whether or not the sprite is drawn.
+        """
+        self.rows = tuple(rows)
+        self.color = (r, g)
+        self.x = x
+        self.y = y
+        self.visible = visible
+
+    def mask(self, width=8, height=8):
+        """Returns the bitmask of the sprite at its current position, see sprite_mask."""
+        return sprite_mask(self.rows, self.x, self.y, width, height)
+
+
+class Compositor:
+    """Sprites on z-ordered layers, flattened into a frame.
+    Higher layers are drawn over lower ones, and within a layer the sprites added
+    last are on top.
+    """
+
+    def __init__(self, width=8, height=8):
+        self.width = width
+        self.height = height
+        self.layers = {}
+
+    def add(self, sprite, z=0):
+        """Adds the given sprite on layer z and returns it."""
+        self.layers.setdefault(z, []).append(sprite)
+        return sprite
+
+    def remove(self, sprite):
+        for z, sprites in list(self.layers.items()):
+            if sprite in sprites:
+                sprites.remove(sprite)
+                if not sprites:
+                    del self.layers[z]
+
+    def clear(self):
+        self.layers = {}
+
+    def flatten(self):
+        """Flattens the layers.
+        Every sprite is a single mask of the whole board, so hiding what is below it and merging it
+        with the other sprites of the same color is one operation for the whole board.
+        Returns:
+            tuple: A dict of masks by (r, g) color, and the mask of all LEDs drawn.
+        """
+        colors = {}
+        covered = 0
+        for z in sorted(self.layers, reverse=True):
+            for sprite in reversed(self.layers[z]):
+                if not sprite.visible:
+                    continue
+                mask = sprite.mask(self.width, self.height) & ~covered
+                if mask:
+                    colors[sprite.color] = colors.get(sprite.color, 0) | mask
+                    covered |= mask
+        return colors, covered
+
+
+class ScrollingWorld:
+    """An endless playfield scrolling over the board one line at a time, e.g. the
+    level of a side scroller. A line is a column of the board, or a row if the world
+    scrolls vertically.
+    The lines are kept in a ring buffer, the visible ones plus a few ahead of them,
+    and a scroll only produces the newly exposed line, in place of the one that just
+    left the board. A world is drawn by LaunchGame.paint when it is set as
+    self.world, so the scroll only costs the LEDs that changed, however long the
+    world is.
+    """
+
+    def __init__(self, produce, width=8, height=8, vertical=False, ahead=1):
+        """Initializes a ScrollingWorld object and produces its first lines.
+        Args:
+            produce (callable): Returns the n-th line of the world, given n, as the
+                velocities of its LEDs (see led_color), top to bottom or left to right.
+                It is called once per line, in order, so it can draw from the random
+                generator of the game.
+            width (int): The width of the board.
+            height (int): The height of the board.
+            vertical (bool): Whether the world scrolls down, with the new rows coming
+                in at the top, or left, with the new columns coming in on the right.
+            ahead (int): The number of lines produced before they are visible.
+        """
+        self.produce = produce
+        self.width = width
+        self.height = height
+        self.vertical = vertical
+        self.visible = height if vertical else width
+        self.size = self.visible + ahead
+        self.produced = 0
+        self.head = 0
+        self.lines = [self.next_line() for i in range(self.size)]
+
+    def next_line(self):
+        line = bytes(self.produce(self.produced))
+        if len(line) != (self.width if self.vertical else self.height):
+            raise ValueError("Line " + str(self.produced) + " has the wrong length")
+        self.produced += 1
+        return line
+
+    def scroll(self):
+        """Scrolls the world by one line."""
+        self.lines[self.head] = self.next_line()
+        self.head = (self.head + 1) % self.size
+
+    def line(self, i):
+        """Returns the i-th line from the edge where the lines leave the board: the
+        left column or the bottom row. Lines from self.visible on are ahead of it.
+        """
+        return self.lines[(self.head + i) % self.size]
+
+    def at(self, x, y):
+        """Returns the velocity of the given LED of the board."""
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+            return 0
+        if self.vertical:
+            return self.line(self.height - 1 - y)[x]
+        return self.line(x)[y]
+
+    def draw(self, frame, stride):
+        """Draws the visible lines on the given framebuffer, see LaunchGame.paint."""
+        for i in range(self.visible):
+            line = self.lines[(self.head + i) % self.size]
+            if self.vertical:
+                # +1 because the first row is the score
+                start = (self.height - i) * stride
+                frame[start : start + self.width] = line
+            else:
+                frame[stride + i : (self.height + 1) * stride : stride] = line
+
+
+def dither_level(level, error):
+    """Returns the level of the Launchpad (0-3) around the given fractional level
+    that brings the given error closest to 0, see Dither.
+    """
+    low = int(level)
+    if low < level and level - low + error >= 0.5:
+        return low + 1
+    return low
+
+
+class Dither:
+    """Temporal dithering of the LEDs painted with LaunchGame.paint_fine.
+    The Launchpad only has 4 levels of red and green, so an LED with an in-between
+    level is flickered between the two levels around it. Every LED keeps the error
+    between the levels it was painted with and the ones it showed, and shows the
+    level that brings that error back towards 0, so its mean level is right even
+    when it had to wait to be sent. Every LED starts at a different point of a cycle
+    of frames, so that the flicker doesn't add up over the board.
+    Only the LEDs that change level are sent, and at most budget of them per frame,
+    going round the LEDs from the one after the last LED sent in the previous frame.
+    The frames must be painted fast enough for the flicker not to show: if the
+    paint rate measured over every window of seconds is under min_cycle_rate cycles
+    per second, or if the writer drops frames because the link can't keep up (see
+    AsyncLedWriter), dithering is turned off and the levels are just rounded.
+    """
+
+    def __init__(
+        self,
+        cycle: int = 4,
+        budget: int = 8,
+        min_cycle_rate: float = 50,
+        window: float = 1,
+    ):
+        """Initializes a Dither object.
+        Args:
+            cycle (int): The number of frames of a cycle, 4 shows 3 more levels
+                between each of the levels of the Launchpad.
+            budget (int): The maximum number of dithered LEDs sent per frame.
+            min_cycle_rate (float): The minimum number of cycles per second.
+            window (float): The number of seconds the paint rate is measured over.
+        """
+        self.cycle = cycle
+        self.budget = budget
+        self.min_cycle_rate = min_cycle_rate
+        self.window = window
+        # the starting errors of the LEDs, in van der Corput order so that the
+        # LEDs next to each other start at different points of the cycle
+        self.thresholds = []
+        for k in range(0, cycle):
+            threshold, base, n = 0, 0.5, k
+            while n:
+                threshold += base * (n & 1)
+                base /= 2
+                n >>= 1
+            self.thresholds.append(threshold + 0.5 / cycle - 0.5)
+        # the (r, g) errors of the dithered LEDs by LED index
+        self.errors = {}
+        # position of the LED the budget goes to first
+        self.start = 0
+        self.active = True
+        self.window_start = None
+        self.frames = 0
+        self.dropped_frames = 0
+
+    def measure(self, now, writer):
+        """Counts a frame and turns dithering off if the frames are too slow.
+        Args:
+            now (float): The time of the frame, in seconds.
+            writer (LedWriter): The writer of the game.
+        """
+        dropped_frames = getattr(writer, "dropped_frames", 0)
+        if self.window_start is None:
+            self.window_start = now
+            self.frames = 0
+            self.dropped_frames = dropped_frames
+            return
+        self.frames += 1
+        elapsed = now - self.window_start
+        if elapsed < self.window:
+            return
+        cycle_rate = self.frames / elapsed / self.cycle
+        dropped = dropped_frames - self.dropped_frames
+        if cycle_rate < self.min_cycle_rate or dropped * 10 > self.frames:
+            self.active = False
+            logging.info(
+                "Dithering off: "
+                + str(round(cycle_rate, 1))
+                + " cycles per second, "
+                + str(dropped)
+                + " of "
+                + str(self.frames)
+                + " frames dropped"
+            )
+        self.window_start = None
+
+    def dither(self, leds, frame, shown):
+        """Draws the dithered LEDs of the next frame.
+        Args:
+            leds (dict): The (r, g) levels, from 0 to 3, by LED index.
+            frame (bytearray): The framebuffer to draw on.
+            shown (bytearray): The framebuffer of the last frame sent.
+        """
+        thresholds = self.thresholds
+        cycle = self.cycle
+        errors = self.errors
+        next_errors = {}
+        budget = self.budget
+        items = list(leds.items())
+        count = len(items)
+        start = self.start % count if count else 0
+        # an LED waits at most about count / budget frames to be sent, so its error
+        # stays within that many levels unless something else is drawn over it
+        limit = 1 + count / max(budget, 1)
+        for k in range(start, start + count):
+            i, (r, g) = items[k % count]
+            if i in errors:
+                error_r, error_g = errors[i]
+            else:
+                error_r = error_g = thresholds[i % cycle]
+            velocity = led_color(dither_level(r, error_r), dither_level(g, error_g))
+            if velocity != shown[i]:
+                if budget == 0:
+                    # over budget, the LED changes in a later frame
+                    velocity = shown[i]
+                else:
+                    budget -= 1
+                    self.start = k + 1
+            frame[i] = velocity
+            error_r = max(min(error_r + r - (velocity & 3), limit), -limit)
+            error_g = max(min(error_g + g - (velocity >> 4 & 3), limit), -limit)
+            next_errors[i] = (error_r, error_g)
+        self.errors = next_errors
 
 
 class LaunchGame:
@@ -10,26 +337,78 @@ class LaunchGame:
     and running the game loop.
     """
 
+    # seconds without input before the game starts playing itself (see run_attract),
+    # None if the game has no autopilot
+    ATTRACT_DELAY = None
+    # attributes that aren't part of the state of the game, see snapshot
+    NOT_SNAPSHOTTED = (
+        "lp",
+        "writer",
+        "scheduler",
+        "input",
+        "profiler",
+        "recorder",
+        "prev_state",
+        "frame_buffer",
+        "dither",
+        "frame_leds",
+        "frame_bytes",
+    )
+
     def __init__(
         self,
         game_name: str = "Launchpad Game",
         num_players: int = 1,
-        lp: novation_launchpad.Launchpad = None,
+        lp=None,
         has_high_score: bool = True,
         cumulative_score: bool = False,
+        tick_rate: int = 60,
+        writer=None,
     ):
         """Initializes a LaunchGame object.
         Args:
             game_name (str): The name of the game.
             num_players (int): The number of players.
-            lp (Launchpad): The Launchpad object to use. If None, a new one will be created.
+            lp (Launchpad): The Launchpad object to use, e.g. a VirtualLaunchpad.
+                If None, a new one will be created.
             has_high_score (bool): Whether or not the game should be displayed.
             cumulative_score (bool): Whether or not the score should be shown as a cumulative.
+            tick_rate (int): The number of game steps per second.
+            writer (LedWriter): The writer the frames are sent to, e.g. a TiledCanvas
+                to play on several Launchpads. If None, one writing to lp is created.
         """
+        if lp is None and writer is not None:
+            lp = writer.lp
         if lp is None:
-            self.lp = novation_launchpad.Launchpad()
-            self.lp.Open()
-        self.lp.ButtonFlush()
+            # imported here, so that the games run without the MIDI system on a
+            # VirtualLaunchpad
+            import novation_launchpad
+
+            lp = novation_launchpad.Launchpad()
+            lp.Open()
+        self.lp = lp
+        self.writer = writer if writer is not None else LedWriter(self.lp)
+        # size of the board, without the score row and column
+        self.width = self.writer.width
+        self.height = self.writer.height
+        self.scheduler = Scheduler(tick_rate)
+        self.input = InputReader(self.lp)
+        self.timeline = Timeline()
+        self.compositor = Compositor(self.width, self.height)
+        # the ScrollingWorld drawn under the sprites, if any
+        self.world = None
+        # (r, g) levels painted with paint_fine by LED index, and the Dither showing
+        # them, if any
+        self.fine_state = {}
+        self.dither = None
+        # games must only draw from self.rng, so that they can be replayed
+        self.rng = random.Random()
+        self.seed = None
+        # Recorder of the ticks, if the games are being recorded
+        self.recorder = None
+        self.profiler = FrameProfiler()
+        self.frame_leds = 0
+        self.frame_bytes = 0
         self.name = game_name
         self.num_players = num_players
         self.scores = [0] * num_players
@@ -37,9 +416,19 @@ class LaunchGame:
         self.cumulative_score = cumulative_score
         self.high_scores = [0] * num_players
         self.game_over = False
+        # whether the game is playing itself, the games check it in their step
+        self.autopilot = False
 
-        self.prev_state = set()
-        self.next_state = set()
+        # framebuffers of the whole device, with the velocity of every LED numbered
+        # like led_index on a board of any width: the LEDs painted by the game, the
+        # frame being composed and the last frame sent, which are swapped by paint
+        self.blank = bytes((self.width + 1) * (self.height + 1))
+        self.next_state = bytearray(self.blank)
+        self.frame_buffer = bytearray(self.blank)
+        self.prev_state = bytearray(self.blank)
+        # velocities of the LEDs of the score row and column by LED index, they stay
+        # until changed
+        self.hud = {}
 
     def reset(self):
         """Resets the game.
@@ -47,10 +436,15 @@ class LaunchGame:
         """
         self.scores = [0] * self.num_players
         self.game_over = False
-        self.lp.LedAllOn(0)
-        self.lp.ButtonFlush()
-        self.prev_state = set()
-        self.next_state = set()
+        self.writer.all_on(0)
+        self.input.flush()
+        self.timeline.clear()
+        self.compositor.clear()
+        self.world = None
+        self.prev_state[:] = self.blank
+        self.next_state[:] = self.blank
+        self.fine_state = {}
+        self.hud = {}
 
     def paint_next(self, x, y, r, g):
         """Paints the given LED on the next frame.
@@ -62,58 +456,124 @@ class LaunchGame:
             r (int): The red value of the LED.
             g (int): The green value of the LED.
         """
-        if y >= 0 and y < 8 and x >= 0 and x < 8:
-            self.next_state.add(
-                (x, y + 1, r, g)  # +1 because the first row is the score
-            )
+        if y >= 0 and y < self.height and x >= 0 and x < self.width:
+            # +1 because the first row is the score
+            self.next_state[(y + 1) * (self.width + 1) + x] = led_color(r, g)
+
+    def paint_fine(self, x, y, r, g):
+        """Paints the given LED on the next frame, with a level between the 4 levels
+        of the Launchpad, e.g. for fades. The levels are dithered if self.dither is
+        set (see Dither), and rounded otherwise.
+        Args:
+            x (int): The x coordinate of the LED.
+            y (int): The y coordinate of the LED.
+            r (float): The red level of the LED, from 0 to 3.
+            g (float): The green level of the LED, from 0 to 3.
+        """
+        if y >= 0 and y < self.height and x >= 0 and x < self.width:
+            self.fine_state[(y + 1) * (self.width + 1) + x] = (r, g)
+
+    def enable_dithering(self, cycle=4, budget=8):
+        """Dithers the LEDs painted with paint_fine, see Dither.
+        The game should run at a tick rate of at least 50 * cycle, or dithering is
+        turned off after the first second.
+        """
+        self.dither = Dither(cycle, budget)
+
+    def paint_hud(self, x, y, r, g):
+        """Paints the given LED of the score row or column on the next frames.
+        Unlike paint_next, the LED stays until it is painted again or the game is reset.
+        The top right corner has no LED, like for LedCtrlXY it is ignored.
+        Args:
+            x (int): The x coordinate of the LED, on the whole device (8 is the right column).
+            y (int): The y coordinate of the LED, on the whole device (0 is the score row).
+            r (int): The red value of the LED.
+            g (int): The green value of the LED.
+        """
+        if x == self.width and y == 0:
+            return
+        if y >= 0 and y <= self.height and x >= 0 and x <= self.width:
+            self.hud[y * (self.width + 1) + x] = led_color(r, g)
 
     def paint(self):
-        """Paints the next frame."""
-        to_unpaint = self.prev_state.difference(self.next_state)
-        for led in to_unpaint:
-            self.lp.LedCtrlXY(led[0], led[1], 0, 0)
-        to_paint = self.next_state.difference(self.prev_state)
-        for led in to_paint:
-            self.lp.LedCtrlXY(led[0], led[1], led[2], led[3])
-        self.prev_state = self.next_state.copy()
-        self.next_state.clear()
+        """Paints the next frame.
+        The LEDs painted with paint_next and paint_fine are copied to a framebuffer,
+        then the world (see ScrollingWorld) over them, its empty LEDs included, then
+        the sprites, the animations over everything, and the score row and column
+        painted with paint_hud next to them. The LEDs that differ from the last frame
+        are found by XORing the two framebuffers as integers, and sent as a single
+        frame, see LedWriter.push.
+        The number of LEDs changed is stored in frame_leds and the number of MIDI bytes
+        sent in frame_bytes.
+        """
+        frame = self.frame_buffer
+        frame[:] = self.next_state
+        width = self.width
+        height = self.height
+        # LEDs are numbered like led_index, on a board of any width
+        stride = width + 1
+        dither = self.dither
+        if dither is not None and dither.active:
+            dither.measure(self.scheduler.clock(), self.writer)
+        if self.fine_state:
+            if dither is not None and dither.active:
+                dither.dither(self.fine_state, frame, self.prev_state)
+            else:
+                for i, (r, g) in self.fine_state.items():
+                    frame[i] = led_color(round(r), round(g))
+        if self.world is not None:
+            self.world.draw(frame, stride)
+        if self.compositor.layers:
+            for (r, g), mask in self.compositor.flatten()[0].items():
+                velocity = led_color(r, g)
+                while mask:
+                    bit = mask & -mask
+                    y, x = divmod(bit.bit_length() - 1, width)
+                    frame[(y + 1) * stride + x] = velocity
+                    mask ^= bit
+        if self.timeline.animations:
+            for (x, y), (r, g) in self.timeline.leds().items():
+                if y >= 0 and y < height and x >= 0 and x < width:
+                    frame[(y + 1) * stride + x] = led_color(r, g)
+        for i, velocity in self.hud.items():
+            frame[i] = velocity
+        changes = []
+        if frame != self.prev_state:
+            # a byte of diff is not 0 where the LED changed
+            diff = int.from_bytes(frame, "little") ^ int.from_bytes(
+                self.prev_state, "little"
+            )
+            while diff:
+                i = ((diff & -diff).bit_length() - 1) >> 3
+                changes.append((i, frame[i]))
+                diff &= ~(0xFF << (i << 3))
+        self.frame_leds = len(changes)
+        self.frame_bytes = self.writer.push(changes)
+        self.frame_buffer = self.prev_state
+        self.prev_state = frame
 
-    def paint_score(self):
-        """Paints the score on the board."""
-        score_1 = self.scores[0]
-        for i in range(0, 8):
-            if (score_1 % 9) - 1 == i or (score_1 // 9) - 1 == i:
-                self.lp.LedCtrlXY(i, 0, 3, 3)
-            elif not self.cumulative_score:
-                self.lp.LedCtrlXY(i, 0, 0, 0)
-        if self.num_players == 2:
-            score_2 = self.scores[1]
-            for i in range(1, 9):
-                if (score_2 % 9) - 1 >= (8 - i) or (score_2 // 9) - 1 >= (8 - i):
-                    self.lp.LedCtrlXY(8, i, 3, 3)
-                elif not self.cumulative_score:
-                    self.lp.LedCtrlXY(8, i, 0, 0)
+    def play(self, animation):
+        """Plays the given animation on top of the game, see Animation.
+        The animation is advanced by the game loop, so this returns immediately.
+        """
+        self.timeline.play(animation)
 
+    def paint_score(self):
+        """Paints the score on the board, see score_leds."""
         if self.num_players > 2:
             raise ValueError("Can only paint scores for 1 or 2 players")
+        for player in range(0, self.num_players):
+            for x, y, lit in score_leds(self.scores[player], player, self.width):
+                if lit:
+                    self.paint_hud(x, y, 3, 3)
+                elif not self.cumulative_score:
+                    self.paint_hud(x, y, 0, 0)
 
     def paint_high_score(self):
-        """Paints the high score on the board."""
-        for i in range(0, 8):
-            if (self.high_scores[0] % 9) - 1 == i or (
-                self.high_scores[0] // 9
-            ) - 1 == i:
-                self.lp.LedCtrlXY(i, 0, 0, 3)
-            else:
-                self.lp.LedCtrlXY(i, 0, 0, 0)
-        if self.num_players == 2:
-            for i in range(1, 9):
-                if (self.high_scores[1] % 9) - 1 >= (8 - i) or (
-                    self.high_scores[1] // 9
-                ) - 1 >= (8 - i):
-                    self.lp.LedCtrlXY(8, i, 0, 3)
-                else:
-                    self.lp.LedCtrlXY(8, i, 0, 0)
+        """Paints the high score on the board, see score_leds."""
+        for player in range(0, min(self.num_players, 2)):
+            for x, y, lit in score_leds(self.high_scores[player], player, self.width):
+                self.paint_hud(x, y, 0, 3 if lit else 0)
 
     def update_score(self, score, player=0):
         """Updates the score for the given player.
@@ -124,7 +584,7 @@ class LaunchGame:
             player (int): The player whose score should be updated.
         """
         self.scores[player] = score
-        if self.has_high_score:
+        if self.has_high_score and not self.autopilot:
             if score > self.high_scores[player]:
                 self.high_scores[player] = score
         self.paint_score()
@@ -138,57 +598,247 @@ class LaunchGame:
             player (int): The player whose score should be updated.
         """
         self.scores[player] += amount
-        if self.has_high_score:
+        if self.has_high_score and not self.autopilot:
             if self.scores[player] > self.high_scores[player]:
                 self.high_scores[player] = self.scores[player]
         self.paint_score()
 
-    def step(self, evt, delta):
+    def step(self, events, delta):
         """Steps the game forward.
         This method should be overridden by subclasses to implement the game logic.
         Args:
-            evt (list): The list of events from the Launchpad.
-            delta (int): The time since the last step, in nanoseconds.
+            events (list): The ButtonEvents read since the last step, oldest first.
+            delta (float): The time since the last step, in seconds. This is always
+                the tick length of the scheduler.
         """
         pass
 
     def animation_start_game(self):
-        """Animates the start of the game."""
-        if logging.getLogger().getEffectiveLevel() != logging.DEBUG:
-            for i in range(3):
-                logging.info("Game starting in " + str(3 - i))
-                self.lp.LedCtrlChar(str(3 - i), 3 - 1, i, 1)
-                time.sleep(1)
+        """Animates the start of the game.
+        The game logic is paused during the countdown.
+        """
+        logging.info("Game starting in 3")
+        self.play(countdown(3))
 
-        self.lp.LedAllOn(0)
+    def game_over_text(self):
+        """Returns the text scrolled across the board when the game is over."""
+        return "GAME OVER " + "-".join(str(score) for score in self.scores)
 
     def process_game_over(self):
-        """Is called when the game is over."""
+        """Is called when the game is over.
+        Scrolls game_over_text across the board, see marquee. The game loop keeps
+        painting the marquee until it is over or a button is pressed, see play_out.
+        """
         logging.info("Game over!")
-        self.lp.LedAllOn()
+        self.play(marquee(self.game_over_text(), 3, 0, self.width))
 
-    def run_game(self):
-        """Runs the game."""
+    def play_out(self):
+        """Paints the animations that are still playing, e.g. the game over marquee,
+        until they are over or a button is pressed, then clears the board.
+        """
+        self.scheduler.start()
+        while self.timeline.animations and not self.input.queue:
+            self.scheduler.wait()
+            steps = self.scheduler.steps()
+            if steps == 0:
+                continue
+            self.timeline.advance(steps * self.scheduler.tick)
+            if self.scheduler.should_render():
+                self.paint()
+        self.writer.all_on(0)
+        # the next frame is diffed against the cleared board
+        self.prev_state[:] = self.blank
+
+    def advance(self, events, delta):
+        """Advances the game by one tick.
+        The animations are advanced first. Unless one of them pauses the game, the
+        next frame is then cleared and the game is stepped, otherwise the input is
+        dropped and the previous frame stays.
+        Args:
+            events (list): The ButtonEvents read since the last tick, oldest first.
+            delta (float): The length of the tick, in seconds.
+        """
+        if self.recorder is not None:
+            self.recorder.tick(events, delta)
+        self.timeline.advance(delta)
+        if self.timeline.paused:
+            return
+        self.next_state[:] = self.blank
+        if self.fine_state:
+            self.fine_state.clear()
+        self.step(events, delta)
+
+    def start_game(self, seed=None, countdown=None):
+        """Starts a new game: resets it, plays the start animation and paints the scores.
+        Args:
+            seed (int): The seed of self.rng. If None, a random one is picked and
+                stored in self.seed, so that the game can be replayed.
+            countdown (bool): Whether or not to play the start animation. If None, it
+                is played unless debug logging is on.
+        """
+        if seed is None:
+            seed = random.getrandbits(32)
+        if countdown is None:
+            countdown = logging.getLogger().getEffectiveLevel() != logging.DEBUG
+        self.seed = seed
+        self.rng.seed(seed)
         self.reset()
-        self.animation_start_game()
-        prev_time = time.time_ns()
+        if countdown:
+            self.animation_start_game()
         self.paint_score()
         if self.has_high_score:
             self.paint_high_score()
-        while not self.game_over:
-            evt = self.lp.EventRaw()
-            delta = (time.time_ns() - prev_time) >> 2
-            self.step(evt, delta)
-            self.paint()
+        if self.recorder is not None:
+            self.recorder.start_game(seed, countdown)
+
+    def snapshot(self):
+        """Returns a copy of the state of the game, see restore.
+        Everything but NOT_SNAPSHOTTED is copied, including the random generator,
+        the animations and the next frame.
+        """
+        state = {
+            k: v for k, v in self.__dict__.items() if k not in self.NOT_SNAPSHOTTED
+        }
+        # references to the game itself, e.g. in the on_done of animations, are kept
+        return copy.deepcopy(state, {id(self): self})
+
+    def restore(self, snapshot):
+        """Puts the game back in the state of the given snapshot.
+        The next paint only sends what changed since the last frame that was shown.
+        """
+        self.__dict__.update(copy.deepcopy(snapshot, {id(self): self}))
 
-            prev_time = time.time_ns()
+    def update(self, events, steps, delta):
+        """Advances the game by the given number of ticks, until it is over.
+        Args:
+            events (list): The ButtonEvents read since the last update, oldest first.
+                They are all handled by the first tick.
+            steps (int): The number of ticks to advance.
+            delta (float): The length of a tick, in seconds.
+        """
+        for i in range(steps):
+            self.advance(events if i == 0 else [], delta)
+            if self.game_over:
+                break
+
+    def run_game(self):
+        """Runs the game.
+        The game is stepped at the tick rate of the scheduler, with all the input
+        that arrived since the previous tick.
+        If the steps can't keep up, frames are skipped rather than slowing the game down.
+        Every frame is recorded by the profiler, see FrameProfiler. With an
+        AsyncLedWriter, the MIDI messages and bytes of a frame are recorded once its
+        thread has sent it, see record_output.
+        """
+        self.start_game()
+        self.scheduler.start()
+        clock = self.scheduler.clock
+        asynchronous = isinstance(self.writer, AsyncLedWriter)
+        # time of the oldest input that hasn't been shown yet
+        input_time = None
+        while not self.game_over:
+            self.scheduler.wait()
+            steps = self.scheduler.steps()
+            if steps == 0:
+                continue
+            start = clock()
+            events = self.input.drain()
+            if events and input_time is None:
+                input_time = events[0].time
+            self.update(events, steps, self.scheduler.tick)
+            stepped = clock()
+            if self.scheduler.should_render():
+                messages = self.writer.total_messages
+                if asynchronous:
+                    self.writer.tag = self.profiler.index
+                self.paint()
+                painted = clock()
+                latency = 0
+                if input_time is not None:
+                    latency = painted - input_time
+                    input_time = None
+                messages = self.writer.total_messages - messages
+                nbytes = self.frame_bytes
+                if asynchronous:
+                    # recorded once the thread has sent the frame
+                    messages = nbytes = 0
+                self.profiler.record(
+                    start,
+                    steps,
+                    stepped - start,
+                    painted - stepped,
+                    self.frame_leds,
+                    messages,
+                    nbytes,
+                    latency,
+                )
+            else:
+                self.profiler.record(start, steps, stepped - start, 0, 0, 0, 0, 0)
+            if asynchronous:
+                self.record_output()
 
+        if asynchronous:
+            self.writer.flush(1)
+            self.record_output()
+            self.writer.tag = None
+        logging.debug("Frame stats: " + str(self.profiler.summary()))
+        if asynchronous:
+            logging.debug("Output stats: " + str(self.writer.stats()))
         self.process_game_over()
+        self.play_out()
+
+    def record_output(self):
+        """Records the MIDI messages and bytes of the frames the AsyncLedWriter sent
+        since the last call in the profiler, see FrameProfiler.record_output.
+        """
+        sent_frames = self.writer.sent_frames
+        while sent_frames:
+            self.profiler.record_output(*sent_frames.popleft())
+
+    def run_attract(self):
+        """Lets the game play itself until there is any input.
+        The game restarts whenever it is over, and the high score isn't updated.
+        """
+        logging.info("Attract mode, press any button to play")
+        self.autopilot = True
+        self.start_game()
+        self.scheduler.start()
+        while not self.input.queue:
+            self.scheduler.wait()
+            steps = self.scheduler.steps()
+            if steps == 0:
+                continue
+            self.update([], steps, self.scheduler.tick)
+            if self.game_over:
+                self.start_game()
+            elif self.scheduler.should_render():
+                self.paint()
+        self.autopilot = False
+        self.writer.all_on(0)
+
+    def use_async_output(self, writer=None):
+        """Sends the frames from a background thread, so that a slow Launchpad never
+        slows the game down, see AsyncLedWriter.
+        Args:
+            writer (AsyncLedWriter): The writer to use, e.g. one shared by the games
+                played on the same Launchpad. If None, the current writer is wrapped.
+        """
+        if writer is None:
+            if isinstance(self.writer, AsyncLedWriter):
+                return
+            writer = AsyncLedWriter(self.writer)
+        self.writer = writer
 
     def run(self):
-        self.lp.ButtonFlush()
+        self.use_async_output()
+        if not self.input.is_alive():
+            # the presses made before the game was run are thrown away
+            read_events(self.lp)
+            self.input.start()
+        self.input.flush()
         logging.info("Press any button to start")
         while True:
-            evt = self.lp.EventRaw()
-            if evt != [] and evt[0][2] > 0:
+            if not self.input.wait(self.ATTRACT_DELAY) and self.ATTRACT_DELAY:
+                self.run_attract()
+            if any(evt.pressed for evt in self.input.drain()):
                 self.run_game()
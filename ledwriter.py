@@ -0,0 +1,350 @@
+import logging
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+# LEDs are addressed by index y * 9 + x. Row y == 0 is the top (automap) row and
+# column x == 8 is the right (scene) column, like Launchpad.LedCtrlXY. Index 8, the
+# top right corner, has no LED.
+LED_COUNT = 81
+MESSAGE_BYTES = 3
+
+# Order in which the rapid update message (0x92) walks through the LEDs: the 8x8
+# grid left to right and top to bottom, then the right column, then the top row.
+RAPID_ORDER = (
+    [y * 9 + x for y in range(1, 9) for x in range(0, 8)]
+    + [y * 9 + 8 for y in range(1, 9)]
+    + [x for x in range(0, 8)]
+)
+# A rapid frame costs one home message plus one message per two LEDs, so it only
+# pays off when more LEDs changed than that.
+RAPID_THRESHOLD = len(RAPID_ORDER) // 2 + 1
+
+# Control change 0 with bit 5 set selects the double buffering mode.
+BUFFER_MODE = 0x20
+BUFFER_COPY = 0x10
+BUFFER_UPDATE = 0x04
+# Velocity flags writing a LED to both buffers at once ("normal use").
+BOTH_BUFFERS = 0x0C
+
+
+def led_index(x, y):
+    """Returns the LED index of the given coordinates."""
+    return y * 9 + x
+
+
+@lru_cache(maxsize=256)
+def led_color(red, green):
+    """Returns the velocity byte of the given color, like Launchpad.LedGetColor.
+    It is cached, since the games paint every LED of every frame with it.
+    Args:
+        red (int): The red value of the LED (0-3).
+        green (int): The green value of the LED (0-3).
+    """
+    red = max(min(int(red), 3), 0)
+    green = max(min(int(green), 3), 0)
+    return red | green << 4
+
+
+class LedWriter:
+    """Sends whole frames to a Launchpad.
+    On a Launchpad MINI (and other 2-color Launchpads) the frame is written into the
+    hidden buffer, using rapid updates when most of the LEDs changed, and then shown
+    at once by flipping the buffers. Other devices get one LedCtrlXY per changed LED.
+    """
+
+    def __init__(self, lp, double_buffer: bool = True):
+        """Initializes a LedWriter object.
+        Args:
+            lp (Launchpad): The Launchpad object to write to.
+            double_buffer (bool): Whether or not to use double buffering if the device supports it.
+        """
+        self.lp = lp
+        # size of the grid, without the top row and the right column
+        self.width = 8
+        self.height = 8
+        # only the Launchpad MINI (and other 2-color Launchpads) have rapid updates
+        self.rapid = hasattr(lp, "LedCtrlRawRapid")
+        self.double_buffer = double_buffer and self.rapid
+        self.buffering = False
+        self.update_buffer = 1
+        self.shadow = bytearray(LED_COUNT)
+        self.frame_messages = 0
+        self.frame_bytes = 0
+        self.total_messages = 0
+
+    def send(self, status, data1, data2):
+        """Sends a single raw MIDI message."""
+        self.lp.midi.RawWrite(status, data1, data2)
+        self.total_messages += 1
+
+    def send_led(self, index, velocity):
+        """Sends a single LED to the device."""
+        y, x = divmod(index, 9)
+        if not self.rapid:
+            self.lp.LedCtrlXY(x, y, velocity & 3, velocity >> 4 & 3)
+            self.total_messages += 1
+        elif y == 0:
+            self.send(176, 104 + x, velocity)
+        else:
+            self.send(144, (y - 1) << 4 | x, velocity)
+
+    def flip(self):
+        """Shows the buffer that was just written and copies it to the other buffer."""
+        displayed = self.update_buffer
+        self.update_buffer = 1 - displayed
+        self.send(
+            176, 0, BUFFER_MODE | BUFFER_COPY | self.update_buffer << 2 | displayed
+        )
+
+    def push(self, changes, show: bool = True):
+        """Sends a frame to the device.
+        Args:
+            changes (iterable): (index, velocity) pairs of the LEDs to change.
+            show (bool): Whether or not to flip the buffers right away. If not, the
+                frame is shown by calling flip once frame_messages is not 0.
+        Returns:
+            int: The number of MIDI bytes sent for this frame.
+        """
+        self.frame_messages = 0
+        self.frame_bytes = 0
+        shadow = self.shadow
+        pending = [(i, v) for i, v in changes if shadow[i] != v]
+        if not pending:
+            return 0
+        sent = self.total_messages
+
+        if self.double_buffer and not self.buffering:
+            # show buffer 0 and copy it to buffer 1, which is written from now on
+            self.update_buffer = 1
+            self.send(176, 0, BUFFER_MODE | BUFFER_COPY | BUFFER_UPDATE)
+            self.buffering = True
+
+        for i, v in pending:
+            shadow[i] = v
+        if self.rapid and len(pending) > RAPID_THRESHOLD:
+            self.send(176, 1, 0)  # rewind the rapid update cursor
+            for k in range(0, len(RAPID_ORDER), 2):
+                self.send(146, shadow[RAPID_ORDER[k]], shadow[RAPID_ORDER[k + 1]])
+        else:
+            for i, v in pending:
+                self.send_led(i, v)
+
+        if self.buffering and show:
+            self.flip()
+
+        self.frame_messages = self.total_messages - sent
+        self.frame_bytes = self.frame_messages * MESSAGE_BYTES
+        logging.debug(
+            "Frame: "
+            + str(len(pending))
+            + " LEDs, "
+            + str(self.frame_messages)
+            + " messages, "
+            + str(self.frame_bytes)
+            + " bytes"
+        )
+        return self.frame_bytes
+
+    def write_now(self, x, y, r, g):
+        """Changes a single LED immediately, on both buffers.
+        Args:
+            x (int): The x coordinate of the LED.
+            y (int): The y coordinate of the LED.
+            r (int): The red value of the LED.
+            g (int): The green value of the LED.
+        """
+        if x < 0 or x > 8 or y < 0 or y > 8 or (x == 8 and y == 0):
+            return
+        index = led_index(x, y)
+        velocity = led_color(r, g)
+        self.shadow[index] = velocity
+        if self.buffering:
+            velocity |= BOTH_BUFFERS
+        self.send_led(index, velocity)
+
+    @property
+    def total_bytes(self):
+        """The number of MIDI bytes sent since the writer was created."""
+        return self.total_messages * MESSAGE_BYTES
+
+    def all_on(self, colorcode=None):
+        """Turns all LEDs on, or off if colorcode is 0, like Launchpad.LedAllOn.
+        This also resets the device, so the buffers are back to normal.
+        """
+        self.lp.LedAllOn(colorcode)
+        self.total_messages += 1
+        self.buffering = False
+        fill = 0 if colorcode == 0 else led_color(3, 3)
+        for i in range(LED_COUNT):
+            self.shadow[i] = fill
+
+
+class AsyncLedWriter(threading.Thread):
+    """Sends the frames of a LedWriter (or a TiledCanvas) on a background thread.
+    push only hands the frame over and returns, so a slow MIDI link never holds up
+    the game loop. When frames come faster than the device takes them, the pending
+    changes are merged: the thread always sends the newest frame and the stale ones
+    in between are dropped, never queued.
+    """
+
+    def __init__(self, writer, clock=time.monotonic):
+        """Initializes an AsyncLedWriter object and starts its thread.
+        Args:
+            writer (LedWriter): The writer sending the frames to the device.
+            clock (callable): Monotonic clock used to measure the latency, in seconds.
+        """
+        super().__init__(name="AsyncLedWriter", daemon=True)
+        self.writer = writer
+        self.lp = writer.lp
+        self.width = writer.width
+        self.height = writer.height
+        self.clock = clock
+        self.condition = threading.Condition()
+        # changes of the frames that haven't been sent yet, by LED index
+        self.pending = {}
+        self.pending_since = None
+        # colorcode of an all_on that hasn't been sent yet, see all_on
+        self.reset_pending = False
+        self.reset_color = None
+        self.busy = False
+        self.stopped = False
+        # tag of the frames pushed from now on, e.g. their row in a FrameProfiler
+        self.tag = None
+        self.pending_tag = None
+        # (tag, messages, bytes) of the frames sent by the thread, for the frames
+        # pushed with a tag, see LaunchGame.run_game
+        self.sent_frames = deque(maxlen=4096)
+        self.sent_bytes = 0
+        self.frames = 0
+        self.frames_sent = 0
+        self.dropped_frames = 0
+        self.latency = 0
+        self.max_latency = 0
+        self.total_latency = 0
+        self.start()
+
+    def push(self, changes):
+        """Hands a frame over to the thread, see LedWriter.push.
+        Returns:
+            int: The number of MIDI bytes sent by the thread since the last push.
+        """
+        with self.condition:
+            sent = self.sent_bytes
+            self.sent_bytes = 0
+            changes = dict(changes)
+            if not changes:
+                return sent
+            if self.pending:
+                # the previous frame is still waiting, it is replaced by this one
+                self.dropped_frames += 1
+            else:
+                self.pending_since = self.clock()
+            self.pending.update(changes)
+            # merged frames are sent as the newest one
+            self.pending_tag = self.tag
+            self.frames += 1
+            self.condition.notify()
+        return sent
+
+    def write_now(self, x, y, r, g):
+        """Changes a single LED with the next frame, see LedWriter.write_now."""
+        if x < 0 or x > self.width or y < 0 or y > self.height:
+            return
+        self.push([(y * (self.width + 1) + x, led_color(r, g))])
+
+    def all_on(self, colorcode=None):
+        """Turns all LEDs on, or off if colorcode is 0, see LedWriter.all_on.
+        The frames that haven't been sent yet are dropped.
+        """
+        with self.condition:
+            self.pending = {}
+            self.reset_pending = True
+            self.reset_color = colorcode
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not (self.pending or self.reset_pending or self.stopped):
+                    self.condition.wait()
+                if not (self.pending or self.reset_pending):
+                    break
+                changes = self.pending
+                since = self.pending_since
+                tag = self.pending_tag
+                reset = self.reset_pending
+                self.pending = {}
+                self.reset_pending = False
+                self.busy = True
+            before = self.writer.total_bytes
+            if reset:
+                self.writer.all_on(self.reset_color)
+            messages = self.writer.total_messages
+            frame_bytes = self.writer.total_bytes
+            if changes:
+                self.writer.push(changes.items())
+            with self.condition:
+                self.sent_bytes += self.writer.total_bytes - before
+                if changes and tag is not None:
+                    self.sent_frames.append(
+                        (
+                            tag,
+                            self.writer.total_messages - messages,
+                            self.writer.total_bytes - frame_bytes,
+                        )
+                    )
+                if changes:
+                    self.latency = self.clock() - since
+                    self.max_latency = max(self.max_latency, self.latency)
+                    self.total_latency += self.latency
+                    self.frames_sent += 1
+                self.busy = False
+                self.condition.notify_all()
+
+    def flush(self, timeout=None):
+        """Waits until everything that was pushed has been sent.
+        Returns:
+            bool: False if the timeout (in seconds) expired first.
+        """
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: not (self.pending or self.reset_pending or self.busy), timeout
+            )
+
+    def stop(self):
+        """Sends what is still pending and stops the thread."""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        if self.is_alive():
+            self.join()
+
+    @property
+    def total_messages(self):
+        return self.writer.total_messages
+
+    @property
+    def total_bytes(self):
+        """The number of MIDI bytes sent since the writer was created."""
+        return self.writer.total_bytes
+
+    def stats(self):
+        """Returns the backpressure stats.
+        Returns:
+            dict: The number of frames pushed, sent and dropped because a newer frame
+                replaced them, and the latency between a frame being pushed and being
+                sent (the last one, the mean and the max), in seconds.
+        """
+        with self.condition:
+            return {
+                "frames": self.frames,
+                "frames_sent": self.frames_sent,
+                "dropped_frames": self.dropped_frames,
+                "latency": self.latency,
+                "mean_latency": (
+                    self.total_latency / self.frames_sent if self.frames_sent else 0
+                ),
+                "max_latency": self.max_latency,
+            }
@@ -0,0 +1,418 @@
+import sys
+import heapq
+import random
+import socket
+import struct
+import logging
+import argparse
+import time
+from inputreader import ButtonEvent
+from pong import Pong
+
+# Packets, each starting with its type:
+#   HELLO the handshake: seed of the game (uint32), see RollbackSession.connect
+#   INPUT the input of the sender: frame of its first input (uint32), the next frame
+#         the sender expects from the receiver (uint32), count (uint8), then count
+#         inputs (uint8). Every input not acknowledged yet is sent again, so a lost
+#         packet is made up for by the next one.
+HELLO = b"H"
+INPUT = b"P"
+HELLO_PACKET = struct.Struct("<cI")
+INPUT_PACKET = struct.Struct("<cIIB")
+
+# The input of a player on a tick, as bits: a press on the left half of the grid
+# moves their paddle left, one on the right half moves it right.
+LEFT = 1
+RIGHT = 2
+# The notes Pong reads for the left and right moves of each player.
+PLAYER_NOTES = ((112, 119), (0, 7))
+
+# The maximum number of ticks a game runs ahead of the input of the remote player.
+MAX_ROLLBACK = 30
+
+
+def input_bits(events):
+    """Returns the input of the local player for a tick, see LEFT and RIGHT.
+    Args:
+        events (list): The ButtonEvents read on the local Launchpad.
+    """
+    bits = 0
+    for evt in events:
+        if evt.pressed and evt.status == 144:
+            bits |= LEFT if (evt.note & 0x0F) < 4 else RIGHT
+    return bits
+
+
+def input_events(player, bits):
+    """Returns the ButtonEvents Pong reads for the given input of a player."""
+    events = []
+    for mask, note in zip((LEFT, RIGHT), PLAYER_NOTES[player]):
+        if bits & mask:
+            events.append(ButtonEvent(0, 144, note, 127))
+    return events
+
+
+class UdpLink:
+    """A UDP socket connected to the other player, which can add latency, jitter and
+    packet loss to what it sends, e.g. to try netplay on a single machine.
+    Delayed packets are held back and sent by the next send or receive after they
+    are due, so the delays are rounded up to the interval between those calls.
+    """
+
+    def __init__(
+        self,
+        local,
+        remote,
+        latency: float = 0,
+        jitter: float = 0,
+        loss: float = 0,
+        seed=None,
+        clock=time.monotonic,
+    ):
+        """Initializes a UdpLink object.
+        Args:
+            local (tuple): The (host, port) address to receive from.
+            remote (tuple): The (host, port) address of the other player.
+            latency (float): The delay added to every packet, in seconds.
+            jitter (float): The maximum random delay added on top, in seconds.
+                Packets can arrive out of order.
+            loss (float): The chance that a packet is dropped.
+            seed (int): The seed of the random jitter and losses.
+            clock (callable): Monotonic clock the delays are measured on, in seconds.
+        """
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(local)
+        self.socket.setblocking(False)
+        self.remote = remote
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.clock = clock
+        # (due time, order, data) of the packets held back
+        self.delayed = []
+        self.order = 0
+        self.sent = 0
+        self.lost = 0
+
+    def send_due(self):
+        now = self.clock()
+        while self.delayed and self.delayed[0][0] <= now:
+            self.socket.sendto(heapq.heappop(self.delayed)[2], self.remote)
+
+    def send(self, data):
+        """Sends a packet to the other player."""
+        self.sent += 1
+        if self.loss and self.rng.random() < self.loss:
+            self.lost += 1
+            return
+        if not (self.latency or self.jitter):
+            self.socket.sendto(data, self.remote)
+            return
+        due = self.clock() + self.latency + self.rng.uniform(0, self.jitter)
+        heapq.heappush(self.delayed, (due, self.order, data))
+        self.order += 1
+        self.send_due()
+
+    def receive(self):
+        """Returns the packets received from the other player, without blocking."""
+        self.send_due()
+        packets = []
+        while True:
+            try:
+                packets.append(self.socket.recv(1024))
+            except (BlockingIOError, ConnectionRefusedError):
+                return packets
+
+    def close(self):
+        self.socket.close()
+
+
+class RollbackSession:
+    """Plays Pong between two Launchpads over a UdpLink, with rollback netcode.
+    Both sides run the whole game with the same seed, one tick at a time. The local
+    input is applied right away and sent to the other side. The input of the remote
+    player is predicted to be nothing until it arrives: if it turns out that they
+    pressed a button on a tick that was already played, the game is restored to its
+    snapshot from before that tick and the ticks since are played again, all before
+    the next frame is painted. A snapshot is kept of every tick whose remote input
+    is still missing, so they are cheap for Pong (see Pong.snapshot).
+    The game waits for the remote player when it gets more than max_rollback ticks
+    ahead of them, and only ends once the game over is confirmed by their input.
+    """
+
+    def __init__(self, game, player, link, max_rollback: int = MAX_ROLLBACK):
+        """Initializes a RollbackSession object.
+        Args:
+            game (Pong): The game, on the local Launchpad.
+            player (int): The local player, 0 (the bottom paddle, who picks the seed)
+                or 1 (the top paddle).
+            link (UdpLink): The link to the other player.
+            max_rollback (int): The maximum number of ticks played on predictions.
+        """
+        self.game = game
+        self.player = player
+        self.link = link
+        self.max_rollback = max_rollback
+        self.seed = None
+        self.frame = 0
+        self.local = {}
+        self.remote = {}
+        # the last tick with the remote input, all the ones before have it too
+        self.confirmed = -1
+        # the next local tick the other player is waiting for
+        self.acked = 0
+        # snapshots from before the ticks whose remote input is missing
+        self.history = {}
+        self.rollback = None
+        self.rollbacks = 0
+        self.replayed = 0
+
+    def connect(self, seed=None, timeout=None):
+        """Waits for the other player and starts the game with the seed of player 0.
+        Returns:
+            bool: False if the timeout (in seconds) expired first.
+        """
+        if self.player == 0:
+            self.seed = seed if seed is not None else random.getrandbits(32)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while deadline is None or time.monotonic() < deadline:
+            self.link.send(HELLO_PACKET.pack(HELLO, self.seed or 0))
+            for packet in self.link.receive():
+                if packet[0:1] == HELLO:
+                    if len(packet) != HELLO_PACKET.size:
+                        logging.debug("Dropped a malformed packet: " + packet.hex())
+                        continue
+                    if self.player == 1:
+                        self.seed = HELLO_PACKET.unpack(packet)[1]
+                    self.start()
+                    # so that the other player starts too if they missed ours
+                    self.link.send(HELLO_PACKET.pack(HELLO, self.seed))
+                    return True
+            time.sleep(0.05)
+        return False
+
+    def start(self):
+        """Starts the game, see connect."""
+        logging.info("Playing as player " + str(self.player + 1))
+        self.game.start_game(self.seed, countdown=True)
+
+    @property
+    def finished(self):
+        """Whether the game is over on a tick both players agree on."""
+        return self.game.game_over and self.confirmed >= self.frame - 1
+
+    def can_advance(self):
+        """Whether the game may play the next tick, see RollbackSession."""
+        return (
+            self.frame - self.confirmed <= self.max_rollback and not self.game.game_over
+        )
+
+    def simulate(self, frame, delta):
+        """Plays the given tick with the input known for it."""
+        bits = [0, 0]
+        bits[self.player] = self.local[frame]
+        bits[1 - self.player] = self.remote.get(frame, 0)
+        self.game.advance(input_events(0, bits[0]) + input_events(1, bits[1]), delta)
+
+    def advance(self, bits, delta):
+        """Plays the next tick.
+        Args:
+            bits (int): The local input of the tick, see input_bits.
+            delta (float): The length of the tick, in seconds.
+        """
+        frame = self.frame
+        self.local[frame] = bits
+        if frame > self.confirmed:
+            self.history[frame] = self.game.snapshot()
+        self.simulate(frame, delta)
+        self.frame += 1
+
+    def send(self):
+        """Sends the local input the other player hasn't acknowledged yet."""
+        first = max(self.acked, self.frame - 255)
+        inputs = bytes(self.local[f] for f in range(first, self.frame))
+        self.link.send(
+            INPUT_PACKET.pack(INPUT, first, self.confirmed + 1, len(inputs)) + inputs
+        )
+
+    def receive(self, delta):
+        """Handles the packets of the other player and rolls back if needed.
+        Args:
+            delta (float): The length of a tick, in seconds.
+        """
+        for packet in self.link.receive():
+            if packet[0:1] == HELLO:
+                self.link.send(HELLO_PACKET.pack(HELLO, self.seed))
+                continue
+            if packet[0:1] != INPUT:
+                continue
+            if len(packet) < INPUT_PACKET.size:
+                logging.debug("Dropped a malformed packet: " + packet.hex())
+                continue
+            _, first, acked, count = INPUT_PACKET.unpack_from(packet)
+            for i, bits in enumerate(packet[INPUT_PACKET.size :][0:count]):
+                frame = first + i
+                if frame <= self.confirmed or frame in self.remote:
+                    continue
+                self.remote[frame] = bits
+                # the tick was played without any input from them
+                if frame < self.frame and bits:
+                    if self.rollback is None or frame < self.rollback:
+                        self.rollback = frame
+            while self.confirmed + 1 in self.remote:
+                self.confirmed += 1
+            self.acked = max(self.acked, acked)
+
+        if self.rollback is not None:
+            self.rollbacks += 1
+            self.game.restore(self.history[self.rollback])
+            for frame in range(self.rollback, self.frame):
+                if frame > self.rollback and frame > self.confirmed:
+                    self.history[frame] = self.game.snapshot()
+                self.simulate(frame, delta)
+                self.replayed += 1
+            self.rollback = None
+        # the ticks played with the remote input are never played again
+        done = min(self.confirmed, self.frame - 1)
+        for frame in [f for f in self.history if f <= done]:
+            del self.history[frame]
+        for frame in [f for f in self.remote if f <= done]:
+            del self.remote[frame]
+        for frame in [f for f in self.local if f <= done and f < self.acked]:
+            del self.local[frame]
+
+    def tick(self, events, steps, delta):
+        """Handles the packets, plays the given number of ticks if the remote player
+        isn't too far behind, and sends the local input.
+        Args:
+            events (list): The ButtonEvents read on the local Launchpad.
+            steps (int): The number of ticks to play.
+            delta (float): The length of a tick, in seconds.
+        """
+        self.receive(delta)
+        for i in range(steps):
+            if not self.can_advance():
+                break
+            self.advance(input_bits(events) if i == 0 else 0, delta)
+        self.send()
+
+    def stats(self):
+        """Returns the number of rollbacks and of ticks played again because of them,
+        and how many ticks the game is ahead of the input of the remote player.
+        """
+        return {
+            "rollbacks": self.rollbacks,
+            "replayed": self.replayed,
+            "ahead": self.frame - 1 - self.confirmed,
+        }
+
+
+def play(session):
+    """Plays a game of NetPong on the local Launchpad until it is over."""
+    game = session.game
+    if not game.input.is_alive():
+        game.input.start()
+    game.use_async_output()
+    game.scheduler.start()
+    while not session.finished:
+        game.scheduler.wait()
+        steps = game.scheduler.steps()
+        if steps == 0:
+            continue
+        events = game.input.drain() if session.can_advance() else []
+        session.tick(events, steps, game.scheduler.tick)
+        if game.scheduler.should_render():
+            game.paint()
+    logging.info("Netplay stats: " + str(session.stats()))
+    game.process_game_over()
+    game.play_out()
+
+
+def loopback_test(
+    frames=1800, latency=0.03, jitter=0.03, loss=0.1, seed=0, port=47800, tick_rate=60
+):
+    """Plays both sides of a game on virtual Launchpads, over UDP on this machine.
+    The players press random buttons and time is virtual, so the test runs as fast
+    as it can. Returns whether both games ended up in the same state, with the
+    stats of both sessions.
+    """
+    from virtualpad import VirtualLaunchpad
+
+    now = [0]
+    clock = lambda: now[0]
+    delta = 1 / tick_rate
+    sessions = []
+    for player in (0, 1):
+        lp = VirtualLaunchpad()
+        lp.Open()
+        link = UdpLink(
+            ("127.0.0.1", port + player),
+            ("127.0.0.1", port + 1 - player),
+            latency,
+            jitter,
+            loss,
+            seed + player,
+            clock,
+        )
+        sessions.append(RollbackSession(Pong(lp=lp), player, link))
+    for session in sessions:
+        session.seed = seed
+        session.start()
+    rng = random.Random(seed)
+    for tick in range(frames):
+        now[0] += delta
+        for session in sessions:
+            events = []
+            if rng.random() < 0.1:
+                events = [ButtonEvent(0, 144, rng.randint(0, 7) + 112, 127)]
+            session.tick(events, 1, delta)
+            session.game.paint()
+        if all(session.game.game_over for session in sessions):
+            break
+    # let the last packets arrive, without any new input
+    for i in range(tick_rate * 2):
+        now[0] += delta
+        for session in sessions:
+            session.receive(delta)
+            session.send()
+    # the animations are objects of each game
+    synced = sessions[0].game.snapshot()[:-1] == sessions[1].game.snapshot()[:-1]
+    synced = synced and sessions[0].frame == sessions[1].frame
+    for session in sessions:
+        session.link.close()
+    return synced, [session.stats() for session in sessions]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plays Pong over the network.")
+    parser.add_argument("player", type=int, choices=(1, 2))
+    parser.add_argument("peer", help="host:port of the other player")
+    parser.add_argument("--port", type=int, default=47700)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--latency", type=float, default=0, help="added, in ms")
+    parser.add_argument("--jitter", type=float, default=0, help="added, in ms")
+    parser.add_argument("--loss", type=float, default=0, help="chance of a drop")
+    args = parser.parse_args(argv)
+
+    host, port = args.peer.rsplit(":", 1)
+    link = UdpLink(
+        ("0.0.0.0", args.port),
+        (socket.gethostbyname(host), int(port)),
+        args.latency / 1000,
+        args.jitter / 1000,
+        args.loss,
+    )
+    session = RollbackSession(Pong(), args.player - 1, link)
+    logging.info("Waiting for the other player on port " + str(args.port))
+    session.connect(args.seed)
+    play(session)
+    link.close()
+    return 0
+
+
+if __name__ == "__main__":
+    # e.g. netpong.py 1 otherhost:47700 on one machine and
+    # netpong.py 2 firsthost:47700 on the other
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -1,20 +1,29 @@
-import time
-import random
 import logging
-from launchgame import LaunchGame
+from animation import sweep
+from launchgame import LaunchGame, Sprite
 
 
 class Pong(LaunchGame):
     """Basic implementation of Pong."""
 
-    def __init__(self):
-        super().__init__("Pong", 2, has_high_score=False, cumulative_score=True)
+    # seconds it takes the ball to move one LED, before it speeds up
+    BALL_INTERVAL = 0.25
+
+    def __init__(self, lp=None, writer=None):
+        super().__init__(
+            "Pong",
+            2,
+            lp=lp,
+            writer=writer,
+            has_high_score=False,
+            cumulative_score=True,
+        )
         self.reset()
 
     def new_ball(self):
         """Resets the ball to the center of the board and gives it a random direction."""
-        self.ball = [random.randint(3, 4), random.randint(3, 4)]
-        self.ball_dir = [random.choice([-1, 1]), random.choice([-1, 1])]
+        self.ball = [self.rng.randint(3, 4), self.rng.randint(3, 4)]
+        self.ball_dir = [self.rng.choice([-1, 1]), self.rng.choice([-1, 1])]
 
     def reset(self):
         super().reset()
@@ -23,47 +32,31 @@ class Pong(LaunchGame):
         self.x1 = 4
         self.x2 = 4
         self.new_ball()
+        self.paddle1 = self.compositor.add(Sprite([0b111], 0, 3, x=self.x1 - 1, y=7))
+        self.paddle2 = self.compositor.add(Sprite([0b111], 3, 0, x=self.x2 - 1, y=0))
+        self.ball_sprite = self.compositor.add(
+            Sprite([1], 3, 3, x=self.ball[0], y=self.ball[1], visible=False), z=1
+        )
 
     def paint_win_point(self, ball_x, ball_y):
-        """Custom animation for when a player scores a point."""
+        """Custom animation for when a player scores a point.
+        The game is paused while it plays.
+        """
         direction = -1 if ball_y > 4 else 1
-        for i in range(0, 14):
-            for j in range(0, 2):
-                self.lp.LedCtrlXY(ball_x + j, (ball_y + i * direction), 0, 0)
-                self.lp.LedCtrlXY(
-                    ball_x + j,
-                    (ball_y + i * direction) - direction,
-                    (i % 4),
-                    ((i + 1) % 4),
-                )
-                self.lp.LedCtrlXY(
-                    ball_x + j,
-                    (ball_y + i * direction) - 2 * direction,
-                    (i % 4),
-                    ((i + 1) % 4),
-                )
-                self.lp.LedCtrlXY(
-                    ball_x + j,
-                    (ball_y + i * direction) - 3 * direction,
-                    (i % 4),
-                    ((i + 1) % 4),
-                )
-            time.sleep(0.08)
-
-        self.lp.LedAllOn(0)
-        self.prev_state = set()
-        self.next_state = set()
+        self.play(sweep(ball_x, ball_y, direction))
 
-    def step(self, evt, delta):
+    def step(self, events, delta):
         # CONTROLS
-        if evt != [] and evt[0][2] > 0:
-            if (evt[0][1] <= 115 and evt[0][1] >= 112) and self.x1 > 1:
+        for evt in events:
+            if not evt.pressed:
+                continue
+            if (evt.note <= 115 and evt.note >= 112) and self.x1 > 1:
                 self.x1 -= 1
-            elif evt[0][1] > 115 and self.x1 < 6:
+            elif evt.note > 115 and self.x1 < 6:
                 self.x1 += 1
-            elif evt[0][1] < 4 and self.x2 > 1:
+            elif evt.note < 4 and self.x2 > 1:
                 self.x2 -= 1
-            elif evt[0][1] >= 4 and evt[0][1] < 8 and self.x2 < 6:
+            elif evt.note >= 4 and evt.note < 8 and self.x2 < 6:
                 self.x2 += 1
         if self.scores[0] >= 8 or self.scores[1] >= 8:
             self.game_over = True
@@ -76,7 +69,7 @@ class Pong(LaunchGame):
             return
         # make it proportional to elapsed time
         self.timer += delta
-        if self.timer > 50000000 / (self.elapsed_time / 10 + 1):
+        if self.timer > self.BALL_INTERVAL / (self.elapsed_time / 10 + 1):
             self.timer = 0
             if self.elapsed_time > 4:
                 self.ball[0] += self.ball_dir[0]
@@ -123,21 +116,70 @@ class Pong(LaunchGame):
                     self.increase_score(1, 0)
                     self.new_ball()
                     self.elapsed_time = 0
-                elif random.randint(0, 1000) == 0:
-                    self.ball_dir[0] += random.choice([-1, 1])
-                    self.ball_dir[1] += random.choice([-1, 1])
+                elif self.rng.randint(0, 1000) == 0:
+                    self.ball_dir[0] += self.rng.choice([-1, 1])
+                    self.ball_dir[1] += self.rng.choice([-1, 1])
 
             self.elapsed_time += 1
 
-        if self.elapsed_time > 4 or (self.elapsed_time % 2 == 1):
-            self.paint_next(self.ball[0], self.ball[1], 3, 3)
-        self.paint_next(self.x1, 7, 0, 3)
-        self.paint_next(self.x1 - 1, 7, 0, 3)
-        self.paint_next(self.x1 + 1, 7, 0, 3)
-        self.paint_next(self.x2, 0, 3, 0)
-        self.paint_next(self.x2 - 1, 0, 3, 0)
-        self.paint_next(self.x2 + 1, 0, 3, 0)
+        self.move_sprites()
+
+    def move_sprites(self):
+        """Moves the paddle and ball sprites to the positions of the game."""
+        self.ball_sprite.visible = self.elapsed_time > 4 or (self.elapsed_time % 2 == 1)
+        self.ball_sprite.x = self.ball[0]
+        self.ball_sprite.y = self.ball[1]
+        self.paddle1.x = self.x1 - 1
+        self.paddle2.x = self.x2 - 1
+
+    def snapshot(self):
+        """Returns a compact copy of the state of the game, see LaunchGame.snapshot.
+        Only the variables of Pong are copied, not the whole game, as NetPong takes
+        a snapshot on almost every tick.
+        """
+        return (
+            self.rng.getstate(),
+            tuple(self.scores),
+            self.game_over,
+            self.timer,
+            self.elapsed_time,
+            self.x1,
+            self.x2,
+            tuple(self.ball),
+            tuple(self.ball_dir),
+            dict(self.hud),
+            # the keyframes of an animation never change, only its progress
+            tuple((a, a.index, a.elapsed) for a in self.timeline.animations),
+        )
+
+    def restore(self, snapshot):
+        """Puts the game back in the state of the given snapshot, see snapshot."""
+        (
+            rng,
+            scores,
+            self.game_over,
+            self.timer,
+            self.elapsed_time,
+            self.x1,
+            self.x2,
+            ball,
+            ball_dir,
+            hud,
+            animations,
+        ) = snapshot
+        self.rng.setstate(rng)
+        self.scores = list(scores)
+        self.ball = list(ball)
+        self.ball_dir = list(ball_dir)
+        self.hud = dict(hud)
+        self.timeline.animations = []
+        for animation, index, elapsed in animations:
+            animation.index = index
+            animation.elapsed = elapsed
+            self.timeline.animations.append(animation)
+        self.move_sprites()
 
 
-game = Pong()
-game.run()
+if __name__ == "__main__":
+    game = Pong()
+    game.run()
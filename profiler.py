@@ -0,0 +1,170 @@
+import json
+import math
+from array import array
+
+# What is recorded for every frame, in that order.
+FIELDS = (
+    "time",  # when the frame started, in seconds
+    "steps",  # number of game steps in the frame
+    "step_time",  # time spent stepping the game, in seconds
+    "paint_time",  # time spent painting, 0 if the frame was skipped, in seconds
+    "leds",  # number of LEDs that changed
+    "messages",  # number of MIDI messages sent
+    "bytes",  # number of MIDI bytes sent
+    "latency",  # from the oldest input of the frame to the frame being sent, in seconds
+)
+# Fields that are only summarized over the frames that were painted.
+PAINT_FIELDS = ("paint_time", "leds", "messages", "bytes")
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values, p):
+    """Returns the p-th percentile of the given sorted values (nearest rank)."""
+    if not values:
+        return 0
+    return values[max(math.ceil(p / 100 * len(values)) - 1, 0)]
+
+
+class FrameProfiler:
+    """Records the timings and the output of the last frames of the game loop.
+    The frames are kept in a ring buffer of preallocated arrays, so recording a frame
+    allocates nothing and old frames are simply overwritten. The arrays are only
+    allocated when the first frame is recorded, since games driven by something else
+    than run_game, e.g. an Arcade, never record anything.
+    """
+
+    def __init__(self, capacity: int = 4096):
+        """Initializes a FrameProfiler object.
+        Args:
+            capacity (int): The number of frames to keep.
+        """
+        self.capacity = capacity
+        self.columns = None
+        self.index = 0
+        self.count = 0
+        self.enabled = True
+
+    def clear(self):
+        self.index = 0
+        self.count = 0
+
+    def record(
+        self, time, steps, step_time, paint_time, leds, messages, nbytes, latency
+    ):
+        """Records a frame, see FIELDS."""
+        if not self.enabled:
+            return
+        if self.columns is None:
+            self.columns = {
+                field: array("d", bytes(8 * self.capacity)) for field in FIELDS
+            }
+        i = self.index
+        columns = self.columns
+        columns["time"][i] = time
+        columns["steps"][i] = steps
+        columns["step_time"][i] = step_time
+        columns["paint_time"][i] = paint_time
+        columns["leds"][i] = leds
+        columns["messages"][i] = messages
+        columns["bytes"][i] = nbytes
+        columns["latency"][i] = latency
+        self.index = (i + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def record_output(self, index, messages, nbytes):
+        """Records the MIDI messages and bytes of a frame that was sent after it was
+        recorded, e.g. by an AsyncLedWriter.
+        Args:
+            index (int): The index the frame was recorded at, self.index at the time.
+            messages (int): The number of MIDI messages sent.
+            nbytes (int): The number of MIDI bytes sent.
+        """
+        if self.columns is None:
+            return
+        self.columns["messages"][index] = messages
+        self.columns["bytes"][index] = nbytes
+
+    def values(self, field):
+        """Returns the recorded values of the given field, oldest first."""
+        if self.columns is None:
+            return []
+        column = self.columns[field]
+        if self.count < self.capacity:
+            return column[0 : self.count].tolist()
+        return column[self.index :].tolist() + column[0 : self.index].tolist()
+
+    def summary(self):
+        """Returns a summary of the recorded frames.
+        Returns:
+            dict: The number of frames, the frame rate and, for every field but time,
+                the mean and the PERCENTILES of its values. Latencies only count the
+                frames with input, and PAINT_FIELDS the frames that were painted.
+        """
+        times = self.values("time")
+        summary = {"frames": self.count, "fps": 0}
+        if self.count > 1 and times[-1] > times[0]:
+            summary["fps"] = (self.count - 1) / (times[-1] - times[0])
+        painted = [t > 0 for t in self.values("paint_time")]
+        for field in FIELDS[1:]:
+            values = self.values(field)
+            if field == "latency":
+                values = [v for v in values if v > 0]
+            elif field in PAINT_FIELDS:
+                values = [v for v, p in zip(values, painted) if p]
+            values.sort()
+            stats = {"mean": sum(values) / len(values) if values else 0}
+            for p in PERCENTILES:
+                stats["p" + str(p)] = percentile(values, p)
+            summary[field] = stats
+        return summary
+
+    def chrome_trace(self):
+        """Returns the recorded frames in the Chrome trace event format.
+        It can be loaded in chrome://tracing or Perfetto, with a slice for every step
+        and paint and counters for the LEDs and MIDI messages of every frame.
+        """
+        events = []
+        columns = [self.values(field) for field in FIELDS]
+        for time, steps, step_time, paint_time, leds, messages, _, latency in zip(
+            *columns
+        ):
+            start = time * 1e6
+            events.append(
+                {
+                    "name": "step",
+                    "ph": "X",
+                    "ts": start,
+                    "dur": step_time * 1e6,
+                    "pid": 0,
+                    "tid": 0,
+                    "args": {"steps": int(steps)},
+                }
+            )
+            if paint_time > 0:
+                events.append(
+                    {
+                        "name": "paint",
+                        "ph": "X",
+                        "ts": start + step_time * 1e6,
+                        "dur": paint_time * 1e6,
+                        "pid": 0,
+                        "tid": 0,
+                        "args": {"latency_ms": latency * 1e3},
+                    }
+                )
+            events.append(
+                {
+                    "name": "output",
+                    "ph": "C",
+                    "ts": start,
+                    "pid": 0,
+                    "args": {"leds": int(leds), "messages": int(messages)},
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        """Writes the recorded frames to the given file, see chrome_trace."""
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
@@ -0,0 +1,228 @@
+import sys
+import struct
+import logging
+import importlib
+from inputreader import ButtonEvent
+
+# A log starts with MAGIC, the format version and the module and class of the game.
+# Then come records, each starting with its type:
+#   GAME  a new game starts: seed (uint32) and whether the countdown played (uint8)
+#   DELTA the length of the following ticks: seconds (float64)
+#   IDLE  ticks without input: count (uint16)
+#   INPUT a tick with input: count (uint16), then per event its time since the start
+#         of the game (float32), status, note and velocity (uint8)
+MAGIC = b"LPGR"
+VERSION = 2
+GAME = b"G"
+DELTA = b"D"
+IDLE = b"I"
+INPUT = b"E"
+
+HEADER = struct.Struct("<4sBB")
+GAME_RECORD = struct.Struct("<IB")
+DELTA_RECORD = struct.Struct("<d")
+IDLE_RECORD = struct.Struct("<H")
+INPUT_RECORD = struct.Struct("<H")
+EVENT_RECORD = struct.Struct("<fBBB")
+
+
+class Recorder:
+    """Records the games played to a compact binary log, to be replayed with Replay.
+    The games draw from a seeded random generator and are stepped with fixed deltas,
+    so their seed, the tick deltas and the input of every tick are enough to play
+    them again exactly. Ticks without input, most of them, are run-length encoded.
+    """
+
+    def __init__(self, path, game):
+        """Initializes a Recorder object and starts recording the given game.
+        Args:
+            path (str): The file to write the log to.
+            game (LaunchGame): The game to record. All its next games are recorded.
+        """
+        self.file = open(path, "wb")
+        name = (type(game).__module__ + ":" + type(game).__name__).encode()
+        self.file.write(HEADER.pack(MAGIC, VERSION, len(name)) + name)
+        self.delta = None
+        self.idle = 0
+        self.start = 0
+        self.time = 0
+        game.recorder = self
+
+    def flush_idle(self):
+        while self.idle:
+            count = min(self.idle, 0xFFFF)
+            self.file.write(IDLE + IDLE_RECORD.pack(count))
+            self.idle -= count
+
+    def start_game(self, seed, countdown):
+        """Records the start of a game, see LaunchGame.start_game."""
+        self.flush_idle()
+        self.file.write(GAME + GAME_RECORD.pack(seed, countdown))
+        self.start = None
+        self.time = 0
+
+    def tick(self, events, delta):
+        """Records a tick, see LaunchGame.advance."""
+        if delta != self.delta:
+            self.flush_idle()
+            self.file.write(DELTA + DELTA_RECORD.pack(delta))
+            self.delta = delta
+        self.time += delta
+        if not events:
+            self.idle += 1
+            return
+        self.flush_idle()
+        if self.start is None:
+            # the game started a tick before the first input
+            self.start = events[0].time - self.time
+        if len(events) > 0xFFFF:
+            raise ValueError(str(len(events)) + " events in a tick, can't record them")
+        self.file.write(INPUT + INPUT_RECORD.pack(len(events)))
+        for evt in events:
+            self.file.write(
+                EVENT_RECORD.pack(
+                    evt.time - self.start, evt.status, evt.note, evt.velocity
+                )
+            )
+
+    def close(self):
+        self.flush_idle()
+        self.file.close()
+
+
+def read_log(path):
+    """Reads a log written by a Recorder.
+    Returns:
+        tuple: The "module:class" of the game and a list of (seed, countdown, ticks)
+            tuples, one per game, where ticks is a list of (events, delta) tuples.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, length = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(path + " is not a game log")
+    offset = HEADER.size
+    name = data[offset : offset + length].decode()
+    offset += length
+    games = []
+    ticks = None
+    delta = 0
+    while offset < len(data):
+        kind = data[offset : offset + 1]
+        offset += 1
+        if kind == GAME:
+            seed, countdown = GAME_RECORD.unpack_from(data, offset)
+            offset += GAME_RECORD.size
+            ticks = []
+            games.append((seed, bool(countdown), ticks))
+        elif kind == DELTA:
+            delta = DELTA_RECORD.unpack_from(data, offset)[0]
+            offset += DELTA_RECORD.size
+        elif kind == IDLE:
+            count = IDLE_RECORD.unpack_from(data, offset)[0]
+            offset += IDLE_RECORD.size
+            ticks.extend([((), delta)] * count)
+        elif kind == INPUT:
+            count = INPUT_RECORD.unpack_from(data, offset)[0]
+            offset += INPUT_RECORD.size
+            events = []
+            for i in range(0, count):
+                events.append(ButtonEvent(*EVENT_RECORD.unpack_from(data, offset)))
+                offset += EVENT_RECORD.size
+            ticks.append((events, delta))
+        else:
+            raise ValueError("Unknown record " + str(kind) + " in " + path)
+    return name, games
+
+
+class Replay:
+    """Plays a recorded game again, tick by tick, and seeks to any tick.
+    When it is created, the whole recording is played once, quietly, to take a
+    snapshot of the game (see LaunchGame.snapshot) every snapshot_interval ticks.
+    From then on, seeking restores the closest snapshot before the tick and replays
+    less than snapshot_interval ticks, wherever the tick is. The snapshots are as
+    compact as the snapshot method of the game, e.g. Pong.snapshot.
+    """
+
+    def __init__(self, game, seed, countdown, ticks, snapshot_interval: int = 300):
+        """Initializes a Replay object and starts the game.
+        Args:
+            game (LaunchGame): The game to replay on, of the recorded class.
+            seed (int): The recorded seed.
+            countdown (bool): Whether or not the start animation was played.
+            ticks (list): The recorded (events, delta) tuples.
+            snapshot_interval (int): The number of ticks between two snapshots.
+        """
+        self.game = game
+        self.ticks = ticks
+        self.snapshot_interval = snapshot_interval
+        game.start_game(seed, countdown)
+        self.frame = 0
+        self.snapshots = [game.snapshot()]
+        # the game already logged all this when it was recorded
+        logging.disable(logging.INFO)
+        try:
+            for frame in range(snapshot_interval, len(ticks) + 1, snapshot_interval):
+                self.seek(frame)
+                self.snapshots.append(game.snapshot())
+        finally:
+            logging.disable(logging.NOTSET)
+        game.restore(self.snapshots[0])
+        self.frame = 0
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def step(self):
+        """Replays the next tick. Returns False once the recording is over."""
+        if self.frame >= len(self.ticks):
+            return False
+        events, delta = self.ticks[self.frame]
+        self.game.advance(events, delta)
+        self.frame += 1
+        return True
+
+    def seek(self, frame):
+        """Puts the game in its state right after the given number of ticks."""
+        frame = max(min(frame, len(self.ticks)), 0)
+        base = min(frame // self.snapshot_interval, len(self.snapshots) - 1)
+        if frame < self.frame or base * self.snapshot_interval > self.frame:
+            self.game.restore(self.snapshots[base])
+            self.frame = base * self.snapshot_interval
+        while self.frame < frame:
+            self.step()
+
+
+def load_replay(path, game_index=0, lp=None, snapshot_interval=300):
+    """Creates the recorded game and returns a Replay of one of its games.
+    Args:
+        path (str): The log written by a Recorder.
+        game_index (int): Which of the recorded games to replay.
+        lp (Launchpad): The Launchpad object to use, e.g. a VirtualLaunchpad.
+        snapshot_interval (int): The number of ticks between two snapshots.
+    """
+    name, games = read_log(path)
+    module, cls = name.split(":")
+    game = getattr(importlib.import_module(module), cls)(lp=lp)
+    return Replay(game, *games[game_index], snapshot_interval)
+
+
+if __name__ == "__main__":
+    # replays a log on the Launchpad at normal speed, e.g. recorder.py tetris.rec 0 600
+    logging.basicConfig(level=logging.INFO)
+    replay = load_replay(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 0)
+    if len(sys.argv) > 3:
+        replay.seek(int(sys.argv[3]))
+    game = replay.game
+    game.scheduler.start()
+    while not game.game_over:
+        game.scheduler.wait()
+        for i in range(game.scheduler.steps()):
+            if not replay.step():
+                break
+        if replay.frame >= len(replay):
+            break
+        if game.scheduler.should_render():
+            game.paint()
+    game.paint()
+    logging.info("Replayed " + str(replay.frame) + " ticks")
@@ -0,0 +1,74 @@
+import time
+
+
+class Scheduler:
+    """Fixed timestep clock for the game loop.
+    The game is stepped tick_rate times per second with a constant delta, no matter
+    how long a step or a frame takes, so the game speed doesn't depend on the host.
+    Between ticks the scheduler sleeps instead of spinning on the device, the input
+    is read in the meantime by an InputReader.
+    """
+
+    def __init__(
+        self,
+        tick_rate: int = 60,
+        max_steps: int = 5,
+        max_skipped_frames: int = 5,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        """Initializes a Scheduler object.
+        Args:
+            tick_rate (int): The number of steps per second.
+            max_steps (int): The maximum number of steps to catch up on at once.
+                If the game falls further behind, the missing time is dropped.
+            max_skipped_frames (int): The maximum number of frames in a row that can be
+                skipped because the steps overran.
+            clock (callable): Monotonic clock returning seconds.
+            sleep (callable): Function used to sleep, taking seconds.
+        """
+        self.tick_rate = tick_rate
+        self.tick = 1 / tick_rate
+        self.max_steps = max_steps
+        self.max_skipped_frames = max_skipped_frames
+        self.clock = clock
+        self.sleep = sleep
+        self.next_tick = 0
+        self.skipped_frames = 0
+
+    def start(self):
+        """Starts the clock, the first tick is due immediately."""
+        self.next_tick = self.clock()
+        self.skipped_frames = 0
+
+    def wait(self):
+        """Sleeps until the next tick is due."""
+        remaining = self.next_tick - self.clock()
+        if remaining > 0:
+            self.sleep(remaining)
+
+    def steps(self):
+        """Returns the number of steps that are due and advances the clock."""
+        now = self.clock()
+        steps = 0
+        while self.next_tick <= now and steps < self.max_steps:
+            self.next_tick += self.tick
+            steps += 1
+        if self.next_tick <= now:
+            # too far behind to catch up, drop the missing time
+            self.next_tick = now + self.tick
+        return steps
+
+    def should_render(self):
+        """Returns whether the frame should be painted.
+        If the steps overran into the next tick, the frame is skipped to catch up,
+        but never more than max_skipped_frames times in a row.
+        """
+        if (
+            self.clock() >= self.next_tick
+            and self.skipped_frames < self.max_skipped_frames
+        ):
+            self.skipped_frames += 1
+            return False
+        self.skipped_frames = 0
+        return True
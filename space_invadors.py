@@ -1,14 +1,90 @@
-import random
-from launchgame import LaunchGame
+from launchgame import LaunchGame, Sprite
 import logging
 
 
-class SpaceInvaders(LaunchGame):
+class Alien:
+    """An alien, with its position and color."""
+
+    __slots__ = ("x", "y", "color")
+
+    def __init__(self, x, y, color):
+        self.x = x
+        self.y = y
+        self.color = color
+
+
+class AlienStore:
+    """The aliens on the board.
+    Besides the aliens themselves, it keeps an 8x8 occupancy grid and a bitmask of
+    the occupied columns of every row, so finding, moving, removing an alien or a
+    free spot for it never has to go through all the aliens.
+    """
+
     def __init__(self):
+        # a dict keeps the aliens in the order they were added and removes in O(1)
+        self.aliens = {}
+        self.grid = [None] * 64
+        self.rows = [0] * 8
+
+    def __len__(self):
+        return len(self.aliens)
+
+    def __iter__(self):
+        return iter(self.aliens)
+
+    def at(self, x, y):
+        """Returns the alien at the given position, or None."""
+        if x < 0 or x > 7 or y < 0 or y > 7:
+            return None
+        return self.grid[y * 8 + x]
+
+    def is_free(self, x, y):
+        """Returns whether there is room for an alien at the given position."""
+        return x >= 0 and x <= 7 and y >= 0 and y <= 7 and not self.rows[y] >> x & 1
+
+    def free_columns(self, y):
+        """Returns the columns of the given row without an alien."""
+        return [x for x in range(0, 8) if not self.rows[y] >> x & 1]
+
+    def add(self, x, y, color):
+        """Adds an alien at the given (free) position."""
+        alien = Alien(x, y, color)
+        self.aliens[alien] = None
+        self.grid[y * 8 + x] = alien
+        self.rows[y] |= 1 << x
+        return alien
+
+    def remove(self, alien):
+        """Removes the given alien."""
+        del self.aliens[alien]
+        self.grid[alien.y * 8 + alien.x] = None
+        self.rows[alien.y] &= ~(1 << alien.x)
+
+    def move(self, alien, x, y):
+        """Moves the alien to the given (free) position."""
+        self.grid[alien.y * 8 + alien.x] = None
+        self.rows[alien.y] &= ~(1 << alien.x)
+        alien.x = x
+        alien.y = y
+        self.grid[y * 8 + x] = alien
+        self.rows[y] |= 1 << x
+
+
+class SpaceInvaders(LaunchGame):
+    # seconds between two moves of the aliens, before it speeds up
+    ALIEN_INTERVAL = 0.45
+    # seconds it takes a shot to move one row
+    SHOT_INTERVAL = 0.08
+    # number of shots that can be flying at the same time
+    MAX_SHOTS = 1
+
+    def __init__(self, lp=None, writer=None):
         LaunchGame.__init__(
             self,
             game_name="Space Invaders",
             num_players=1,
+            lp=lp,
+            writer=writer,
             has_high_score=True,
             cumulative_score=False,
         )
@@ -17,73 +93,77 @@ class SpaceInvaders(LaunchGame):
     def reset(self):
         super().reset()
         self.x = 4
+        self.player = self.compositor.add(Sprite((1,), 0, 3, x=self.x, y=6))
         self.timer1 = 0
         self.timer2 = 0
-        self.aliens = [[0, 0], [2, 0], [4, 0], [6, 0]]
-        self.alien_colors = [[1, 1], [1, 3], [2, 2], [3, 1]]
-        self.shoot = [-1, 8]
+        self.aliens = AlienStore()
+        for x, color in zip([0, 2, 4, 6], [[1, 1], [1, 3], [2, 2], [3, 1]]):
+            self.aliens.add(x, 0, color)
+        self.shots = []
 
-    def step(self, evt, delta):
+    def hit_aliens(self):
+        """Removes the aliens that got shot."""
+        for shot in list(self.shots):
+            alien = self.aliens.at(shot[0], shot[1])
+            if alien is not None:
+                self.aliens.remove(alien)
+                self.shots.remove(shot)
+                self.increase_score(1)
+
+    def move_aliens(self):
+        """Moves the aliens around randomly and sometimes adds a new one."""
+        for a in self.aliens:
+            if self.rng.randint(0, 5) == 0 and self.aliens.is_free(a.x, a.y + 1):
+                self.aliens.move(a, a.x, a.y + 1)
+            if self.rng.randint(0, 8) == 0:
+                moves = [x for x in (a.x - 1, a.x + 1) if self.aliens.is_free(x, a.y)]
+                self.aliens.move(a, self.rng.choice([a.x] + moves), a.y)
+        # randomly add a new alien
+        if self.rng.randint(0, len(self.aliens)) == 0:
+            free = self.aliens.free_columns(0)
+            if free:
+                self.aliens.add(
+                    self.rng.choice(free),
+                    0,
+                    [self.rng.randint(1, 3), self.rng.randint(1, 3)],
+                )
+
+    def step(self, events, delta):
         # CONTROLS
-        if evt != [] and evt[0][2] > 0:
-            if (evt[0][1] <= 115 and evt[0][1] >= 112) and self.x > 0:
+        for evt in events:
+            if not evt.pressed:
+                continue
+            if (evt.note <= 115 and evt.note >= 112) and self.x > 0:
                 self.x -= 1
-            elif evt[0][1] > 115 and self.x < 7:
+            elif evt.note > 115 and self.x < 7:
                 self.x += 1
-            elif self.shoot[1] == 8:
-                self.shoot = [self.x, 5]
-        for a in self.aliens:
-            if a[1] == 7:
-                self.game_over = True
-                return
+            elif len(self.shots) < self.MAX_SHOTS:
+                self.shots.append([self.x, 5])
+        if self.aliens.rows[7]:
+            logging.info("Game over, the aliens landed!")
+            self.game_over = True
+            return
 
         # check with clock
-        if self.shoot in self.aliens:
-            self.alien_colors.remove(self.alien_colors[self.aliens.index(self.shoot)])
-            self.aliens.remove(self.shoot)
-            self.shoot = [-1, 8]
-            self.increase_score(1)
+        self.hit_aliens()
         self.timer1 += delta
-        if self.timer1 / 31000000 > 0.9 * (1 - self.scores[0] / 100):
+        if self.timer1 > self.ALIEN_INTERVAL * (1 - self.scores[0] / 100):
             self.timer1 = 0
-            for a in self.aliens:
-                if random.randint(0, 5) == 0:
-                    a[1] += 1
-                if random.randint(0, 8) == 0:
-                    new_x = a[0] + random.randint(-1, 1)
-                    while (
-                        ([new_x, a[1]] in self.aliens and new_x != a[0])
-                        or new_x < 0
-                        or new_x > 7
-                    ):
-                        new_x = a[0] + random.randint(-1, 1)
-                    a[0] = new_x
-            # randomly add a new alien
-            if random.randint(0, len(self.aliens)) == 0:
-                new_x = random.randint(0, 7)
-                while [new_x, 0] in self.aliens:
-                    new_x = random.randint(0, 7)
-                self.aliens.append([new_x, 0])
-                self.alien_colors.append([random.randint(1, 3), random.randint(1, 3)])
+            self.move_aliens()
         self.timer2 += delta
-        if self.timer2 / 50000000 > 0.1:
+        if self.timer2 > self.SHOT_INTERVAL:
             self.timer2 = 0
-            if self.shoot[1] < 8:
-                self.shoot[1] -= 1
-            if self.shoot[1] < 0:
-                self.shoot = [-1, 8]
+            for shot in self.shots:
+                shot[1] -= 1
+            self.shots = [shot for shot in self.shots if shot[1] >= 0]
 
-        self.paint_next(self.x, 6, 0, 3)
+        self.player.x = self.x
         for a in self.aliens:
-            self.paint_next(
-                a[0],
-                a[1],
-                self.alien_colors[self.aliens.index(a)][0],
-                self.alien_colors[self.aliens.index(a)][1],
-            )
-        if self.shoot[1] < 8:
-            self.paint_next(self.shoot[0], self.shoot[1], 3, 3)
-
-
-game = SpaceInvaders()
-game.run()
+            self.paint_next(a.x, a.y, a.color[0], a.color[1])
+        for shot in self.shots:
+            self.paint_next(shot[0], shot[1], 3, 3)
+
+
+if __name__ == "__main__":
+    game = SpaceInvaders()
+    game.run()
@@ -0,0 +1,335 @@
+import sys
+import json
+import logging
+import threading
+import urllib.request
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote
+from ledwriter import led_color
+
+# A keyframe with the whole board is published every KEYFRAME_INTERVAL frames, so
+# that a viewer that missed frames catches up quickly.
+KEYFRAME_INTERVAL = 120
+# The number of frames kept for the viewers that are behind. A viewer that is
+# further behind gets a keyframe instead.
+BACKLOG = 256
+# Seconds without a frame after which the viewers are sent a keep-alive comment.
+KEEP_ALIVE = 15
+
+# The frames are sent as Server-Sent Events, one per frame:
+#   data: k <width> <height> <hex>  a keyframe, with the velocity of every LED
+#   data: d <hex>                   the changed LEDs, as (index high byte, index low
+#                                   byte, velocity) triples
+# LEDs are numbered by y * (width + 1) + x, as in LaunchGame.paint, and their
+# velocities are led_color values.
+VIEWER_PAGE = """<!DOCTYPE html>
+<html><head><title>Launchpad spectators</title><style>
+body { background: #111; color: #ccc; font-family: sans-serif; }
+.pad { display: inline-block; margin: 1em; vertical-align: top; }
+.grid { display: grid; gap: 3px; }
+.led { width: 24px; height: 24px; border-radius: 4px; background: #222; }
+</style></head><body><div id="pads"></div><script>
+function color(v) {
+  if (!v) return "#222";
+  return "rgb(" + Math.round((v & 3) * 85) + "," + Math.round((v >> 4 & 3) * 85) + ",0)";
+}
+fetch("channels").then(r => r.json()).then(names => names.forEach(name => {
+  const pad = document.createElement("div");
+  pad.className = "pad";
+  pad.innerHTML = "<div>" + name + "</div><div class=grid></div>";
+  document.getElementById("pads").appendChild(pad);
+  const grid = pad.lastChild;
+  let leds = [];
+  new EventSource("stream/" + encodeURIComponent(name)).onmessage = e => {
+    const [kind, ...rest] = e.data.split(" ");
+    if (kind == "k") {
+      const width = +rest[0] + 1;
+      grid.style.gridTemplateColumns = "repeat(" + width + ", 24px)";
+      grid.innerHTML = "";
+      leds = [];
+      for (let i = 0; i < rest[2].length; i += 2) {
+        const led = document.createElement("div");
+        led.className = "led";
+        led.style.background = color(parseInt(rest[2].substr(i, 2), 16));
+        grid.appendChild(led);
+        leds.push(led);
+      }
+    } else {
+      for (let i = 0; i < rest[0].length; i += 6) {
+        const index = parseInt(rest[0].substr(i, 4), 16);
+        leds[index].style.background = color(parseInt(rest[0].substr(i + 4, 2), 16));
+      }
+    }
+  };
+}));
+</script></body></html>
+"""
+
+
+class Channel:
+    """The frames of one Launchpad, as delta-encoded messages for its viewers.
+    Publishing a frame only encodes its changes once, whatever the number of
+    viewers, and wakes up their threads, which do the sending.
+    """
+
+    def __init__(self, name, width=8, height=8):
+        """Initializes a Channel object.
+        Args:
+            name (str): The name of the channel, e.g. the name of the game.
+            width (int): The width of the board, without the right column.
+            height (int): The height of the board, without the top row.
+        """
+        self.name = name
+        self.width = width
+        self.height = height
+        self.condition = threading.Condition()
+        self.leds = bytearray((width + 1) * (height + 1))
+        # (number, message) of the last frames
+        self.messages = deque(maxlen=BACKLOG)
+        self.frame = 0
+
+    def keyframe_message(self):
+        return "k " + str(self.width) + " " + str(self.height) + " " + self.leds.hex()
+
+    def append(self, message):
+        self.frame += 1
+        self.messages.append((self.frame, message))
+        self.condition.notify_all()
+
+    def publish(self, changes):
+        """Publishes the LEDs that changed.
+        Args:
+            changes (iterable): (index, velocity) pairs, see LedWriter.push.
+        """
+        data = bytearray()
+        with self.condition:
+            leds = self.leds
+            for i, v in changes:
+                if leds[i] != v:
+                    leds[i] = v
+                    data += bytes((i >> 8, i & 0xFF, v))
+            if self.frame % KEYFRAME_INTERVAL == KEYFRAME_INTERVAL - 1:
+                self.append(self.keyframe_message())
+            elif data:
+                self.append("d " + data.hex())
+
+    def fill(self, velocity):
+        """Publishes a frame with all the LEDs set to the given velocity."""
+        with self.condition:
+            for i in range(len(self.leds)):
+                self.leds[i] = velocity
+            self.append(self.keyframe_message())
+
+    def keyframe(self):
+        """Returns the number of the last frame and a keyframe of the board."""
+        with self.condition:
+            return self.frame, self.keyframe_message()
+
+    def wait(self, frame, timeout=None):
+        """Waits for the frames after the given one.
+        Returns:
+            list: The (number, message) of the new frames, empty if the timeout (in
+                seconds) expired first, or None if some of them aren't kept anymore.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.frame > frame, timeout)
+            if not self.messages or self.frame == frame:
+                return []
+            if self.messages[0][0] > frame + 1:
+                return None
+            return [m for m in self.messages if m[0] > frame]
+
+
+class SpectatorHandler(BaseHTTPRequestHandler):
+    """Serves the viewer page, the list of channels and their streams."""
+
+    def do_GET(self):
+        channels = self.server.channels
+        if self.path == "/":
+            self.send_content("text/html", VIEWER_PAGE.encode())
+        elif self.path == "/channels":
+            self.send_content("application/json", json.dumps(list(channels)).encode())
+        elif self.path.startswith("/stream/") and unquote(self.path[8:]) in channels:
+            self.stream(channels[unquote(self.path[8:])])
+        else:
+            self.send_error(404)
+
+    def send_content(self, content_type, body):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream(self, channel):
+        """Sends the frames of the channel until the viewer disconnects."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        frame, message = channel.keyframe()
+        try:
+            self.wfile.write(("data: " + message + "\n\n").encode())
+            while not self.server.stopped:
+                messages = channel.wait(frame, KEEP_ALIVE)
+                if messages is None:
+                    # too far behind, start again from the current board
+                    messages = [channel.keyframe()]
+                elif not messages:
+                    self.wfile.write(b": keep-alive\n\n")
+                data = b""
+                for frame, message in messages:
+                    data += ("data: " + message + "\n\n").encode()
+                self.wfile.write(data)
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        logging.debug("Spectator " + self.address_string() + ": " + format % args)
+
+
+class SpectatorServer(ThreadingHTTPServer):
+    """Streams the frames of the Launchpads to viewers over HTTP.
+    A browser pointed at the server shows all the channels, and
+    python spectator.py <url> [<channel>] shows one in a terminal. Every viewer is
+    served by a thread of its own, so a slow one doesn't hold up the others.
+    """
+
+    daemon_threads = True
+    # viewers tend to connect all at once, e.g. when the lobby screen is reloaded
+    request_queue_size = 64
+
+    def __init__(self, host="127.0.0.1", port: int = 8765):
+        """Initializes a SpectatorServer object and starts serving in a thread.
+        Args:
+            host (str): The address to listen on, e.g. "0.0.0.0" for other machines.
+            port (int): The port to listen on.
+        """
+        super().__init__((host, port), SpectatorHandler)
+        self.channels = {}
+        self.stopped = False
+        self.thread = threading.Thread(
+            target=self.serve_forever, name="SpectatorServer", daemon=True
+        )
+        self.thread.start()
+        logging.info(
+            "Spectators at http://" + host + ":" + str(self.server_address[1]) + "/"
+        )
+
+    def channel(self, name, width=8, height=8):
+        """Returns the channel with the given name, creating it if needed."""
+        if name not in self.channels:
+            self.channels[name] = Channel(name, width, height)
+        return self.channels[name]
+
+    def stop(self):
+        self.stopped = True
+        for channel in self.channels.values():
+            with channel.condition:
+                channel.condition.notify_all()
+        self.shutdown()
+        self.server_close()
+
+
+class SpectatorWriter:
+    """Sends the frames to a writer and publishes them to a Channel as well."""
+
+    def __init__(self, writer, channel):
+        """Initializes a SpectatorWriter object.
+        Args:
+            writer (LedWriter): The writer sending the frames to the device, e.g. an
+                AsyncLedWriter or a TiledCanvas.
+            channel (Channel): The channel the frames are published to.
+        """
+        self.writer = writer
+        self.channel = channel
+        self.lp = writer.lp
+        self.width = writer.width
+        self.height = writer.height
+
+    def push(self, changes):
+        """Sends a frame, see LedWriter.push."""
+        changes = list(changes)
+        self.channel.publish(changes)
+        return self.writer.push(changes)
+
+    def write_now(self, x, y, r, g):
+        """Changes a single LED immediately, see LedWriter.write_now."""
+        if 0 <= x <= self.width and 0 <= y <= self.height:
+            self.channel.publish([(y * (self.width + 1) + x, led_color(r, g))])
+        self.writer.write_now(x, y, r, g)
+
+    def all_on(self, colorcode=None):
+        """Turns all LEDs on, or off if colorcode is 0, see LedWriter.all_on."""
+        self.channel.fill(0 if colorcode == 0 else led_color(3, 3))
+        self.writer.all_on(colorcode)
+
+    @property
+    def total_messages(self):
+        return self.writer.total_messages
+
+    @property
+    def total_bytes(self):
+        """The number of MIDI bytes sent since the writer was created."""
+        return self.writer.total_bytes
+
+
+def spectate(game, server, name=None):
+    """Publishes the frames of the given game to the given SpectatorServer.
+    Args:
+        game (LaunchGame): The game.
+        server (SpectatorServer): The server.
+        name (str): The name of the channel. If None, the name of the game.
+    """
+    channel = server.channel(name or game.name, game.width, game.height)
+    game.writer = SpectatorWriter(game.writer, channel)
+    return channel
+
+
+def view(url, name=None):
+    """Shows a channel of a SpectatorServer in the terminal, until interrupted.
+    Args:
+        url (str): The address of the server, e.g. http://127.0.0.1:8765.
+        name (str): The channel to show. If None, the first one.
+    """
+    url = url.rstrip("/")
+    if name is None:
+        with urllib.request.urlopen(url + "/channels") as response:
+            name = json.load(response)[0]
+    leds = bytearray()
+    width = 8
+    with urllib.request.urlopen(url + "/stream/" + quote(name)) as response:
+        for line in response:
+            line = line.decode().strip()
+            if not line.startswith("data: "):
+                continue
+            kind, *rest = line[6:].split(" ")
+            if kind == "k":
+                width = int(rest[0])
+                leds = bytearray.fromhex(rest[2])
+            else:
+                data = bytes.fromhex(rest[0])
+                for k in range(0, len(data), 3):
+                    leds[data[k] << 8 | data[k + 1]] = data[k + 2]
+            rows = ["\x1b[H" + name]
+            for y in range(0, len(leds) // (width + 1)):
+                row = ""
+                for x in range(0, width + 1):
+                    v = leds[y * (width + 1) + x]
+                    r = (v & 3) * 85
+                    g = (v >> 4 & 3) * 85
+                    row += "\x1b[38;2;" + str(r) + ";" + str(g) + ";0m" + "● "
+                rows.append(row + "\x1b[0m")
+            sys.stdout.write("\n".join(rows) + "\n")
+            sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    # e.g. spectator.py http://127.0.0.1:8765 Tetris
+    sys.stdout.write("\x1b[2J")
+    try:
+        view(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,316 @@
+import sys
+import time
+import struct
+import logging
+import multiprocessing
+from multiprocessing import shared_memory
+from arcade import Session, open_launchpads
+from inputreader import read_events
+from launcher import load_game
+from ledwriter import LED_COUNT, LedWriter, led_color
+from scheduler import Scheduler
+
+# Layout of the shared memory of a worker:
+#   the frame number (uint32), odd while the worker writes the frame, the time of
+#   the last tick of the worker (float64, on the monotonic clock) and its slowest
+#   recent tick, in seconds (float32), see Worker.hang_timeout
+#   the frame, the velocity of every LED by index, like LedWriter.shadow
+#   the input ring: the number of events written by the supervisor and read by
+#   the worker (uint32), then RING_SIZE events: time (float64), status, note and
+#   velocity (uint8)
+HEADER = struct.Struct("<Idf")
+FRAME_OFFSET = 16
+RING_OFFSET = FRAME_OFFSET + 96
+RING_HEADER = struct.Struct("<II")
+EVENT = struct.Struct("<dBBBx")
+RING_SIZE = 256
+SHARED_SIZE = RING_OFFSET + RING_HEADER.size + RING_SIZE * EVENT.size
+
+# ticks after which a worker that hasn't ticked is restarted, so that a hung game
+# is back within a few frames. They are as long as the slowest recent tick of the
+# worker, so that a game that is slow on this machine isn't taken for a hung one.
+HANG_TICKS = 3
+# the minimum seconds before a worker is restarted, so that a healthy game isn't
+# restarted by a stall like a garbage collection or the start of a game
+MIN_HANG_TIMEOUT = 0.2
+# the slowest recent tick decays by this factor on every tick, so that a slow tick
+# is forgotten after a few seconds
+TICK_TIME_DECAY = 0.995
+# extra seconds a new worker has for its first tick, to import and create its game
+START_TIMEOUT = 2
+
+
+class SharedPad:
+    """The Launchpad of a game in a worker process, see Worker.
+    Its input comes from the ring in shared memory. It has no output, the frames are
+    written by a SharedFrameWriter instead.
+    """
+
+    def __init__(self, buf):
+        self.buf = buf
+
+    def EventRaw(self):
+        """Returns the next event of the ring, like Launchpad.EventRaw."""
+        written, read = RING_HEADER.unpack_from(self.buf, RING_OFFSET)
+        if read == written:
+            return []
+        # the events that were overwritten are lost
+        read = max(read, written - RING_SIZE)
+        offset = RING_OFFSET + RING_HEADER.size + read % RING_SIZE * EVENT.size
+        status, note, velocity = EVENT.unpack_from(self.buf, offset)[1:]
+        struct.pack_into("<I", self.buf, RING_OFFSET + 4, read + 1)
+        return [[status, note, velocity], 0]
+
+    def LedAllOn(self, colorcode=None):
+        pass
+
+
+class SharedFrameWriter:
+    """Writes the frames of a game to shared memory, where the supervisor reads them.
+    The frame number is odd while a frame is written, so that the supervisor never
+    sends half a frame.
+    """
+
+    def __init__(self, buf):
+        self.buf = buf
+        self.lp = None
+        self.width = 8
+        self.height = 8
+        self.total_messages = 0
+
+    def begin(self):
+        frame = HEADER.unpack_from(self.buf, 0)[0]
+        struct.pack_into("<I", self.buf, 0, frame + 1)
+        return frame + 2
+
+    def push(self, changes):
+        """Writes a frame, see LedWriter.push.
+        Returns:
+            int: 0, the MIDI bytes are sent by the supervisor.
+        """
+        end = self.begin()
+        buf = self.buf
+        for i, v in changes:
+            buf[FRAME_OFFSET + i] = v
+            self.total_messages += 1
+        struct.pack_into("<I", buf, 0, end)
+        return 0
+
+    def write_now(self, x, y, r, g):
+        if 0 <= x <= 8 and 0 <= y <= 8:
+            self.push([(y * 9 + x, led_color(r, g))])
+
+    def all_on(self, colorcode=None):
+        fill = 0 if colorcode == 0 else led_color(3, 3)
+        end = self.begin()
+        self.buf[FRAME_OFFSET : FRAME_OFFSET + LED_COUNT] = bytes([fill]) * LED_COUNT
+        struct.pack_into("<I", self.buf, 0, end)
+
+    @property
+    def total_bytes(self):
+        return self.total_messages * 3
+
+
+def work(game, name, tick_rate):
+    """Runs a game in a worker process, like a Session of an Arcade, forever.
+    Args:
+        game (str or type): The name of the game (see launcher.GAMES) or its class.
+        name (str): The name of the shared memory of the worker.
+        tick_rate (int): The number of game steps per second.
+    """
+    memory = shared_memory.SharedMemory(name)
+    buf = memory.buf
+    pad = SharedPad(buf)
+    if isinstance(game, str):
+        game = load_game(game)
+    game = game(lp=pad)
+    game.writer = SharedFrameWriter(buf)
+    game.writer.all_on(0)
+    session = Session(game)
+    scheduler = Scheduler(tick_rate)
+    scheduler.start()
+    last_tick = None
+    tick_time = 0
+    while True:
+        scheduler.wait()
+        steps = scheduler.steps()
+        if steps == 0:
+            continue
+        events = read_events(pad, scheduler.clock)
+        # one tick at a time, so that the heartbeat is written on every tick, even
+        # when catching up
+        for i in range(0, steps):
+            now = time.monotonic()
+            if last_tick is not None:
+                tick_time = max(now - last_tick, tick_time * TICK_TIME_DECAY)
+            last_tick = now
+            struct.pack_into("<df", buf, 4, now, tick_time)
+            session.update(events if i == 0 else [], 1, scheduler.tick)
+        if scheduler.should_render():
+            session.paint()
+
+
+class Worker:
+    """A game running in its own process, on a Launchpad owned by the supervisor."""
+
+    def __init__(self, lp, game, tick_rate=60, context=None):
+        """Initializes a Worker object and starts its process.
+        Args:
+            lp (Launchpad): The Launchpad the game is played on.
+            game (str or type): The name of the game (see launcher.GAMES) or its class.
+            tick_rate (int): The number of game steps per second.
+            context: The multiprocessing context to start the process with.
+        """
+        self.lp = lp
+        self.game = game
+        self.tick_rate = tick_rate
+        self.context = context or multiprocessing.get_context()
+        self.writer = LedWriter(lp)
+        self.memory = shared_memory.SharedMemory(create=True, size=SHARED_SIZE)
+        self.frame = 0
+        self.restarts = 0
+        self.process = None
+        self.start()
+
+    def start(self):
+        """Starts a new process for the game, with a blank frame and input ring."""
+        buf = self.memory.buf
+        buf[0:SHARED_SIZE] = bytes(SHARED_SIZE)
+        HEADER.pack_into(buf, 0, 0, time.monotonic() + START_TIMEOUT, 0)
+        self.frame = 0
+        self.writer.all_on(0)
+        self.process = self.context.Process(
+            target=work,
+            args=(self.game, self.memory.name, self.tick_rate),
+            daemon=True,
+        )
+        self.process.start()
+
+    def hang_timeout(self, hang_ticks=HANG_TICKS):
+        """Returns the seconds without a tick after which the worker is restarted:
+        hang_ticks of its slowest recent tick, or of the scheduler if they are
+        longer, but at least MIN_HANG_TIMEOUT.
+        """
+        tick_time = HEADER.unpack_from(self.memory.buf, 0)[2]
+        return max(MIN_HANG_TIMEOUT, hang_ticks * max(tick_time, 1 / self.tick_rate))
+
+    def check(self, now, timeout):
+        """Restarts the process if it died or hasn't ticked for timeout seconds.
+        Returns:
+            bool: Whether or not the process was restarted.
+        """
+        heartbeat = HEADER.unpack_from(self.memory.buf, 0)[1]
+        if self.process.is_alive() and now - heartbeat < timeout:
+            return False
+        if self.process.is_alive():
+            logging.warning(
+                "Restarting "
+                + str(self.game)
+                + ", it hung for "
+                + str(round(timeout, 3))
+                + " s"
+            )
+            self.process.kill()
+        else:
+            logging.warning(
+                "Restarting "
+                + str(self.game)
+                + ", it exited with "
+                + str(self.process.exitcode)
+            )
+        self.process.join(0)
+        self.restarts += 1
+        self.start()
+        return True
+
+    def send_input(self, events):
+        """Adds the given ButtonEvents to the input ring of the game.
+        If the game doesn't keep up, the oldest events are overwritten.
+        """
+        if not events:
+            return
+        buf = self.memory.buf
+        written, read = RING_HEADER.unpack_from(buf, RING_OFFSET)
+        for evt in events:
+            offset = RING_OFFSET + RING_HEADER.size + written % RING_SIZE * EVENT.size
+            EVENT.pack_into(buf, offset, evt.time, evt.status, evt.note, evt.velocity)
+            written += 1
+        struct.pack_into("<I", buf, RING_OFFSET, written)
+
+    def show_frame(self):
+        """Sends the last frame of the game to the Launchpad, if there is a new one."""
+        buf = self.memory.buf
+        frame = HEADER.unpack_from(buf, 0)[0]
+        if frame == self.frame or frame & 1:
+            return
+        leds = bytes(buf[FRAME_OFFSET : FRAME_OFFSET + LED_COUNT])
+        if HEADER.unpack_from(buf, 0)[0] != frame:
+            # the worker started the next frame meanwhile
+            return
+        self.frame = frame
+        # index 8, the top right corner, has no LED
+        self.writer.push((i, v) for i, v in enumerate(leds) if i != 8)
+
+    def close(self):
+        self.process.kill()
+        self.process.join()
+        self.memory.close()
+        self.memory.unlink()
+
+
+class Supervisor:
+    """Runs every game in a worker process of its own and restarts the ones that
+    crash or hang.
+    The supervisor owns the Launchpads: on every tick it passes their input to the
+    workers through rings in shared memory, sends the frames the workers wrote to
+    shared memory, and checks that every worker ticked recently. The hot path has
+    no pipes or pickling, and the games run on all the cores.
+    """
+
+    def __init__(self, pads, games, tick_rate: int = 60, hang_ticks=HANG_TICKS):
+        """Initializes a Supervisor object and starts the workers.
+        Args:
+            pads (list): The Launchpad objects.
+            games (list): The game of every Launchpad, by name (see launcher.GAMES)
+                or class.
+            tick_rate (int): The number of game steps per second.
+            hang_ticks (int): The number of ticks without a tick of a worker after
+                which it is restarted, see Worker.hang_timeout.
+        """
+        self.scheduler = Scheduler(tick_rate)
+        self.hang_ticks = hang_ticks
+        self.workers = [Worker(lp, game, tick_rate) for lp, game in zip(pads, games)]
+
+    def update(self):
+        """Passes the input to the workers, shows their frames and restarts them if
+        needed.
+        """
+        clock = self.scheduler.clock
+        for worker in self.workers:
+            worker.send_input(read_events(worker.lp, clock))
+            worker.show_frame()
+            worker.check(clock(), worker.hang_timeout(self.hang_ticks))
+
+    def run(self):
+        """Runs the supervisor forever."""
+        logging.info("Press any button to start")
+        self.scheduler.start()
+        try:
+            while True:
+                self.scheduler.wait()
+                if self.scheduler.steps():
+                    self.update()
+        finally:
+            self.close()
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+
+if __name__ == "__main__":
+    # e.g. supervisor.py tetris pong, like arcade.py
+    logging.basicConfig(level=logging.INFO)
+    names = sys.argv[1:] or ["tetris"]
+    pads = open_launchpads()
+    Supervisor(pads, [names[i % len(names)] for i in range(len(pads))]).run()
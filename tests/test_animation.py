@@ -0,0 +1,114 @@
+from animation import (
+    LETTER_SPACING,
+    SPACE_WIDTH,
+    Animation,
+    Timeline,
+    blink_rows,
+    glyph,
+    marquee,
+    text_columns,
+)
+
+
+def test_keyframes_follow_their_durations():
+    animation = Animation([(0.1, [(0, 0, 3, 0)]), (0.2, [(1, 0, 0, 3)])])
+    assert animation.leds == [(0, 0, 3, 0)]
+    animation.advance(0.05)
+    assert animation.leds == [(0, 0, 3, 0)]
+    animation.advance(0.1)
+    assert animation.leds == [(1, 0, 0, 3)]
+    # the time left over from a keyframe counts for the next
+    animation.advance(0.15)
+    assert animation.done
+    assert animation.leds == []
+
+
+def test_timeline_calls_on_done_and_drops_finished_animations():
+    done = []
+    timeline = Timeline()
+    timeline.play(Animation([(0.1, [])], pause=False, on_done=lambda: done.append(1)))
+    timeline.play(Animation([(0.3, [])], pause=True, on_done=lambda: done.append(2)))
+    assert timeline.paused
+    timeline.advance(0.2)
+    assert done == [1]
+    assert len(timeline.animations) == 1
+    timeline.advance(0.2)
+    assert done == [1, 2]
+    assert not timeline.animations
+    assert not timeline.paused
+
+
+def test_later_animations_are_on_top():
+    timeline = Timeline()
+    timeline.play(Animation([(1, [(0, 0, 3, 0), (1, 0, 3, 0)])]))
+    timeline.play(Animation([(1, [(1, 0, 0, 3)])]))
+    assert timeline.leds() == {(0, 0): (3, 0), (1, 0): (0, 3)}
+
+
+def test_clear_doesnt_call_on_done():
+    done = []
+    timeline = Timeline()
+    timeline.play(Animation([(0.1, [])], on_done=lambda: done.append(1)))
+    timeline.clear()
+    timeline.advance(1)
+    assert done == []
+
+
+def test_blink_rows():
+    done = []
+    animation = blink_rows([2, 5], r=1, g=2, times=2, on_done=lambda: done.append(1))
+    assert animation.pause
+    timeline = Timeline()
+    timeline.play(animation)
+    lit = {(x, y): (1, 2) for y in (2, 5) for x in range(0, 8)}
+    off = {(x, y): (0, 0) for y in (2, 5) for x in range(0, 8)}
+    frames = []
+    for i in range(0, 4):
+        frames.append(timeline.leds())
+        timeline.advance(0.15)
+    assert frames == [lit, off, lit, off]
+    assert done == [1]
+    assert timeline.leds() == {}
+
+
+def test_glyphs_are_trimmed_to_their_lit_columns():
+    assert all(glyph("I")) and len(glyph("I")) < 8
+    assert glyph(" ") == (0,) * SPACE_WIDTH
+    assert glyph("\u2603") == glyph("?")
+    assert text_columns("II") == glyph("I") + (0,) * LETTER_SPACING + glyph("I")
+
+
+def test_marquee_scrolls_the_text_across_the_board():
+    columns = text_columns("Hi")
+    done = []
+    animation = marquee("Hi", r=2, g=1, interval=0.25, on_done=lambda: done.append(1))
+    timeline = Timeline()
+    timeline.play(animation)
+    steps = []
+    while not animation.done:
+        leds = animation.leds
+        # every LED of the board is painted, the unlit ones off
+        assert len(leds) == 64
+        steps.append(
+            tuple(
+                sum(1 << y for x2, y, r, g in leds if x2 == x and (r, g) == (2, 1))
+                for x in range(0, 8)
+            )
+        )
+        timeline.advance(0.25)
+    # the text comes in from the right until it has left on the left
+    assert len(steps) == len(columns) + 9
+    padded = (0,) * 8 + columns + (0,) * 8
+    assert steps == [padded[i : i + 8] for i in range(0, len(steps))]
+    assert steps[0] == steps[-1] == (0,) * 8
+    assert steps[8][0] == columns[0]
+    assert done == [1]
+    assert animation.leds == []
+
+
+def test_marquee_on_a_wider_board():
+    animation = marquee("I", width=16, interval=0.25)
+    # the text reaches the left column after 16 steps
+    animation.advance(0.25 * 16)
+    assert {x for x, y, r, g in animation.leds} == set(range(0, 16))
+    assert [x for x, y, r, g in animation.leds if (r, g) == (3, 3)][0] == 0
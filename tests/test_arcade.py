@@ -0,0 +1,49 @@
+from arcade import Arcade
+from flappy import FlappyBird
+from tetris import Tetris
+from virtualpad import VirtualLaunchpad
+
+
+def new_arcade():
+    pads = [VirtualLaunchpad(), VirtualLaunchpad()]
+    return Arcade([Tetris(lp=pads[0]), FlappyBird(lp=pads[1])]), pads
+
+
+def test_a_press_only_starts_the_game_of_its_launchpad():
+    arcade, pads = new_arcade()
+    assert not any(session.playing for session in arcade.sessions)
+    pads[1].press(3, 3)
+    arcade.update(1)
+    assert [session.playing for session in arcade.sessions] == [False, True]
+    sent = pads[0].messages
+    for i in range(0, 10):
+        arcade.update(1)
+        arcade.paint()
+    # the idle game doesn't paint anything
+    assert pads[0].messages == sent
+    assert pads[1].messages > 0
+
+
+def test_game_over_waits_for_the_next_press():
+    arcade, pads = new_arcade()
+    session = arcade.sessions[1]
+    pads[1].press(3, 3)
+    arcade.update(1)
+    # no flaps, the bird falls to the ground
+    for i in range(0, 60 * 30):
+        arcade.update(1)
+        if not session.playing:
+            break
+    assert session.game.game_over
+    assert not session.playing
+    # the game over marquee keeps playing without a press
+    assert session.game.timeline.animations
+    for i in range(0, 60 * 30):
+        arcade.update(1)
+        arcade.paint()
+    assert not session.game.timeline.animations
+    assert not session.playing
+    pads[1].press(0, 0)
+    arcade.update(1)
+    assert session.playing
+    assert not session.game.game_over
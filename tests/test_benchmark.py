@@ -0,0 +1,29 @@
+from benchmark import main, regressions
+
+
+def test_regressions_flag_metrics_worse_than_the_tolerance():
+    baseline = {"pong": {"steps_per_second": 1000, "bytes_per_frame": 2.0}}
+    results = {
+        "pong": {
+            "steps_per_second": 900,
+            "messages_per_frame": 1.0,
+            "bytes_per_frame": 2.5,
+            "peak_memory": 100,
+        },
+        "tetris": {"steps_per_second": 1},
+    }
+    found = regressions(results, baseline, tolerance=0.15)
+    # slower by 10% is within the tolerance, 25% more bytes isn't, and metrics or
+    # games without a baseline are skipped
+    assert len(found) == 1
+    assert found[0].startswith("pong: bytes_per_frame went from 2.0 to 2.5")
+
+
+def test_main_checks_against_the_baseline(tmp_path):
+    baseline = str(tmp_path / "baseline.json")
+    args = ["pong", "--frames", "120", "--repeat", "1", "--baseline", baseline]
+    # without a baseline the check fails instead of passing unchecked
+    assert main(args) == 2
+    assert main(args + ["--save"]) == 0
+    # the steps per second of such a short run vary too much to be compared
+    assert main(args + ["--tolerance", "1000"]) == 0
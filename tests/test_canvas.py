@@ -0,0 +1,78 @@
+import threading
+from canvas import TiledCanvas
+from ledwriter import BUFFER_MODE, led_color
+from virtualpad import VirtualLaunchpad
+
+
+def record_writes(pads):
+    """Returns the list the (pad, is_flip) of every message sent will be added to."""
+    writes = []
+    lock = threading.Lock()
+    for n, lp in enumerate(pads):
+
+        def record(stat, dat1, dat2, n=n, raw_write=lp.midi.RawWrite):
+            with lock:
+                writes.append((n, stat == 176 and dat1 == 0 and dat2 & BUFFER_MODE))
+            raw_write(stat, dat1, dat2)
+
+        lp.midi.RawWrite = record
+    return writes
+
+
+def frame(canvas, color):
+    """Returns the changes lighting the top LED of every column of the grid."""
+    stride = canvas.width + 1
+    return [(stride + x, color) for x in range(0, canvas.width)]
+
+
+def test_pads_flip_together():
+    pads = [VirtualLaunchpad() for i in range(0, 2)]
+    canvas = TiledCanvas(pads, columns=2)
+    try:
+        # the first frame also turns double buffering on
+        canvas.push(frame(canvas, led_color(0, 1)))
+        writes = record_writes(pads)
+        for i in range(0, 10):
+            del writes[:]
+            canvas.push(frame(canvas, led_color(i % 3 + 1, 0)))
+            flips = [k for k, (pad, flip) in enumerate(writes) if flip]
+            assert sorted(pad for pad, flip in writes if flip) == [0, 1]
+            # no pad flips before both wrote their part of the frame
+            assert min(flips) > max(
+                k for k, (pad, flip) in enumerate(writes) if not flip
+            )
+            assert pads[0].led(0, 1) == pads[1].led(7, 1) == (i % 3 + 1, 0)
+        stats = canvas.stats()
+        assert [s["frames"] for s in stats] == [11, 11]
+        assert [s["errors"] for s in stats] == [0, 0]
+        assert [s["messages"] for s in stats] == [lp.messages for lp in pads]
+    finally:
+        canvas.close()
+
+
+def test_failed_pad_doesnt_block_the_others():
+    pads = [VirtualLaunchpad() for i in range(0, 2)]
+    canvas = TiledCanvas(pads, columns=2)
+    try:
+        writer = canvas.writers[1]
+        push = writer.push
+
+        def fail(changes, show=True):
+            writer.push = push
+            raise OSError("device unplugged")
+
+        writer.push = fail
+        pushing = threading.Thread(
+            target=canvas.push, args=(frame(canvas, led_color(3, 0)),)
+        )
+        pushing.start()
+        pushing.join(2)
+        assert not pushing.is_alive()
+        assert pads[0].led(0, 1) == (3, 0)
+        assert not canvas.barrier.broken
+        canvas.push(frame(canvas, led_color(0, 3)))
+        assert pads[0].led(0, 1) == pads[1].led(7, 1) == (0, 3)
+        assert [s["errors"] for s in canvas.stats()] == [0, 1]
+        assert [s["frames"] for s in canvas.stats()] == [2, 2]
+    finally:
+        canvas.close()
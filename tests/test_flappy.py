@@ -0,0 +1,41 @@
+from canvas import TiledCanvas
+from flappy import FlappyBird
+from launchgame import ScrollingWorld
+from virtualpad import VirtualLaunchpad
+
+
+def test_vertical_world_on_a_wide_board():
+    world = ScrollingWorld(lambda n: bytes([n]) * 16, width=16, height=8, vertical=True)
+    assert world.at(3, 7) == 0
+    assert world.at(15, 0) == 7
+    world.scroll()
+    assert world.at(3, 7) == 1
+    assert world.at(15, 0) == 8
+
+
+def test_flappy_on_a_16x16_canvas():
+    pads = [VirtualLaunchpad() for i in range(0, 4)]
+    canvas = TiledCanvas(pads, columns=2)
+    try:
+        game = FlappyBird(writer=canvas)
+        assert (game.width, game.height) == (16, 16)
+        game.start_game(seed=5, countdown=False)
+        tubes = 0
+        bottom = []
+        while not game.game_over:
+            game.update([], 1, 1 / 60)
+            game.paint()
+            if game.y == game.height - 1:
+                # the bird is on the bottom row of the bottom left pad
+                bottom.append(pads[2].led(1, 8))
+            for x in range(0, game.width):
+                column = [game.world.at(x, y) for y in range(0, game.height)]
+                if any(column):
+                    tubes += 1
+                    assert column.count(0) == 6
+        assert tubes
+        # the bird fell through the whole board
+        assert game.y == game.height
+        assert (0, 3) in bottom
+    finally:
+        canvas.close()
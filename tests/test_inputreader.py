@@ -0,0 +1,52 @@
+import time
+from types import SimpleNamespace
+from inputreader import InputReader
+from virtualpad import VirtualLaunchpad, button_message
+
+
+class CallbackInput:
+    """An input port with a callback, like rtmidi.MidiIn."""
+
+    def __init__(self):
+        self.callback = None
+        self.polled = 0
+
+    def set_callback(self, callback):
+        self.callback = callback
+
+    def cancel_callback(self):
+        self.callback = None
+
+    def get_message(self):
+        self.polled += 1
+        return None, None
+
+
+def test_callback_input_is_queued_without_polling():
+    device = CallbackInput()
+    lp = SimpleNamespace(midi=SimpleNamespace(devIn=device))
+    lp.EventRaw = lambda: [] if device.get_message() == (None, None) else None
+    reader = InputReader(lp)
+    reader.start()
+    for i in range(100):
+        if device.callback is not None:
+            break
+        time.sleep(0.01)
+    device.callback((button_message(2, 3), 0.0), None)
+    assert reader.wait(1)
+    events = reader.drain()
+    assert [(e.status, e.note, e.pressed) for e in events] == [(144, 0x22, True)]
+    time.sleep(0.05)
+    reader.stop()
+    assert device.polled == 0
+    assert device.callback is None
+
+
+def test_virtual_launchpad_is_polled():
+    lp = VirtualLaunchpad()
+    reader = InputReader(lp)
+    reader.start()
+    lp.press(0, 0)
+    assert reader.wait(1)
+    assert [e.note for e in reader.drain()] == [104]
+    reader.stop()
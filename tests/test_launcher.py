@@ -0,0 +1,52 @@
+import threading
+from inputreader import read_events
+from launcher import Launcher
+from virtualpad import VirtualLaunchpad
+
+
+def test_switch_writes_only_from_the_writer_thread():
+    lp = VirtualLaunchpad()
+    launcher = Launcher(lp=lp)
+    threads = set()
+    raw_write = lp.midi.RawWrite
+
+    def record(stat, dat1, dat2):
+        threads.add(threading.current_thread().name)
+        raw_write(stat, dat1, dat2)
+
+    lp.midi.RawWrite = record
+    launcher.paint_menu()
+    launcher.switch("tetris")
+    launcher.switch("pong")
+    launcher.session.paint()
+    assert launcher.writer.flush(1)
+    assert threads == {"AsyncLedWriter"}
+
+
+def test_switch_keeps_the_pending_input():
+    lp = VirtualLaunchpad()
+    launcher = Launcher(lp=lp)
+    lp.press(2, 3)
+    launcher.switch("flappy")
+    events = read_events(lp)
+    assert [(e.note, e.pressed) for e in events] == [(0x22, True)]
+
+
+def test_menu_is_shown_again_after_game_over():
+    lp = VirtualLaunchpad()
+    launcher = Launcher(lp=lp)
+    launcher.paint_menu()
+    launcher.switch("tetris")
+    launcher.session.game.timeline.clear()
+    launcher.session.game.game_over = True
+    launcher.update(1)
+    assert not launcher.session.playing
+    for i in range(0, 100):
+        if not launcher.session.game.timeline.animations:
+            break
+        launcher.update(60)
+    launcher.update(1)
+    assert launcher.writer.flush(1)
+    assert [lp.led(x, 0) for x in range(0, len(launcher.names))] == [(0, 3)] * len(
+        launcher.names
+    )
@@ -0,0 +1,208 @@
+from animation import Animation
+from launchgame import (
+    Compositor,
+    LaunchGame,
+    ScrollingWorld,
+    Sprite,
+    score_leds,
+    sprite_mask,
+)
+from ledwriter import led_color
+from virtualpad import VirtualLaunchpad
+
+
+def new_game(**kwargs):
+    return LaunchGame("Test", 1, lp=VirtualLaunchpad(), has_high_score=False, **kwargs)
+
+
+def test_dithered_leds_converge_to_their_level():
+    game = new_game(tick_rate=240)
+    game.enable_dithering()
+    # the frames of the test are painted as fast as they can, never too slow
+    game.dither.min_cycle_rate = 0
+    levels = {}
+    for y in range(0, 8):
+        for x in range(0, 8):
+            levels[x, y] = 1.5 if y < 4 else x * 3 / 7
+            game.paint_fine(x, y, levels[x, y], 0)
+    totals = dict.fromkeys(levels, 0)
+    frames = 800
+    for frame in range(0, 80 + frames):
+        game.paint()
+        assert game.frame_leds <= game.dither.budget or frame == 0
+        if frame >= 80:
+            for x, y in levels:
+                totals[x, y] += game.lp.led(x, y + 1)[0]
+    for led, level in levels.items():
+        assert abs(totals[led] / frames - level) < 0.1, led
+
+
+def test_dithering_off_rounds_the_levels():
+    game = new_game()
+    game.paint_fine(0, 0, 1.4, 2.6)
+    game.paint()
+    assert game.lp.led(0, 1) == (1, 3)
+
+
+def test_sprite_mask_is_clipped_to_the_board():
+    assert sprite_mask((0b11,), 0, 0) == 0b11
+    assert sprite_mask((0b11,), 7, 0) == 1 << 7
+    assert sprite_mask((0b11,), -1, 0) == 1
+    assert sprite_mask((0b1, 0b1), 2, 7) == 1 << (7 * 8 + 2)
+    assert sprite_mask((0b1, 0b1), 2, -1) == 1 << 2
+    # on a wider board, the rows are width bits apart
+    assert sprite_mask((0b1, 0b1), 9, 0, width=16, height=16) == 1 << 9 | 1 << 25
+
+
+def test_compositor_draws_higher_layers_and_later_sprites_on_top():
+    compositor = Compositor()
+    low = compositor.add(Sprite((0b111,), 3, 0), z=0)
+    high = compositor.add(Sprite((0b010,), 0, 3), z=1)
+    compositor.add(Sprite((0b001,), 1, 1), z=0)
+    colors, covered = compositor.flatten()
+    assert colors == {(3, 0): 0b100, (0, 3): 0b010, (1, 1): 0b001}
+    assert covered == 0b111
+    low.visible = False
+    colors, covered = compositor.flatten()
+    assert colors == {(0, 3): 0b010, (1, 1): 0b001}
+    compositor.remove(low)
+    assert low not in compositor.layers[0]
+    compositor.remove(high)
+    assert 1 not in compositor.layers
+
+
+def test_sprites_of_the_same_color_are_merged():
+    compositor = Compositor()
+    compositor.add(Sprite((0b1,), 3, 0, x=0, y=0))
+    compositor.add(Sprite((0b1,), 3, 0, x=5, y=2))
+    compositor.add(Sprite((0b1,), 0, 3, x=5, y=2), z=-1)
+    assert compositor.flatten()[0] == {(3, 0): 1 | 1 << (2 * 8 + 5)}
+
+
+def test_sprites_are_painted():
+    game = new_game()
+    game.compositor.add(Sprite((0b11, 0b01), 0, 3, x=6, y=6))
+    game.paint_next(0, 0, 3, 0)
+    game.paint()
+    assert game.lp.led(6, 7) == game.lp.led(7, 7) == game.lp.led(6, 8) == (0, 3)
+    assert game.lp.led(7, 8) == (0, 0)
+    assert game.lp.led(0, 1) == (3, 0)
+
+
+def test_score_leds():
+    # the first player counts ones and nines on the top row
+    assert [lit for x, y, lit in score_leds(0, 0)] == [False] * 8
+    assert [x for x, y, lit in score_leds(3, 0) if lit] == [2]
+    assert [x for x, y, lit in score_leds(21, 0) if lit] == [1, 2]
+    assert all(y == 0 for x, y, lit in score_leds(21, 0))
+    # the second player has bars from the bottom of the right column
+    leds = score_leds(11, 1, width=16)
+    assert all(x == 16 for x, y, lit in leds)
+    assert [y for x, y, lit in leds if lit] == [7, 8]
+
+
+def test_score_changes_only_send_the_changed_leds():
+    game = new_game()
+    game.paint()
+    game.increase_score(3)
+    game.paint()
+    assert game.lp.led(2, 0) == (3, 3)
+    assert game.frame_leds == 1
+    game.increase_score(1)
+    game.paint()
+    assert game.lp.led(2, 0) == (0, 0)
+    assert game.lp.led(3, 0) == (3, 3)
+    assert game.frame_leds == 2
+    # the HUD stays when nothing else changes
+    game.paint()
+    assert game.frame_leds == 0
+    assert game.lp.led(3, 0) == (3, 3)
+
+
+def test_hud_stays_under_the_next_frames():
+    game = new_game()
+    game.paint_hud(8, 4, 2, 0)
+    for i in range(0, 3):
+        game.advance([], 1 / 60)
+        game.paint()
+        assert game.lp.led(8, 4) == (2, 0)
+    game.paint_hud(8, 4, 0, 0)
+    game.paint()
+    assert game.lp.led(8, 4) == (0, 0)
+    # the corner without a LED is never painted
+    game.paint_hud(8, 0, 3, 3)
+    assert game.hud.get(8) is None
+
+
+class RecordingWriter:
+    """Records the changes of every frame, like a LedWriter of any size."""
+
+    def __init__(self, width=8, height=8):
+        self.lp = VirtualLaunchpad()
+        self.width = width
+        self.height = height
+        self.frames = []
+        self.total_messages = 0
+
+    def push(self, changes):
+        self.frames.append(dict(changes))
+        self.total_messages += len(self.frames[-1])
+        return len(self.frames[-1]) * 3
+
+    def all_on(self, colorcode=None):
+        pass
+
+
+def test_paint_only_sends_the_changed_leds():
+    writer = RecordingWriter()
+    game = new_game(writer=writer)
+    game.paint_next(0, 0, 3, 0)
+    game.paint_next(5, 7, 0, 3)
+    game.paint()
+    assert writer.frames[-1] == {9: led_color(3, 0), 8 * 9 + 5: led_color(0, 3)}
+    # the buffers are swapped, the next frame is compared to the one just sent
+    game.paint_next(5, 7, 0, 0)
+    game.paint_next(1, 0, 1, 1)
+    game.paint()
+    assert writer.frames[-1] == {10: led_color(1, 1), 8 * 9 + 5: 0}
+    assert game.frame_leds == 2
+    assert game.frame_bytes == 6
+    game.paint_next(1, 0, 1, 1)
+    game.paint()
+    assert writer.frames[-1] == {}
+    assert game.frame_leds == 0
+
+
+def test_paint_draws_the_world_then_sprites_then_animations():
+    writer = RecordingWriter()
+    game = new_game(writer=writer)
+    game.world = ScrollingWorld(lambda n: bytes([led_color(1, 0)]) * 8)
+    game.compositor.add(Sprite((0b11,), 0, 3, x=0, y=0))
+    game.play(Animation([(1, [(1, 0, 3, 3)])], pause=False))
+    game.paint()
+    frame = writer.frames[-1]
+    assert frame[9] == led_color(0, 3)
+    assert frame[10] == led_color(3, 3)
+    assert frame[11] == led_color(1, 0)
+    assert len(frame) == 64
+    # the world shows again where the animation ends
+    game.advance([], 1)
+    game.paint()
+    assert writer.frames[-1] == {10: led_color(0, 3)}
+
+
+def test_paint_on_a_wider_board():
+    writer = RecordingWriter(16, 16)
+    game = new_game(writer=writer)
+    game.paint_next(15, 15, 3, 0)
+    game.paint_hud(16, 16, 0, 3)
+    game.paint()
+    # 17 LEDs per row, with the right column
+    assert writer.frames[-1] == {
+        16 * 17 + 15: led_color(3, 0),
+        16 * 17 + 16: led_color(0, 3),
+    }
+    game.paint_next(15, 15, 0, 0)
+    game.paint_next(9, 0, 2, 0)
+    game.paint()
+    assert writer.frames[-1] == {16 * 17 + 15: 0, 17 + 9: led_color(2, 0)}
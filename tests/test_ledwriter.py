@@ -0,0 +1,115 @@
+from ledwriter import LED_COUNT, RAPID_ORDER, RAPID_THRESHOLD, LedWriter, led_color
+from virtualpad import VirtualLaunchpad
+
+
+def grid_changes(velocity, count=64):
+    """Returns changes setting the first count LEDs of the 8x8 grid."""
+    return [(i, velocity) for i in RAPID_ORDER[:count]]
+
+
+class PlainPad:
+    """A device without rapid updates, which gets one LedCtrlXY per LED."""
+
+    def __init__(self):
+        self.leds = []
+
+    def LedCtrlXY(self, x, y, red, green):
+        self.leds.append((x, y, red, green))
+
+
+def test_duck_typed_rapid_detection():
+    assert LedWriter(VirtualLaunchpad()).rapid
+    writer = LedWriter(PlainPad())
+    assert not writer.rapid
+    assert not writer.double_buffer
+
+
+def test_unchanged_leds_are_not_sent():
+    lp = VirtualLaunchpad()
+    writer = LedWriter(lp)
+    writer.push([(10, led_color(3, 0))])
+    lp.reset_counters()
+    assert writer.push([(10, led_color(3, 0))]) == 0
+    assert lp.messages == 0
+
+
+def test_single_led_with_double_buffering():
+    lp = VirtualLaunchpad()
+    writer = LedWriter(lp)
+    # entering the buffer mode, the LED and the flip
+    assert writer.push([(10, led_color(3, 0))]) == 9
+    assert lp.messages == 3
+    assert lp.led(1, 1) == (3, 0)
+    lp.reset_counters()
+    writer.push([(10, 0), (11, led_color(0, 3))])
+    # the two LEDs and the flip
+    assert lp.messages == 3
+    assert lp.led(1, 1) == (0, 0)
+    assert lp.led(2, 1) == (0, 3)
+
+
+def test_single_buffer_sends_one_message_per_led():
+    lp = VirtualLaunchpad()
+    writer = LedWriter(lp, double_buffer=False)
+    writer.push(grid_changes(led_color(1, 1), 5))
+    assert lp.messages == 5
+    assert writer.frame_messages == 5
+
+
+def test_rapid_update_for_most_of_the_board():
+    lp = VirtualLaunchpad()
+    writer = LedWriter(lp)
+    writer.push([(10, led_color(3, 3))])
+    lp.reset_counters()
+    writer.push(grid_changes(led_color(2, 1), RAPID_THRESHOLD + 1))
+    # the cursor rewind, every LED two at a time and the flip
+    assert lp.messages == 1 + len(RAPID_ORDER) // 2 + 1
+    for i in RAPID_ORDER[: RAPID_THRESHOLD + 1]:
+        assert lp.led(i % 9, i // 9) == (2, 1)
+
+
+def test_below_threshold_sends_single_leds():
+    lp = VirtualLaunchpad()
+    writer = LedWriter(lp)
+    writer.push([(10, led_color(3, 3))])
+    lp.reset_counters()
+    writer.push(grid_changes(led_color(2, 1), RAPID_THRESHOLD))
+    assert lp.messages == RAPID_THRESHOLD + 1
+
+
+def test_frame_is_only_shown_on_flip():
+    lp = VirtualLaunchpad()
+    writer = LedWriter(lp)
+    writer.push([(10, led_color(3, 0))])
+    writer.push([(20, led_color(0, 3))], show=False)
+    assert lp.led(2, 2) == (0, 0)
+    writer.flip()
+    assert lp.led(2, 2) == (0, 3)
+    assert lp.led(1, 1) == (3, 0)
+
+
+def test_write_now_reaches_both_buffers():
+    lp = VirtualLaunchpad()
+    writer = LedWriter(lp)
+    writer.push([(10, led_color(3, 0))])
+    writer.write_now(0, 0, 0, 3)
+    writer.flip()
+    assert lp.led(0, 0) == (0, 3)
+    assert writer.shadow[0] == led_color(0, 3)
+
+
+def test_all_on_resets_the_shadow():
+    lp = VirtualLaunchpad()
+    writer = LedWriter(lp)
+    writer.push([(10, led_color(3, 0))])
+    writer.all_on(0)
+    assert writer.shadow == bytearray(LED_COUNT)
+    assert not writer.buffering
+    assert lp.led(1, 1) == (0, 0)
+
+
+def test_plain_device_gets_led_ctrl_xy():
+    lp = PlainPad()
+    writer = LedWriter(lp)
+    writer.push([(10, led_color(3, 1)), (2, led_color(1, 0))])
+    assert sorted(lp.leds) == [(1, 1, 3, 1), (2, 0, 1, 0)]
@@ -0,0 +1,71 @@
+import socket
+from netpong import (
+    HELLO,
+    HELLO_PACKET,
+    INPUT,
+    INPUT_PACKET,
+    RollbackSession,
+    loopback_test,
+)
+from pong import Pong
+from virtualpad import VirtualLaunchpad
+
+
+class QueueLink:
+    """A link to the other player whose packets are given by the test."""
+
+    def __init__(self, packets=()):
+        self.packets = list(packets)
+        self.sent = []
+
+    def send(self, data):
+        self.sent.append(data)
+
+    def receive(self):
+        packets = self.packets
+        self.packets = []
+        return packets
+
+
+def test_malformed_packets_are_dropped():
+    link = QueueLink(
+        [INPUT, INPUT + b"\x01\x02", INPUT_PACKET.pack(INPUT, 0, 0, 2) + b"\x01\x00"]
+    )
+    session = RollbackSession(Pong(lp=VirtualLaunchpad()), 0, link)
+    session.seed = 1
+    session.start()
+    session.receive(1 / 60)
+    assert session.remote == {0: 1, 1: 0}
+    assert session.confirmed == 1
+
+
+def test_malformed_hello_is_dropped():
+    link = QueueLink([HELLO, HELLO_PACKET.pack(HELLO, 7)])
+    session = RollbackSession(Pong(lp=VirtualLaunchpad()), 1, link)
+    assert session.connect(timeout=1)
+    assert session.seed == 7
+
+
+def free_ports():
+    """Returns a UDP port that is free on this machine, along with the next one."""
+    for i in range(0, 20):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as first:
+            first.bind(("127.0.0.1", 0))
+            port = first.getsockname()[1]
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as second:
+                try:
+                    second.bind(("127.0.0.1", port + 1))
+                except OSError:
+                    continue
+        return port
+    raise OSError("No free ports")
+
+
+def test_loopback_stays_synced_over_a_bad_network():
+    synced, stats = loopback_test(
+        frames=600, latency=0.05, jitter=0.03, loss=0.2, seed=3, port=free_ports()
+    )
+    assert synced
+    # the late input really made both sides roll back
+    assert all(s["rollbacks"] and s["replayed"] for s in stats)
+    assert [s["ahead"] for s in stats] == [0, 0]
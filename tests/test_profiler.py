@@ -0,0 +1,110 @@
+import json
+import logging
+from launchgame import LaunchGame
+from profiler import FrameProfiler, percentile
+from virtualpad import VirtualLaunchpad
+
+
+class Walker(LaunchGame):
+    """A game moving a LED along the board for 40 ticks."""
+
+    def __init__(self, lp):
+        super().__init__("Walker", lp=lp, has_high_score=False)
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self.ticks = 0
+
+    def step(self, events, delta):
+        self.ticks += 1
+        self.paint_next(self.ticks % 8, self.ticks // 8 % 8, 3, 0)
+        self.game_over = self.ticks >= 40
+
+    def process_game_over(self):
+        pass
+
+
+def run_walker(asynchronous, caplog):
+    # debug logging skips the countdown
+    caplog.set_level(logging.DEBUG)
+    lp = VirtualLaunchpad()
+    game = Walker(lp)
+    if asynchronous:
+        game.use_async_output()
+    game.run_game()
+    if asynchronous:
+        game.writer.stop()
+    return game, lp
+
+
+def test_profiler_counts_the_output_sent_by_the_async_writer(caplog):
+    game, lp = run_walker(False, caplog)
+    messages = game.profiler.values("messages")
+    nbytes = game.profiler.values("bytes")
+    # every frame turns a LED off and the next one on, then flips the buffers
+    assert sum(messages) == 40 * 3
+    game, lp = run_walker(True, caplog)
+    assert game.profiler.values("messages") == messages
+    assert game.profiler.values("bytes") == nbytes
+
+
+def test_percentiles_are_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([7], 90) == 7
+    assert percentile([], 50) == 0
+
+
+def test_ring_buffer_keeps_the_last_frames():
+    profiler = FrameProfiler(capacity=4)
+    assert profiler.values("steps") == []
+    for i in range(0, 6):
+        profiler.record(i, i, 0, 0, 0, 0, 0, 0)
+    assert profiler.count == 4
+    assert profiler.values("steps") == [2, 3, 4, 5]
+    profiler.record_output((profiler.index - 1) % 4, 7, 21)
+    assert profiler.values("messages") == [0, 0, 0, 7]
+    assert profiler.values("bytes") == [0, 0, 0, 21]
+
+
+def test_summary():
+    profiler = FrameProfiler()
+    for i in range(0, 11):
+        painted = i % 2 == 0
+        profiler.record(
+            i * 0.01,
+            1,
+            0.002,
+            0.001 if painted else 0,
+            i if painted else 0,
+            i if painted else 0,
+            3 * i if painted else 0,
+            0.005 if i == 4 else 0,
+        )
+    summary = profiler.summary()
+    assert summary["frames"] == 11
+    assert round(summary["fps"]) == 100
+    assert summary["steps"]["mean"] == 1
+    # the LEDs only count the painted frames: 0, 2, ..., 10
+    assert summary["leds"]["mean"] == 5
+    assert summary["leds"]["p50"] == 4
+    assert summary["leds"]["p99"] == 10
+    # the latency only counts the frames with input
+    assert summary["latency"]["mean"] == 0.005
+
+
+def test_chrome_trace(tmp_path):
+    profiler = FrameProfiler()
+    profiler.record(1.0, 2, 0.003, 0.001, 5, 6, 18, 0.004)
+    profiler.record(1.02, 1, 0.002, 0, 0, 0, 0, 0)
+    path = tmp_path / "trace.json"
+    profiler.write_chrome_trace(path)
+    events = json.loads(path.read_text())["traceEvents"]
+    assert [e["name"] for e in events] == ["step", "paint", "output", "step", "output"]
+    step, paint, output = events[0:3]
+    assert step["ts"] == 1e6 and step["dur"] == 3000 and step["args"]["steps"] == 2
+    assert paint["ts"] == 1e6 + 3000 and paint["dur"] == 1000
+    assert paint["args"]["latency_ms"] == 4
+    assert output["args"] == {"leds": 5, "messages": 6}
@@ -0,0 +1,70 @@
+import random
+from inputreader import ButtonEvent
+from recorder import Recorder, load_replay
+from tetris import Tetris
+from virtualpad import VirtualLaunchpad
+
+# notes of the bottom row buttons, the "H" button and a rotate button
+NOTES = (112, 113, 118, 119, 120, 1)
+
+
+def state(game):
+    return (game.board, bytes(game.colors), list(game.scores), game.x, game.y)
+
+
+def record(path, ticks, events_per_tick=lambda i: 0):
+    """Records a game of Tetris with random presses, returning its states by tick."""
+    game = Tetris(lp=VirtualLaunchpad())
+    recorder = Recorder(path, game)
+    game.start_game(seed=7, countdown=False)
+    rng = random.Random(0)
+    states = [state(game)]
+    for i in range(ticks):
+        events = [
+            ButtonEvent(i / 60, 144, rng.choice(NOTES), 127)
+            for k in range(events_per_tick(i))
+        ]
+        if rng.random() < 0.1:
+            events.append(ButtonEvent(i / 60, 144, rng.choice(NOTES), 127))
+        game.advance(events, 1 / 60)
+        states.append(state(game))
+    recorder.close()
+    return states
+
+
+class CountingTetris(Tetris):
+    advances = 0
+
+    def advance(self, events, delta):
+        CountingTetris.advances += 1
+        super().advance(events, delta)
+
+
+def test_replay_matches_the_recording(tmp_path):
+    path = str(tmp_path / "tetris.rec")
+    states = record(path, 1000)
+    replay = load_replay(path, lp=VirtualLaunchpad(), snapshot_interval=100)
+    assert state(replay.game) == states[0]
+    for frame in (1000, 250, 0, 999, 500):
+        replay.seek(frame)
+        assert state(replay.game) == states[frame]
+
+
+def test_first_seek_replays_less_than_the_snapshot_interval(tmp_path):
+    path = str(tmp_path / "tetris.rec")
+    record(path, 1000)
+    replay = load_replay(path, lp=VirtualLaunchpad(), snapshot_interval=100)
+    game = replay.game
+    game.__class__ = CountingTetris
+    CountingTetris.advances = 0
+    replay.seek(999)
+    assert CountingTetris.advances == 99
+
+
+def test_ticks_with_many_events_are_recorded(tmp_path):
+    path = str(tmp_path / "tetris.rec")
+    states = record(path, 100, lambda i: 300 if i == 50 else 0)
+    replay = load_replay(path, lp=VirtualLaunchpad(), snapshot_interval=100)
+    assert len(replay.ticks[50][0]) >= 300
+    replay.seek(100)
+    assert state(replay.game) == states[100]
@@ -0,0 +1,66 @@
+from scheduler import Scheduler
+
+
+class FakeClock:
+    """A clock that only moves when told to, and when slept on."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def new_scheduler(**kwargs):
+    clock = FakeClock()
+    scheduler = Scheduler(10, clock=clock, sleep=clock.sleep, **kwargs)
+    scheduler.start()
+    return scheduler, clock
+
+
+def test_first_tick_is_due_right_away():
+    scheduler, clock = new_scheduler()
+    assert scheduler.steps() == 1
+    assert scheduler.steps() == 0
+
+
+def test_wait_sleeps_until_the_next_tick():
+    scheduler, clock = new_scheduler()
+    scheduler.steps()
+    clock.now += 0.03
+    scheduler.wait()
+    assert abs(clock.now - 100.1) < 1e-9
+    assert scheduler.steps() == 1
+
+
+def test_late_steps_are_caught_up():
+    scheduler, clock = new_scheduler()
+    scheduler.steps()
+    clock.now += 0.35
+    assert scheduler.steps() == 3
+    # the next tick stays on the grid of the first one
+    assert abs(scheduler.next_tick - 100.4) < 1e-9
+
+
+def test_time_past_max_steps_is_dropped():
+    scheduler, clock = new_scheduler(max_steps=5)
+    scheduler.steps()
+    clock.now += 2
+    assert scheduler.steps() == 5
+    assert abs(scheduler.next_tick - (clock.now + 0.1)) < 1e-9
+    assert scheduler.steps() == 0
+
+
+def test_frames_are_skipped_while_behind_but_not_forever():
+    scheduler, clock = new_scheduler(max_skipped_frames=2)
+    scheduler.steps()
+    assert scheduler.should_render()
+    clock.now += 0.1
+    assert not scheduler.should_render()
+    assert not scheduler.should_render()
+    assert scheduler.should_render()
+    scheduler.steps()
+    assert scheduler.should_render()
@@ -0,0 +1,59 @@
+import random
+from space_invadors import AlienStore
+
+
+def check_consistent(store):
+    """Checks the grid and the row bitmasks against the aliens themselves."""
+    grid = [None] * 64
+    rows = [0] * 8
+    for alien in store:
+        assert grid[alien.y * 8 + alien.x] is None
+        grid[alien.y * 8 + alien.x] = alien
+        rows[alien.y] |= 1 << alien.x
+    assert store.grid == grid
+    assert store.rows == rows
+
+
+def test_add_move_remove():
+    store = AlienStore()
+    first = store.add(1, 0, [1, 1])
+    second = store.add(3, 0, [2, 2])
+    assert len(store) == 2
+    assert list(store) == [first, second]
+    assert store.at(1, 0) is first
+    assert not store.is_free(3, 0)
+    assert store.free_columns(0) == [0, 2, 4, 5, 6, 7]
+    store.move(first, 1, 1)
+    assert store.at(1, 0) is None
+    assert store.at(1, 1) is first
+    assert store.is_free(1, 0)
+    store.remove(second)
+    assert list(store) == [first]
+    assert store.free_columns(0) == list(range(0, 8))
+    check_consistent(store)
+
+
+def test_off_the_board():
+    store = AlienStore()
+    assert store.at(-1, 0) is None
+    assert store.at(8, 0) is None
+    assert not store.is_free(0, 8)
+    assert not store.is_free(-1, 3)
+
+
+def test_random_operations_keep_the_indexes_consistent():
+    rng = random.Random(1)
+    store = AlienStore()
+    for i in range(0, 2000):
+        aliens = list(store)
+        op = rng.random()
+        x, y = rng.randrange(8), rng.randrange(8)
+        if op < 0.4 and store.is_free(x, y):
+            store.add(x, y, [1, 1])
+        elif op < 0.7 and aliens:
+            alien = rng.choice(aliens)
+            if store.is_free(x, y):
+                store.move(alien, x, y)
+        elif aliens:
+            store.remove(rng.choice(aliens))
+        check_consistent(store)
@@ -0,0 +1,81 @@
+import urllib.request
+from launchgame import LaunchGame
+from spectator import BACKLOG, KEYFRAME_INTERVAL, Channel, SpectatorServer, spectate
+from virtualpad import VirtualLaunchpad
+
+
+def apply(leds, message):
+    """Applies a message of a channel to the LEDs of a viewer, like view does."""
+    kind, *rest = message.split(" ")
+    if kind == "k":
+        return bytearray.fromhex(rest[2])
+    data = bytes.fromhex(rest[0])
+    for k in range(0, len(data), 3):
+        leds[data[k] << 8 | data[k + 1]] = data[k + 2]
+    return leds
+
+
+def test_only_the_changes_are_published():
+    channel = Channel("test", width=16, height=16)
+    channel.publish([(10, 3), (11, 0)])
+    assert channel.wait(0, 0) == [(1, "d 000a03")]
+    # nothing changed, nothing is published
+    channel.publish([(10, 3), (11, 0)])
+    assert channel.frame == 1
+    channel.publish([(288, 1)])
+    assert channel.wait(1, 0) == [(2, "d 012001")]
+
+
+def test_a_keyframe_is_published_every_interval():
+    channel = Channel("test")
+    kinds = []
+    for i in range(0, KEYFRAME_INTERVAL * 2):
+        channel.publish([(i % 81, i % 2 + 1)])
+        kinds.append(channel.messages[-1][1][0])
+    assert kinds.count("k") == 2
+    assert kinds[KEYFRAME_INTERVAL - 1] == "k"
+
+
+def test_viewer_that_follows_sees_the_board():
+    channel = Channel("test", width=16, height=8)
+    frame, message = channel.keyframe()
+    leds = apply(bytearray(), message)
+    for i in range(0, 500):
+        channel.publish([((i * 7) % len(channel.leds), i % 4)])
+        for frame, message in channel.wait(frame, 0):
+            leds = apply(leds, message)
+    assert leds == channel.leds
+
+
+def test_wait_times_out_with_nothing():
+    channel = Channel("test")
+    assert channel.wait(0, 0.01) == []
+
+
+def test_viewer_too_far_behind_gets_none():
+    channel = Channel("test")
+    for i in range(0, BACKLOG + 2):
+        channel.publish([(0, i % 2 + 1)])
+    assert channel.wait(0, 0) is None
+    assert len(channel.wait(2, 0)) == BACKLOG
+    # a new keyframe lets the viewer catch up from the current board
+    frame, message = channel.keyframe()
+    assert frame == BACKLOG + 2
+    assert apply(bytearray(), message) == channel.leds
+
+
+def test_stream_over_http():
+    server = SpectatorServer(port=0)
+    try:
+        game = LaunchGame("Test", 1, lp=VirtualLaunchpad(), has_high_score=False)
+        spectate(game, server)
+        game.paint_next(2, 3, 3, 0)
+        game.paint()
+        url = "http://127.0.0.1:" + str(server.server_address[1])
+        with urllib.request.urlopen(url + "/stream/Test", timeout=5) as response:
+            line = response.readline().decode().strip()
+        assert line.startswith("data: k 8 8 ")
+        leds = apply(bytearray(), line[6:])
+        assert leds[4 * 9 + 2] == 3
+    finally:
+        server.stop()
@@ -0,0 +1,75 @@
+import time
+from inputreader import ButtonEvent
+from launchgame import LaunchGame
+from supervisor import HEADER, MIN_HANG_TIMEOUT, Supervisor
+from virtualpad import VirtualLaunchpad
+
+
+class QuickStartGame(LaunchGame):
+    """Starts without the countdown, so that its first tick comes right away."""
+
+    def __init__(self, lp=None):
+        super().__init__(type(self).__name__, 1, lp=lp, has_high_score=False)
+
+    def start_game(self, seed=None, countdown=False):
+        super().start_game(seed, countdown)
+
+
+class HangingGame(QuickStartGame):
+    """Hangs on its first tick."""
+
+    def step(self, events, delta):
+        time.sleep(60)
+
+
+class SlowGame(QuickStartGame):
+    """Takes 6 ticks of 60 Hz for every tick, but never stops ticking."""
+
+    def step(self, events, delta):
+        time.sleep(0.1)
+
+
+class CrashingGame(QuickStartGame):
+    """Crashes on its first tick."""
+
+    def step(self, events, delta):
+        raise RuntimeError("crash")
+
+
+def supervise(game, seconds):
+    """Runs a supervisor with the given game, starts the game once its worker ticks
+    and returns the number of restarts and the hang timeout after the given number
+    of seconds.
+    """
+    supervisor = Supervisor([VirtualLaunchpad()], [game])
+    worker = supervisor.workers[0]
+    try:
+        deadline = time.monotonic() + 5
+        # the heartbeat is in the future until the first tick, see START_TIMEOUT
+        while HEADER.unpack_from(worker.memory.buf, 0)[1] > time.monotonic():
+            assert time.monotonic() < deadline
+            supervisor.update()
+            time.sleep(1 / 60)
+        # the worker ticks, any button starts the game
+        worker.send_input([ButtonEvent(time.monotonic(), 144, 0, 127)])
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            supervisor.update()
+            time.sleep(1 / 60)
+        return worker.restarts, worker.hang_timeout()
+    finally:
+        supervisor.close()
+
+
+def test_hung_game_is_restarted():
+    assert supervise(HangingGame, 1)[0] == 1
+
+
+def test_crashed_game_is_restarted():
+    assert supervise(CrashingGame, 1)[0] == 1
+
+
+def test_slow_game_is_not_restarted():
+    restarts, hang_timeout = supervise(SlowGame, 2)
+    assert restarts == 0
+    assert hang_timeout > MIN_HANG_TIMEOUT
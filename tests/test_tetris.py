@@ -0,0 +1,99 @@
+from tetris import BLOCKS, FLOOR, ROTATIONS, Tetris
+from virtualpad import VirtualLaunchpad
+
+
+def absolute_cells(game):
+    orientation = ROTATIONS[game.block][game.rotation]
+    return sorted((game.x + x, game.y + y) for x, y in orientation.cells)
+
+
+def test_kicks_add_up_to_nothing():
+    for orientations in ROTATIONS:
+        assert sum(o.kick[0] for o in orientations) == 0
+        assert sum(o.kick[1] for o in orientations) == 0
+
+
+def test_four_rotations_return_every_block_to_its_start():
+    game = Tetris(lp=VirtualLaunchpad())
+    for block in range(len(BLOCKS)):
+        for rotation in range(4):
+            game.board = FLOOR
+            game.block = block
+            game.rotation = rotation
+            game.x = 2
+            game.y = 3
+            start = absolute_cells(game)
+            for i in range(4):
+                game.rotate_block()
+                assert game.rotation == (rotation + i + 1) % 4
+            assert absolute_cells(game) == start
+
+
+class CheckedTetris(Tetris):
+    """Tetris recording where the autopilot planned each block and where it landed."""
+
+    def __init__(self, lp):
+        self.landings = []
+        super().__init__(lp=lp)
+
+    def land(self):
+        self.landings.append((self.target, (self.rotation, self.x, self.y)))
+        super().land()
+
+
+def test_autopilot_blocks_land_where_planned():
+    for seed in range(3):
+        game = CheckedTetris(VirtualLaunchpad())
+        game.autopilot = True
+        game.start_game(seed=seed, countdown=False)
+        for i in range(60 * 120):
+            game.advance([], 1 / 60)
+            if game.game_over:
+                break
+        planned = [(target, landed) for target, landed in game.landings if target]
+        assert len(planned) > 20
+        for target, landed in planned:
+            assert target == landed
+
+
+def test_board_is_cleared_after_game_over():
+    lp = VirtualLaunchpad()
+    game = Tetris(lp=lp)
+    game.autopilot = True
+    game.start_game(seed=3, countdown=False)
+    while not game.game_over:
+        game.update([], 1, 1 / 60)
+        game.paint()
+    assert lp.render() != VirtualLaunchpad().render()
+    game.process_game_over()
+    game.timeline.clear()
+    game.play_out()
+    assert lp.render() == VirtualLaunchpad().render()
+    game.start_game(seed=4, countdown=False)
+    while game.y < 1:
+        game.update([], 1, 1 / 60)
+    game.paint()
+    assert lp.render() != VirtualLaunchpad().render()
+
+
+def test_level_stays_below_the_top_right_corner():
+    lp = VirtualLaunchpad()
+    game = Tetris(lp=lp)
+    game.start_game(seed=1, countdown=False)
+    corner = []
+    raw_write = lp.midi.RawWrite
+
+    def record(stat, dat1, dat2):
+        if stat == 176 and dat1 == 112:
+            corner.append(dat2)
+        raw_write(stat, dat1, dat2)
+
+    lp.midi.RawWrite = record
+    for level in range(1, 12):
+        game.blocks_passed = 15
+        game.new_block()
+        game.paint()
+        assert game.level == level + 1
+    assert corner == []
+    assert lp.led(8, 1) == (3, 3)
+    assert lp.led(8, 7) == (2, 2)
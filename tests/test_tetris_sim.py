@@ -0,0 +1,94 @@
+import numpy as np
+from inputreader import ButtonEvent
+from tetris import Tetris, best_placement
+from tetris_sim import BOARD_ROWS, DROP, LEFT, NOOP, RIGHT, ROTATE, TetrisBatch
+from virtualpad import VirtualLaunchpad
+
+# the button of every action of the batch
+NOTES = {LEFT: 112, RIGHT: 116, ROTATE: 0, DROP: 120}
+
+
+class BatchTetris(Tetris):
+    """Tetris with the blocks of a TetrisBatch, and the full rows removed at once
+    like in the batch.
+    """
+
+    def __init__(self, batch):
+        self.batch = batch
+        super().__init__(lp=VirtualLaunchpad())
+
+    def new_block(self):
+        super().new_block()
+        self.block = int(self.batch.block[0])
+        self.rotation = int(self.batch.rotation[0])
+        self.x = int(self.batch.x[0])
+        self.y = int(self.batch.y[0])
+
+    def play(self, animation):
+        animation.on_done()
+
+
+def board_rows(game):
+    return [(game.board >> row * 8) & 0xFF for row in range(0, BOARD_ROWS)]
+
+
+def next_action(game, rng):
+    """Returns the action taking the block towards the placement the autopilot would
+    pick, or a random one now and then, so that rows are cleared and levels go up.
+    """
+    if rng.random() < 0.1:
+        return rng.choice([NOOP, LEFT, RIGHT, ROTATE, DROP])
+    if game.target is None:
+        game.target = best_placement(
+            game.board,
+            game.block,
+            game.rotation,
+            game.x,
+            game.y,
+            game.moves_per_row(1 / 60),
+        )
+    if game.target is None:
+        return DROP
+    rotation, x, y = game.target
+    if game.rotation != rotation:
+        return ROTATE
+    if game.x != x:
+        return LEFT if x < game.x else RIGHT
+    return NOOP
+
+
+def test_batch_plays_like_the_game():
+    scores = []
+    levels = []
+    for seed in range(0, 3):
+        batch = TetrisBatch(1, seed=seed)
+        batch.reset()
+        game = BatchTetris(batch)
+        game.start_game(seed=seed, countdown=False)
+        rng = np.random.default_rng(seed)
+        for tick in range(0, 4000):
+            action = next_action(game, rng)
+            obs, reward, done, info = batch.step([action])
+            events = []
+            if action in NOTES:
+                events = [ButtonEvent(0, 144, NOTES[action], 127)]
+            game.update(events, 1, batch.delta)
+            if done[0]:
+                assert game.game_over, tick
+                break
+            assert not game.game_over, tick
+            state = (game.block, game.rotation, game.x, game.y)
+            assert state == (
+                batch.block[0],
+                batch.rotation[0],
+                batch.x[0],
+                batch.y[0],
+            ), tick
+            assert board_rows(game) == list(batch.board[0, 0:BOARD_ROWS]), tick
+            assert game.scores[0] == info["score"][0], tick
+            assert game.level == info["level"][0], tick
+        scores.append(game.scores[0])
+        levels.append(game.level)
+    # the rows and levels were compared too
+    assert max(scores) > 0
+    assert max(levels) > 1
@@ -0,0 +1,59 @@
+from inputreader import read_events
+from launchgame import LaunchGame
+from virtualpad import VirtualLaunchpad, button_message
+
+
+class Board(LaunchGame):
+    """A game painting the LEDs it is given on every step."""
+
+    def __init__(self, lp):
+        super().__init__("Board", lp=lp)
+        self.leds = []
+        self.reset()
+
+    def step(self, events, delta):
+        for x, y in self.leds:
+            self.paint_next(x, y, 3, 0)
+
+
+def test_button_messages():
+    assert button_message(2, 0) == [176, 106, 127]
+    assert button_message(3, 4, False) == [144, 3 << 4 | 3, 0]
+
+
+def test_pressed_buttons_are_read():
+    lp = VirtualLaunchpad()
+    lp.press(1, 2)
+    lp.release(1, 2)
+    events = read_events(lp)
+    assert [(e.pressed, e.note) for e in events] == [(True, 0x11), (False, 0x11)]
+    assert lp.EventRaw() == []
+
+
+def test_paint_only_sends_the_changed_leds():
+    lp = VirtualLaunchpad()
+    game = Board(lp)
+    game.start_game(seed=0, countdown=False)
+    game.leds = [(0, 0), (1, 0)]
+    game.advance([], 1 / 60)
+    game.paint()
+    assert game.frame_leds == 2
+    assert lp.led(0, 1) == (3, 0)
+    game.advance([], 1 / 60)
+    game.paint()
+    assert game.frame_leds == 0
+    assert game.frame_bytes == 0
+    game.leds = [(1, 0)]
+    game.advance([], 1 / 60)
+    game.paint()
+    assert game.frame_leds == 1
+    assert lp.led(0, 1) == (0, 0)
+    assert lp.led(1, 1) == (3, 0)
+
+
+def test_led_ctrl_char_matches_the_font():
+    lp = VirtualLaunchpad()
+    lp.LedCtrlChar("A", 0, 3)
+    # the middle bar of the "A"
+    assert all(lp.led(x, 5) == (0, 3) for x in range(1, 7))
+    assert lp.led(0, 1) == (0, 0)
@@ -1,173 +1,459 @@
-import random
 import logging
-import numpy as np
-import time
-from launchgame import LaunchGame
+from collections import namedtuple
+from functools import lru_cache
+from animation import blink_rows
+from launchgame import LaunchGame, Sprite
+from ledwriter import led_color
+
+# The board is a bitboard: a single integer with bit (y + HIDDEN_ROWS) * 8 + x set
+# for every fallen block. Blocks spawn partly above the board, in the hidden rows,
+# and the row below the board is always full so that it acts as the floor.
+HIDDEN_ROWS = 2
+BOARD_SHIFT = HIDDEN_ROWS * 8
+BOARD_MASK = (1 << 64) - 1
+FLOOR = 0xFF << (HIDDEN_ROWS + 8) * 8
+FULL_ROW = 0xFF
+
+BLOCKS = [
+    [[0, 0], [1, 0], [2, 0], [3, 0]],
+    [[0, -1], [0, 0], [1, -1], [1, 0]],
+    [[0, -1], [1, -1], [2, -1], [1, 0]],
+    [[0, -1], [1, -1], [2, -1], [2, 0]],
+    [[0, -1], [1, -1], [2, -1], [0, 0]],
+    [[0, -1], [1, -1], [1, 0], [2, 0]],
+    [[0, -1], [1, -1], [1, 0], [2, -1]],
+]
+
+# One orientation of a block, with its cells relative to its top left corner.
+# rows are the bitmasks of its rows, as the image of a Sprite.
+# kick is how much the corner moves when the block is rotated to the next orientation.
+Orientation = namedtuple(
+    "Orientation", ["mask", "width", "height", "cells", "rows", "kick"]
+)
+
+
+def rotations(block):
+    """Returns the 4 orientations of a block.
+    Each orientation is the previous one rotated clockwise by 90 degrees inside a
+    fixed square box around the block, like the Super Rotation System. The kicks
+    move the corner of the block within that box, so 4 rotations bring the block
+    back to where it started.
+    Args:
+        block (list): The [x, y] coordinates of the cells of the block.
+    """
+    left = min(c[0] for c in block)
+    top = min(c[1] for c in block)
+    width = max(c[0] for c in block) - left + 1
+    height = max(c[1] for c in block) - top + 1
+    size = max(width, height)
+    # the block starts in the middle rows of its box, e.g. the I block on the second
+    shift = (size - height) // 2
+    boxed = [[(x - left, y - top + shift) for x, y in block]]
+    for i in range(3):
+        boxed.append([(size - 1 - y, x) for x, y in boxed[-1]])
+    corners = [(min(c[0] for c in cells), min(c[1] for c in cells)) for cells in boxed]
+    orientations = []
+    for i in range(4):
+        corner = corners[i]
+        cells = [(x - corner[0], y - corner[1]) for x, y in boxed[i]]
+        next_corner = corners[(i + 1) % 4]
+        height = max(c[1] for c in cells) + 1
+        orientations.append(
+            Orientation(
+                mask=sum(1 << (y * 8 + x) for x, y in cells),
+                width=max(c[0] for c in cells) + 1,
+                height=height,
+                cells=tuple(cells),
+                rows=tuple(
+                    sum(1 << x for x, y in cells if y == row) for row in range(height)
+                ),
+                kick=(next_corner[0] - corner[0], next_corner[1] - corner[1]),
+            )
+        )
+    return orientations
+
+
+ROTATIONS = [rotations(block) for block in BLOCKS]
+SPAWN_ROWS = [min(c[1] for c in block) for block in BLOCKS]
+
+# Weights of the board features the autopilot minimizes, see evaluate.
+HEIGHT_WEIGHT = 0.51
+HOLE_WEIGHT = 0.36
+BUMPINESS_WEIGHT = 0.18
+LINE_WEIGHT = -0.76
+GAME_OVER_COST = 1000
+
+
+def fits(board, orientation, x, y):
+    """Returns whether a block fits on the board at the given place.
+    Args:
+        board (int): The bitboard.
+        orientation (Orientation): The orientation of the block.
+        x (int): The x coordinate of the left side of the block.
+        y (int): The y coordinate of the top of the block.
+    """
+    return (
+        x >= 0
+        and x + orientation.width <= 8
+        and y + HIDDEN_ROWS >= 0
+        and not (orientation.mask << ((y + HIDDEN_ROWS) * 8 + x)) & board
+    )
+
+
+def clear_rows(board):
+    """Removes the full rows of the board.
+    Returns:
+        tuple: The new board and the number of rows removed.
+    """
+    lines = 0
+    for row in range(0, 8):
+        shift = (row + HIDDEN_ROWS) * 8
+        if (board >> shift) & FULL_ROW == FULL_ROW:
+            above = board & ((1 << shift) - 1)
+            below = board >> (shift + 8) << (shift + 8)
+            board = below | (above << 8)
+            lines += 1
+    return board, lines
+
+
+@lru_cache(maxsize=65536)
+def evaluate(cells, lines):
+    """Returns the cost of a board for the autopilot, the lower the better.
+    Args:
+        cells (int): The 64 cells of the board, bit y * 8 + x.
+        lines (int): The number of rows that were just removed.
+    """
+    heights = [0] * 8
+    holes = 0
+    # columns with a block somewhere above the current row
+    covered = 0
+    for y in range(0, 8):
+        row = cells >> (y * 8) & FULL_ROW
+        new = row & ~covered
+        while new:
+            bit = new & -new
+            heights[bit.bit_length() - 1] = 8 - y
+            new ^= bit
+        holes += bin(covered & ~row).count("1")
+        covered |= row
+    bumpiness = sum(abs(heights[x] - heights[x + 1]) for x in range(0, 7))
+    return (
+        HEIGHT_WEIGHT * sum(heights)
+        + HOLE_WEIGHT * holes
+        + BUMPINESS_WEIGHT * bumpiness
+        + LINE_WEIGHT * lines
+    )
+
+
+def landing_row(board, orientation, x, y):
+    """Returns the y coordinate where a block dropped straight down lands."""
+    while fits(board, orientation, x, y + 1):
+        y += 1
+    return y
+
+
+def after_move(board, orientation, x, y, row, left, budgets):
+    """Returns where a block is after one more move of the autopilot, see
+    best_placement.
+    Returns:
+        tuple: The y coordinate of the block, the index in budgets of the row it is
+            on, and the moves left before it falls again, 0 if it landed.
+    """
+    left -= 1
+    while left <= 0:
+        if not fits(board, orientation, x, y + 1):
+            return y, row, 0
+        y += 1
+        row += 1
+        left = budgets[min(row, len(budgets) - 1)]
+    return y, row, left
+
+
+@lru_cache(maxsize=16384)
+def best_placement(board, block, rotation, x, y, budgets):
+    """Searches where the autopilot should drop a block.
+    The placements are reached the way the autopilot moves the block, one move at a
+    time: rotated from where it is with the kicks of ROTATIONS, then moved sideways,
+    then dropped straight down. Meanwhile the block falls after the number of moves
+    in budgets, like it does in the game, and lands where it is if it can't. The
+    resulting boards are compared with evaluate. Placements are cached by board,
+    block position and budgets, and so are the evaluations, by resulting board.
+    Args:
+        board (int): The bitboard.
+        block (int): The index of the block in BLOCKS.
+        rotation (int): The current rotation of the block.
+        x (int): The x coordinate of the left side of the block.
+        y (int): The y coordinate of the top of the block.
+        budgets (tuple): The number of moves before the block falls from each of the
+            next rows, the first one including the move about to be made, see
+            Tetris.moves_per_row. The last one is used for all the rows below.
+    Returns:
+        tuple: The rotation and the x and y coordinates where the block lands, or
+            None if it doesn't fit where it is.
+    """
+    orientations = ROTATIONS[block]
+    if not fits(board, orientations[rotation], x, y):
+        return None
+    best = None
+    best_cost = None
+    row = 0
+    left = budgets[0]
+    for turns in range(0, 4):
+        orientation = orientations[rotation]
+        for direction in (0, -1, 1):
+            column, top, moved_row, moved_left = x, y, row, left
+            while True:
+                landed = landing_row(board, orientation, column, top)
+                placed = board | orientation.mask << (
+                    (landed + HIDDEN_ROWS) * 8 + column
+                )
+                placed, lines = clear_rows(placed)
+                cost = evaluate((placed >> BOARD_SHIFT) & BOARD_MASK, lines)
+                if landed <= 0:
+                    cost += GAME_OVER_COST
+                if best_cost is None or cost < best_cost:
+                    best = (rotation, column, landed)
+                    best_cost = cost
+                if direction == 0 or moved_left == 0:
+                    break
+                if not fits(board, orientation, column + direction, top):
+                    break
+                column += direction
+                top, moved_row, moved_left = after_move(
+                    board, orientation, column, top, moved_row, moved_left, budgets
+                )
+        if left == 0:
+            break
+        # the next rotation, unless it is blocked like in Tetris.rotate_block
+        kick = orientation.kick
+        next_rotation = (rotation + 1) % 4
+        if not fits(board, orientations[next_rotation], x + kick[0], y + kick[1]):
+            break
+        rotation = next_rotation
+        x += kick[0]
+        y += kick[1]
+        y, row, left = after_move(
+            board, orientations[rotation], x, y, row, left, budgets
+        )
+    return best
 
 
 class Tetris(LaunchGame):
-    def __init__(self):
-        super().__init__("Tetris", 1)
-        self.define_blocks()
+    # seconds it takes a block to fall one row on level 1
+    DROP_INTERVAL = 0.5
+    # seconds between two moves of the autopilot
+    AUTOPILOT_INTERVAL = 0.12
+    ATTRACT_DELAY = 15
+
+    def __init__(self, lp=None, writer=None):
+        super().__init__("Tetris", 1, lp=lp, writer=writer)
         self.reset()
 
     def new_block(self):
-        self.current_block = np.array(random.choice(self.blocks))
-        self.current_block_color = [random.randint(1, 3), random.randint(0, 3)]
+        # the level goes up before the block comes, so that it falls at the new speed
+        if self.blocks_passed >= 15:
+            self.blocks_passed = 0
+            self.level += 1
+            # a bar up the right column, which stops below the corner without a LED
+            y = max(self.height + 1 - self.level, 1)
+            self.paint_hud(self.width, y, self.level, self.level)
+        self.block = self.rng.randrange(len(BLOCKS))
+        self.rotation = 0
+        self.current_block_color = [self.rng.randint(1, 3), self.rng.randint(0, 3)]
         # randomly move block to the right
-        self.current_block[:, 0] += random.randint(
-            0, 7 - np.max(self.current_block[:, 0])
-        )
+        self.x = self.rng.randint(0, 8 - ROTATIONS[self.block][0].width)
+        self.y = SPAWN_ROWS[self.block]
         # randomly rotate block
-        for i in range(0, random.randint(0, 3)):
+        for i in range(0, self.rng.randint(0, 3)):
             self.rotate_block()
+        self.target = None
 
     def reset(self):
         super().reset()
-        self.fallen_blocks = np.zeros((8, 8), dtype=object)
-        self.new_block()
-        self.timer = 0
+        self.board = FLOOR
+        self.colors = bytearray(64)
+        self.piece = self.compositor.add(Sprite((), 0, 0), z=1)
         self.level = 1
         self.blocks_passed = 0
+        self.new_block()
+        self.timer = 0
+        self.autopilot_timer = 0
+
+    def fits(self, rotation, x, y):
+        """Returns whether the current block fits on the board at the given place."""
+        return fits(self.board, ROTATIONS[self.block][rotation], x, y)
 
-    def define_blocks(self):
-        self.blocks = [
-            [[0, 0], [1, 0], [2, 0], [3, 0]],
-            [[0, -1], [0, 0], [1, -1], [1, 0]],
-            [[0, -1], [1, -1], [2, -1], [1, 0]],
-            [[0, -1], [1, -1], [2, -1], [2, 0]],
-            [
-                [
-                    0,
-                    -1,
-                ],
-                [1, -1],
-                [2, -1],
-                [0, 0],
-            ],
-            [[0, -1], [1, -1], [1, 0], [2, 0]],
-            [[0, -1], [1, -1], [1, 0], [2, -1]],
-        ]
+    def move(self, x):
+        """Moves the current block x columns sideways, if there is room."""
+        if self.fits(self.rotation, self.x + x, self.y):
+            self.x += x
 
     def rotate_block(self):
-        translated_coords = self.current_block - np.mean(self.current_block, axis=0)
-        rotation_matrix = np.array([[0, -1], [1, 0]])
-
-        # Apply the rotation matrix to the translated coordinates
-        rotated_coords = np.dot(translated_coords, rotation_matrix.T)
-
-        # Translate the coordinates back to their original position
-        rotated_coords += np.mean(self.current_block, axis=0)
-
-        rotated_coords = np.round(rotated_coords, decimals=1)
-        # convert to ints
-        rotated_coords = rotated_coords.astype(int)
-        if (
-            np.any(rotated_coords[:, 0] < 0)
-            or np.any(rotated_coords[:, 0] > 7)
-            or np.any(rotated_coords[:, 1] > 7)
-            or np.any(self.fallen_blocks[rotated_coords[:, 0], rotated_coords[:, 1]])
-            or len(np.unique(rotated_coords, axis=0)) != len(rotated_coords)
-        ):
+        kick = ROTATIONS[self.block][self.rotation].kick
+        rotation = (self.rotation + 1) % 4
+        if not self.fits(rotation, self.x + kick[0], self.y + kick[1]):
             logging.debug("Can't rotate")
             return
 
-        self.current_block = rotated_coords
+        self.rotation = rotation
+        self.x += kick[0]
+        self.y += kick[1]
 
-    def blink_row(self, row):
-        for j in range(2):
-            for i in range(0, 8):
-                self.lp.LedCtrlXY(i, row + 1, 3, 3)
-            time.sleep(0.2)
-            for i in range(0, 8):
-                self.lp.LedCtrlXY(i, row + 1, 0, 0)
-                self.prev_state.add((i, row + 1, 0, 0))
-            time.sleep(0.2)
+    def lock_block(self):
+        """Adds the current block to the fallen blocks."""
+        orientation = ROTATIONS[self.block][self.rotation]
+        self.board |= orientation.mask << ((self.y + HIDDEN_ROWS) * 8 + self.x)
+        color = led_color(*self.current_block_color)
+        for cx, cy in orientation.cells:
+            if self.y + cy >= 0:
+                self.colors[(self.y + cy) * 8 + self.x + cx] = color
 
     def check_for_full_rows(self):
-        for b in self.current_block:
-            # check if all values are nonzero
-            if np.all(self.fallen_blocks[:, b[1]]):
-                logging.debug("Full row (" + str(b[1]) + ")")
-                # full row
-                # self.blink_row(b[1])
-                # move everything above one down
-                self.fallen_blocks[:, 1 : (b[1] + 1)] = self.fallen_blocks[:, 0 : b[1]]
-                self.fallen_blocks[:, 0] = 0
-                # increase score
-                self.increase_score(1)
-                self.blocks_passed += 2
-                time.sleep(0.5)
-                return True
-        return False
-
-    def step(self, evt, delta):
-        super().step(evt, delta)
-
-        can_move_left = min(self.current_block[:, 0]) > 0 and not np.any(
-            self.fallen_blocks[self.current_block[:, 0] - 1, self.current_block[:, 1]]
-        )
-        can_move_right = max(self.current_block[:, 0]) < 7 and not np.any(
-            self.fallen_blocks[self.current_block[:, 0] + 1, self.current_block[:, 1]]
-        )
+        """Returns the full rows, from top to bottom."""
+        rows = []
+        for row in range(0, 8):
+            if (self.board >> (row + HIDDEN_ROWS) * 8) & FULL_ROW == FULL_ROW:
+                logging.debug("Full row (" + str(row) + ")")
+                rows.append(row)
+        return rows
+
+    def remove_rows(self, rows):
+        """Removes the given rows, moves everything above them down and starts the
+        next block.
+        Args:
+            rows (list): The rows to remove, from top to bottom.
+        """
+        for row in rows:
+            shift = (row + HIDDEN_ROWS) * 8
+            # move everything above one down
+            above = self.board & ((1 << shift) - 1)
+            below = self.board >> (shift + 8) << (shift + 8)
+            self.board = below | (above << 8)
+            self.colors[8 : (row + 1) * 8] = self.colors[0 : row * 8]
+            self.colors[0:8] = bytes(8)
+            # increase score
+            self.increase_score(1)
+            self.blocks_passed += 2
+        self.new_block()
+
+    def land(self):
+        """Adds the current block to the fallen blocks and starts the next one."""
+        logging.debug("Block hit something")
+        self.blocks_passed += 1
+        self.lock_block()
+        if self.y <= 0:
+            self.game_over = True
+            return
+        rows = self.check_for_full_rows()
+        if rows:
+            # the next block comes once the full rows have blinked and are gone
+            self.play(blink_rows(rows, on_done=lambda: self.remove_rows(rows)))
+        else:
+            self.new_block()
+
+    def moves_per_row(self, delta):
+        """Returns how many moves the autopilot makes before the block falls from each
+        of the next rows, see best_placement.
+        The timers are advanced like in step, from the move the autopilot is making,
+        so the plan matches what the game does.
+        Args:
+            delta (float): The length of a step, in seconds.
+        """
+        interval = self.DROP_INTERVAL / self.level
+        timer = self.timer + delta
+        autopilot_timer = 0
+        moves = 1
+        budgets = []
+        while len(budgets) < HIDDEN_ROWS + 8:
+            if timer > interval:
+                budgets.append(moves)
+                timer = 0
+                moves = 0
+            autopilot_timer += delta
+            if autopilot_timer > self.AUTOPILOT_INTERVAL:
+                autopilot_timer = 0
+                moves += 1
+            timer += delta
+        return tuple(budgets)
+
+    def autopilot_move(self, delta):
+        """Moves the current block one step towards the best placement.
+        Args:
+            delta (float): The length of a step, in seconds.
+        Returns:
+            bool: Whether the block should drop.
+        """
+        if self.target is None:
+            self.target = best_placement(
+                self.board,
+                self.block,
+                self.rotation,
+                self.x,
+                self.y,
+                self.moves_per_row(delta),
+            )
+        if self.target is None:
+            return True
+        rotation, x, y = self.target
+        before = (self.rotation, self.x)
+        if self.rotation != rotation:
+            self.rotate_block()
+        elif self.x != x:
+            self.move(1 if x > self.x else -1)
+        else:
+            return True
+        # drop the block where it is if something is in the way
+        return (self.rotation, self.x) == before
+
+    def step(self, events, delta):
+        super().step(events, delta)
+
         # CONTROLS
-        x = 0
-        y = 0
-        if evt != [] and evt[0][2] > 0:
-            if (evt[0][1] <= 115 and evt[0][1] >= 112) and can_move_left:
-                x -= 1
-            elif (evt[0][1] > 115 and evt[0][1] < 120) and can_move_right:
-                x += 1
-            elif evt[0][1] == 120:
-                y += 1
-            elif evt[0][1] < 111:
+        drop = False
+        if self.autopilot:
+            self.autopilot_timer += delta
+            if self.autopilot_timer > self.AUTOPILOT_INTERVAL:
+                self.autopilot_timer = 0
+                drop = self.autopilot_move(delta)
+        for evt in events:
+            if not evt.pressed:
+                continue
+            if evt.note <= 115 and evt.note >= 112:
+                self.move(-1)
+            elif evt.note > 115 and evt.note < 120:
+                self.move(1)
+            elif evt.note == 120:
+                drop = True
+            elif evt.note < 111:
                 # rotate
                 self.rotate_block()
 
         self.timer += delta
-        if self.timer > 100000000 / (self.level * 5):
+        if self.timer > self.DROP_INTERVAL / self.level:
             self.timer = 0
-            y += 1
-
-        if y > 0:
-            for b in self.current_block:
-                b[0] = int(b[0] + x)
-                if b[1] >= 7 or self.fallen_blocks[b[0], b[1] + 1]:
-                    logging.debug("Block hit something")
-                    self.blocks_passed += 1
-                    for b in self.current_block:
-                        if b[1] <= 0:
-                            self.game_over = True
-                            break
-                        self.fallen_blocks[b[0], b[1]] = self.current_block_color
-
-                    multiple_rows = self.check_for_full_rows()
-                    while multiple_rows:
-                        multiple_rows = self.check_for_full_rows()
-                        self.increase_score(1)
-                    self.new_block()
-                    break
-            x = 0
+            drop = True
 
-        if self.blocks_passed >= 15:
-            self.blocks_passed = 0
-            self.level += 1
-            self.lp.LedCtrlXY(8, 9 - self.level, self.level, self.level)
+        if drop:
+            if self.fits(self.rotation, self.x, self.y + 1):
+                self.y += 1
+            else:
+                self.land()
+                if self.game_over:
+                    return
 
         # add everything that needs to be seen:
-        for b in self.current_block:
-            b[1] = int(b[1] + y)
-            b[0] = int(b[0] + x)
-            self.paint_next(
-                b[0], b[1], self.current_block_color[0], self.current_block_color[1]
-            )
-        for i in range(0, 8):
-            for j in range(0, 8):
-                if self.fallen_blocks[i, j]:
-                    self.paint_next(
-                        i, j, self.fallen_blocks[i, j][0], self.fallen_blocks[i, j][1]
-                    )
+        self.piece.rows = ROTATIONS[self.block][self.rotation].rows
+        self.piece.color = tuple(self.current_block_color)
+        self.piece.x = self.x
+        self.piece.y = self.y
+        cells = (self.board >> BOARD_SHIFT) & BOARD_MASK
+        while cells:
+            cell = cells & -cells
+            i = cell.bit_length() - 1
+            self.paint_next(i & 7, i >> 3, self.colors[i] & 3, self.colors[i] >> 4)
+            cells ^= cell
 
 
-game = Tetris()
-game.run()
+if __name__ == "__main__":
+    game = Tetris()
+    game.run()
@@ -0,0 +1,243 @@
+import sys
+import time
+import numpy as np
+from tetris import BLOCKS, HIDDEN_ROWS, ROTATIONS, SPAWN_ROWS, FULL_ROW, Tetris
+
+# The board of every game is a row of uint16 bitmasks (bit x is column x): the hidden
+# rows, the 8 rows of the board, then floor rows, enough for a block to be tested
+# anywhere down to the floor.
+BOARD_ROWS = HIDDEN_ROWS + 8
+PADDED_ROWS = BOARD_ROWS + 4
+
+# The rows of every orientation of every block, padded to 4 rows, by [block, rotation].
+PIECE_ROWS = np.zeros((len(BLOCKS), 4, 4), dtype=np.uint16)
+KICKS = np.zeros((len(BLOCKS), 4, 2), dtype=np.int64)
+WIDTHS = np.zeros((len(BLOCKS), 4), dtype=np.int64)
+for b, orientations in enumerate(ROTATIONS):
+    for r, orientation in enumerate(orientations):
+        PIECE_ROWS[b, r, 0 : len(orientation.rows)] = orientation.rows
+        KICKS[b, r] = orientation.kick
+        WIDTHS[b, r] = orientation.width
+SPAWN_Y = np.array(SPAWN_ROWS, dtype=np.int64)
+ROW_OFFSETS = np.arange(4)
+
+NOOP = 0
+LEFT = 1
+RIGHT = 2
+ROTATE = 3
+DROP = 4
+
+
+class TetrisBatch:
+    """Many games of Tetris played in lockstep, without a Launchpad or a clock.
+    The state of all the games is held in numpy arrays and every step advances all
+    of them at once with the rules of Tetris.step, by 1 / tick_rate seconds of
+    virtual time. The API is the one of a vectorized gym environment: step takes an
+    action per game, and the games that are over are reset right away.
+    The full rows are removed as soon as they are complete, without the pause of the
+    blinking animation of the game.
+    """
+
+    def __init__(self, num_envs: int = 1024, tick_rate: int = 60, seed=None):
+        """Initializes a TetrisBatch object.
+        Args:
+            num_envs (int): The number of games.
+            tick_rate (int): The number of steps per second of virtual time.
+            seed (int): The seed of the random blocks.
+        """
+        self.num_envs = num_envs
+        self.delta = 1 / tick_rate
+        self.rng = np.random.default_rng(seed)
+        self.envs = np.arange(num_envs)
+        self.board = np.zeros((num_envs, PADDED_ROWS), dtype=np.uint16)
+        self.block = np.zeros(num_envs, dtype=np.int64)
+        self.rotation = np.zeros(num_envs, dtype=np.int64)
+        self.x = np.zeros(num_envs, dtype=np.int64)
+        self.y = np.zeros(num_envs, dtype=np.int64)
+        self.timer = np.zeros(num_envs)
+        self.level = np.ones(num_envs, dtype=np.int64)
+        self.blocks_passed = np.zeros(num_envs, dtype=np.int64)
+        self.score = np.zeros(num_envs, dtype=np.int64)
+        self.frames = np.zeros(num_envs, dtype=np.int64)
+
+    def reset(self, seed=None):
+        """Starts new games on all the boards.
+        Args:
+            seed (int): If given, reseeds the random blocks.
+        Returns:
+            numpy.ndarray: The observation, see observation.
+        """
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self.reset_envs(self.envs)
+        return self.observation()
+
+    def reset_envs(self, envs):
+        """Starts new games on the given boards."""
+        self.board[envs] = 0
+        self.board[envs, BOARD_ROWS:] = FULL_ROW
+        self.timer[envs] = 0
+        self.level[envs] = 1
+        self.blocks_passed[envs] = 0
+        self.score[envs] = 0
+        self.frames[envs] = 0
+        self.new_blocks(envs)
+
+    def fits(self, envs, block, rotation, x, y):
+        """Returns on which of the given boards the given blocks fit, see Tetris.fits."""
+        rows = PIECE_ROWS[block, rotation] << np.clip(x, 0, 8)[:, None]
+        top = np.clip(y + HIDDEN_ROWS, 0, BOARD_ROWS)
+        below = self.board[envs[:, None], top[:, None] + ROW_OFFSETS]
+        return (
+            (x >= 0)
+            & (y + HIDDEN_ROWS >= 0)
+            & ((rows >> 8) == 0).all(axis=1)
+            & ((rows & below) == 0).all(axis=1)
+        )
+
+    def new_blocks(self, envs):
+        """Starts a new block on the given boards, see Tetris.new_block."""
+        n = len(envs)
+        block = self.rng.integers(0, len(BLOCKS), n)
+        self.block[envs] = block
+        self.rotation[envs] = 0
+        self.x[envs] = (self.rng.random(n) * (9 - WIDTHS[block, 0])).astype(np.int64)
+        self.y[envs] = SPAWN_Y[block]
+        turns = self.rng.integers(0, 4, n)
+        for i in range(1, 4):
+            self.rotate(envs[turns >= i])
+
+    def rotate(self, envs):
+        """Rotates the blocks of the given boards where they fit, like rotate_block."""
+        block = self.block[envs]
+        rotation = self.rotation[envs]
+        kick = KICKS[block, rotation]
+        x = self.x[envs] + kick[:, 0]
+        y = self.y[envs] + kick[:, 1]
+        rotation = (rotation + 1) % 4
+        ok = self.fits(envs, block, rotation, x, y)
+        envs = envs[ok]
+        self.rotation[envs] = rotation[ok]
+        self.x[envs] = x[ok]
+        self.y[envs] = y[ok]
+
+    def move(self, envs, dx):
+        """Moves the blocks of the given boards sideways where they fit."""
+        x = self.x[envs] + dx
+        ok = self.fits(envs, self.block[envs], self.rotation[envs], x, self.y[envs])
+        self.x[envs[ok]] = x[ok]
+
+    def land(self, envs):
+        """Locks the blocks of the given boards and removes the full rows.
+        Returns:
+            tuple: The number of rows removed on each board, and which games are over.
+        """
+        block = self.block[envs]
+        rows = PIECE_ROWS[block, self.rotation[envs]] << self.x[envs][:, None]
+        top = self.y[envs] + HIDDEN_ROWS
+        self.board[envs[:, None], top[:, None] + ROW_OFFSETS] |= rows.astype(np.uint16)
+        self.blocks_passed[envs] += 1
+        over = self.y[envs] <= 0
+
+        visible = self.board[envs, HIDDEN_ROWS:BOARD_ROWS]
+        full = visible == FULL_ROW
+        cleared = full.sum(axis=1)
+        changed = cleared > 0
+        if changed.any():
+            # move the full rows to the top, keeping the order of the others, and
+            # empty them
+            order = np.argsort(~full[changed], axis=1, kind="stable")
+            kept = np.take_along_axis(visible[changed], order, axis=1)
+            kept[np.arange(8) < cleared[changed][:, None]] = 0
+            self.board[envs[changed], HIDDEN_ROWS:BOARD_ROWS] = kept
+        self.score[envs] += cleared
+        self.blocks_passed[envs] += 2 * cleared
+        self.new_blocks(envs[~over])
+        return cleared, over
+
+    def step(self, actions):
+        """Advances all the games by one tick.
+        Args:
+            actions (numpy.ndarray): The action of every game: NOOP, LEFT, RIGHT,
+                ROTATE or DROP (the "H" button, moving the block one row down).
+        Returns:
+            tuple: The observation, the reward (rows removed), whether the game was
+                over (it has been reset since) and a dict with the level, score and
+                length in frames of every game.
+        """
+        actions = np.asarray(actions)
+        self.move(self.envs[actions == LEFT], -1)
+        self.move(self.envs[actions == RIGHT], 1)
+        self.rotate(self.envs[actions == ROTATE])
+
+        self.timer += self.delta
+        timed = self.timer > Tetris.DROP_INTERVAL / self.level
+        self.timer[timed] = 0
+        drop = self.envs[timed | (actions == DROP)]
+        down = self.fits(
+            drop, self.block[drop], self.rotation[drop], self.x[drop], self.y[drop] + 1
+        )
+        self.y[drop[down]] += 1
+
+        reward = np.zeros(self.num_envs, dtype=np.int64)
+        done = np.zeros(self.num_envs, dtype=bool)
+        landed = drop[~down]
+        if len(landed):
+            reward[landed], done[landed] = self.land(landed)
+
+        up = self.blocks_passed >= 15
+        self.blocks_passed[up] = 0
+        self.level[up] += 1
+        self.frames += 1
+
+        info = {
+            "level": self.level.copy(),
+            "score": self.score.copy(),
+            "frames": self.frames.copy(),
+        }
+        if done.any():
+            self.reset_envs(self.envs[done])
+        return self.observation(), reward, done, info
+
+    def observation(self):
+        """Returns the boards with their falling block.
+        Returns:
+            numpy.ndarray: The (num_envs, 8) rows of the boards, as uint8 bitmasks.
+        """
+        board = self.board.copy()
+        rows = PIECE_ROWS[self.block, self.rotation] << self.x[:, None]
+        top = self.y + HIDDEN_ROWS
+        board[self.envs[:, None], top[:, None] + ROW_OFFSETS] |= rows.astype(np.uint16)
+        return board[:, HIDDEN_ROWS:BOARD_ROWS].astype(np.uint8)
+
+
+if __name__ == "__main__":
+    # soak test with random actions, e.g. tetris_sim.py 4096 600
+    num_envs = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 600
+    sim = TetrisBatch(num_envs, seed=0)
+    sim.reset()
+    rng = np.random.default_rng(0)
+    games = []
+    start = time.perf_counter()
+    for i in range(steps):
+        actions = rng.choice(5, num_envs, p=[0.8, 0.05, 0.05, 0.05, 0.05])
+        obs, reward, done, info = sim.step(actions)
+        for level, frames in zip(info["level"][done], info["frames"][done]):
+            games.append((level, frames))
+    elapsed = time.perf_counter() - start
+    print(
+        str(round(num_envs * steps / elapsed / 1e6 * 60, 1))
+        + " million frames per minute, "
+        + str(len(games))
+        + " games over"
+    )
+    if games:
+        levels, frames = np.array(games).T
+        print(
+            "Mean level reached: "
+            + str(round(levels.mean(), 2))
+            + ", mean game length: "
+            + str(round(frames.mean() / 60, 1))
+            + " s"
+        )
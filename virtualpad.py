@@ -0,0 +1,240 @@
+import time
+from collections import deque
+from animation import font
+from ledwriter import LED_COUNT, MESSAGE_BYTES, RAPID_ORDER, led_color
+
+
+def button_message(x, y, pressed=True):
+    """Returns the raw MIDI message a Launchpad sends for the given button.
+    Args:
+        x (int): The x coordinate of the button.
+        y (int): The y coordinate of the button (0 is the top row).
+        pressed (bool): Whether the button was pressed or released.
+    """
+    velocity = 127 if pressed else 0
+    if y == 0:
+        return [176, 104 + x, velocity]
+    return [144, (y - 1) << 4 | x, velocity]
+
+
+class VirtualMidi:
+    """In-memory stand-in for the MIDI port of a Launchpad MINI.
+    It understands the messages the Launchpad class sends (LEDs, rapid updates,
+    double buffering, reset) and keeps track of how much was sent.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        """Initializes a VirtualMidi object.
+        Args:
+            clock (callable): Clock used to deliver scripted events, returning seconds.
+        """
+        self.clock = clock
+        self.start = clock()
+        self.buffers = [bytearray(LED_COUNT), bytearray(LED_COUNT)]
+        self.displayed = 0
+        self.updated = 0
+        self.cursor = 0
+        self.messages = 0
+        self.bytes_sent = 0
+        self.events = deque()
+        self.scripted = deque()
+        self.last_event = self.start
+
+    def reset(self):
+        """Turns off all LEDs and goes back to a single buffer."""
+        for buffer in self.buffers:
+            buffer[:] = bytes(LED_COUNT)
+        self.displayed = 0
+        self.updated = 0
+        self.cursor = 0
+
+    def set_led(self, index, velocity):
+        """Sets a LED according to the buffer flags in its velocity."""
+        color = velocity & 0x33
+        if velocity & 0x04:
+            # copy: write to both buffers
+            self.buffers[0][index] = color
+            self.buffers[1][index] = color
+        else:
+            self.buffers[self.updated][index] = color
+            if velocity & 0x08:
+                # clear: clear the other buffer
+                self.buffers[1 - self.updated][index] = 0
+
+    def RawWrite(self, stat, dat1, dat2):
+        self.messages += 1
+        self.bytes_sent += MESSAGE_BYTES
+        if stat == 144:
+            x = dat1 & 0x0F
+            y = (dat1 >> 4) + 1
+            if x <= 8 and y <= 8:
+                self.set_led(y * 9 + x, dat2)
+        elif stat == 146:
+            if self.cursor < len(RAPID_ORDER):
+                self.set_led(RAPID_ORDER[self.cursor], dat1)
+                self.set_led(RAPID_ORDER[self.cursor + 1], dat2)
+                self.cursor += 2
+        elif stat == 176:
+            if 104 <= dat1 <= 111:
+                self.set_led(dat1 - 104, dat2)
+            elif dat1 == 1:
+                self.cursor = 0
+            elif dat1 == 0:
+                if dat2 == 0:
+                    self.reset()
+                elif dat2 >= 125:
+                    self.reset()
+                    level = dat2 - 124
+                    for buffer in self.buffers:
+                        buffer[:] = bytes([level | level << 4]) * LED_COUNT
+                    self.buffers[0][8] = self.buffers[1][8] = 0
+                elif dat2 & 0x20:
+                    self.displayed = dat2 & 0x01
+                    self.updated = dat2 >> 2 & 0x01
+                    if dat2 & 0x10:
+                        self.buffers[self.updated][:] = self.buffers[self.displayed]
+                    self.cursor = 0
+
+    def push_event(self, message):
+        """Queues a raw MIDI message as if it came from the device."""
+        now = self.clock()
+        self.events.append((message, now - self.last_event))
+        self.last_event = now
+
+    def ReadRaw(self):
+        while self.scripted and self.scripted[0][0] <= self.clock() - self.start:
+            self.push_event(self.scripted.popleft()[1])
+        if self.events:
+            return self.events.popleft()
+        return None
+
+
+class VirtualLaunchpad:
+    """Headless Launchpad MINI, a drop-in replacement for novation_launchpad.Launchpad.
+    It keeps the LED state in memory, can be fed scripted button presses, and counts
+    every message and byte it is asked to send.
+    It doesn't need novation_launchpad or the MIDI system, so that it works on machines
+    without them, e.g. for the tests.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        """Initializes a VirtualLaunchpad object.
+        Args:
+            clock (callable): Clock used to deliver scripted events, returning seconds.
+        """
+        self.midi = VirtualMidi(clock)
+        self.idOut = None
+        self.idIn = None
+        self.msg = None
+        self.SCROLL_NONE = 0
+        self.SCROLL_LEFT = -1
+        self.SCROLL_RIGHT = 1
+
+    def Open(self, number=0, name="Launchpad"):
+        return True
+
+    def Check(self, number=0, name="Launchpad"):
+        return True
+
+    def Close(self):
+        pass
+
+    # The methods of novation_launchpad.Launchpad that the games use, sending the
+    # same messages.
+
+    def ButtonFlush(self):
+        while self.midi.ReadRaw():
+            pass
+
+    def EventRaw(self):
+        return self.midi.ReadRaw() or []
+
+    def Reset(self):
+        self.midi.RawWrite(176, 0, 0)
+
+    def LedGetColor(self, red, green):
+        return led_color(red, green)
+
+    def LedCtrlRaw(self, number, red, green):
+        if 0 <= number <= 120:
+            self.midi.RawWrite(144, number, led_color(red, green))
+
+    def LedCtrlAutomap(self, number, red, green):
+        if 0 <= number <= 7:
+            self.midi.RawWrite(176, 104 + number, led_color(red, green))
+
+    def LedCtrlXY(self, x, y, red, green):
+        if x < 0 or x > 8 or y < 0 or y > 8:
+            return
+        if y == 0:
+            self.LedCtrlAutomap(x, red, green)
+        else:
+            self.LedCtrlRaw((y - 1) << 4 | x, red, green)
+
+    def LedCtrlRawRapid(self, allLeds):
+        for i in range(0, len(allLeds), 2):
+            second = allLeds[i + 1] if i + 1 < len(allLeds) else 0
+            self.midi.RawWrite(146, allLeds[i], second)
+
+    def LedAllOn(self, colorcode=None):
+        if colorcode == 0:
+            self.Reset()
+        else:
+            self.midi.RawWrite(176, 0, 127)
+
+    def LedCtrlChar(self, char, red, green, offsx=0, offsy=0):
+        start = ord(char) * 8
+        for y in range(0, 8):
+            for x in range(0, 8):
+                if font()[start + y] & 0x80 >> x:
+                    self.LedCtrlXY(x + offsx, y + offsy + 1, red, green)
+
+    @property
+    def messages(self):
+        """The number of MIDI messages sent to the device."""
+        return self.midi.messages
+
+    @property
+    def bytes_sent(self):
+        """The number of MIDI bytes sent to the device."""
+        return self.midi.bytes_sent
+
+    def reset_counters(self):
+        """Resets the message and byte counters."""
+        self.midi.messages = 0
+        self.midi.bytes_sent = 0
+
+    def press(self, x, y):
+        """Presses the given button now."""
+        self.midi.push_event(button_message(x, y, True))
+
+    def release(self, x, y):
+        """Releases the given button now."""
+        self.midi.push_event(button_message(x, y, False))
+
+    def script(self, events):
+        """Queues button events to happen later.
+        Args:
+            events (list): (time, x, y, pressed) tuples, with the time in seconds
+                since the device was created, in chronological order.
+        """
+        for t, x, y, pressed in events:
+            self.midi.scripted.append((t, button_message(x, y, pressed)))
+
+    def led(self, x, y):
+        """Returns the (red, green) values of the given LED, as currently displayed."""
+        velocity = self.midi.buffers[self.midi.displayed][y * 9 + x]
+        return velocity & 3, velocity >> 4 & 3
+
+    def render(self):
+        """Returns the displayed LEDs as text, one line per row.
+        Each LED is shown as its red and green values, or ".." if it is off.
+        """
+        lines = []
+        for y in range(0, 9):
+            row = []
+            for x in range(0, 9):
+                r, g = self.led(x, y)
+                row.append(str(r) + str(g) if r or g else "..")
+            lines.append(" ".join(row))
+        return "\n".join(lines)